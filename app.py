@@ -1,24 +1,76 @@
 # FLASK APP - Resume Parser using Groq AI
 # Run the app using: python app.py
 import os, sys
-from flask import Flask, request, render_template
-from pypdf import PdfReader 
+from flask import Flask, Request, Response, g, request, render_template, jsonify, stream_with_context
 import json
-import uuid
-from werkzeug.utils import secure_filename
-from resumeparser import ats_extractor, calculate_job_match, calculate_ats_score
+import time
+from io import BytesIO
+from tempfile import SpooledTemporaryFile
+import metrics
+import resultcache
+import resultstore
+import resumehandles
+import pipeline
+import plans
+import jobs
+import batch
+import llmclient
+import pdfextract
+import prompts
+import jobdescription
+from plans import Step
 
 sys.path.insert(0, os.path.abspath(os.getcwd()))
 
 
-UPLOAD_PATH = r"__DATA__"
 ALLOWED_EXTENSIONS = {'pdf'}
+MAX_JOB_DESCRIPTION_CHARS = 10000
+MAX_UPLOAD_BYTES = 5 * 1024 * 1024  # 5 MB max upload size
+# Return per-stage timings of each request in a Server-Timing header
+SERVER_TIMING = os.getenv("SERVER_TIMING", "False").lower() in ("true", "1", "yes")
+
+
+class InMemoryUploadRequest(Request):
+    """Keep uploads in memory instead of werkzeug's disk-spooled temp files.
+
+    Safe because MAX_CONTENT_LENGTH caps the body at 5 MB. Only /batch accepts
+    larger bodies; those spool to disk past 5 MB.
+    """
+
+    @property
+    def max_content_length(self):
+        if self.path == "/batch":
+            return batch.BATCH_MAX_UPLOAD_BYTES
+        return super().max_content_length
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if self.path == "/batch":
+            return SpooledTemporaryFile(max_size=MAX_UPLOAD_BYTES)
+        return BytesIO()
+
 
 app = Flask(__name__)
-app.config["MAX_CONTENT_LENGTH"] = 5 * 1024 * 1024  # 5 MB max upload size
+app.request_class = InMemoryUploadRequest
+app.config["MAX_CONTENT_LENGTH"] = MAX_UPLOAD_BYTES
 
-# Ensure upload directory exists
-os.makedirs(UPLOAD_PATH, exist_ok=True)
+
+@app.before_request
+def start_trace():
+    g.trace = metrics.start_trace()
+
+
+@app.teardown_request
+def end_trace(exc=None):
+    metrics.end_trace()
+
+
+@app.after_request
+def add_server_timing(response):
+    """Expose the stage timings collected so far (streamed responses only get the early ones)."""
+    trace = g.get("trace")
+    if SERVER_TIMING and trace:
+        response.headers["Server-Timing"] = metrics.server_timing(trace)
+    return response
 
 
 # Security headers middleware
@@ -40,6 +92,24 @@ def add_security_headers(response):
     return response
 
 
+def warmup():
+    """
+    Do the one-off startup work before the first request: the deferred imports
+    (openai, httpx, pypdf), the API key, the tokenizer, the skill regex and
+    the page template.
+
+    Opens no sockets, threads or processes, so it is safe to run in the
+    gunicorn master before workers fork (see gunicorn.conf.py).
+    """
+    start = time.monotonic()
+    llmclient.preload()
+    pdfextract.preload()
+    prompts.estimate_tokens("warmup")
+    jobdescription.skill_pattern()
+    app.jinja_env.get_template('index.html')
+    print(f"Warmed up in {time.monotonic() - start:.2f}s")
+
+
 def allowed_file(filename):
     """Check if the uploaded file has an allowed extension."""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
@@ -49,147 +119,328 @@ def allowed_file(filename):
 def index():
     return render_template('index.html')
 
-@app.route("/process", methods=["POST"])
-def ats():
+@app.route("/metrics")
+def metrics_endpoint():
+    """Prometheus metrics: stage and Groq call latency, token and PDF size histograms."""
+    body, content_type = metrics.export()
+    return Response(body, content_type=content_type)
+
+
+@app.route("/cache/stats")
+def cache_stats():
+    """Expose result cache hit/miss counters."""
+    return jsonify(resultcache.stats())
+
+
+def _validate_upload(allow_handle=False):
+    """
+    Validate the multipart upload shared by /process and /jobs.
+
+    Args:
+        allow_handle: Accept a "resume_handle" form field instead of a file
+            (see resumehandles); the returned file is then None
+
+    Returns:
+        Tuple of (file, job_description, error message or None)
+    """
+    # Accessing request.files parses (and buffers) the multipart body
+    with metrics.timed("upload"):
+        files = request.files
+
+    # Get job description if provided with length validation
+    job_description = request.form.get('job_description', '').strip()
+    if job_description and len(job_description) > MAX_JOB_DESCRIPTION_CHARS:
+        return None, "", "Job description is too long (max 10,000 characters)"
+
+    # A newly chosen file always wins over the handle of an earlier upload
+    doc = files.get('pdf_doc')
+    if allow_handle and (doc is None or doc.filename == '') and request.form.get('resume_handle'):
+        return None, job_description, None
+
     # Validate file upload
-    if 'pdf_doc' not in request.files:
-        return render_template('index.html', error="No file uploaded")
-    
-    doc = request.files['pdf_doc']
+    if doc is None:
+        return None, "", "No file uploaded"
     
     if doc.filename == '':
-        return render_template('index.html', error="No file selected")
+        return None, "", "No file selected"
     
     if not allowed_file(doc.filename):
-        return render_template('index.html', error="Invalid file type. Please upload a PDF file.")
-    
-    # Get job description if provided with length validation
-    job_description = request.form.get('job_description', '').strip()
-    if job_description and len(job_description) > 10000:  # Limit to 10K characters
-        return render_template('index.html', error="Job description is too long (max 10,000 characters)")
-    
-    # Generate unique filename to avoid overwrites
-    original_filename = secure_filename(doc.filename)
-    unique_filename = f"{uuid.uuid4()}_{original_filename}"
-    doc_path = os.path.join(UPLOAD_PATH, unique_filename)
-    
+        return None, "", "Invalid file type. Please upload a PDF file."
+
+    return doc, job_description, None
+
+
+@app.route("/process", methods=["POST"])
+def ats():
+    return "".join(plans.drive(_process_plan(), _STEPS))
+
+
+@app.route("/process/stream", methods=["POST"])
+def ats_stream():
+    """
+    Streaming variant of /process as Server-Sent Events.
+
+    Emits "section" for each resume field as soon as the model finishes it,
+    "parsed" with the full result, rendered "ats_score"/"job_match" panels,
+    "resume_handle" to send instead of the PDF next time, and "error" or
+    "done" at the end.
+    """
+    events = plans.drive(_stream_plan(), _STEPS)
+    return Response(stream_with_context(events), mimetype="text/event-stream", headers=_SSE_HEADERS)
+
+
+# /process and /process/stream are written once, as plans (see plans.py) that
+# yield the response body. The routes above run their steps with _STEPS;
+# asgi.py runs the same plans on the event loop.
+
+def _process_plan():
+    """Plan for the /process page."""
+    doc, job_description, error = _validate_upload(allow_handle=True)
+    if error:
+        yield render_template('index.html', error=error)
+        return
+
+    deadline = time.monotonic() + pipeline.REQUEST_DEADLINE
+
     try:
-        # Save and process the file
-        doc.save(doc_path)
-        data = _read_file_from_path(doc_path)
-        
-        if not data.strip():
-            return render_template('index.html', error="No text could be extracted from the PDF")
-        
-        # Validate extracted text length (prevent token overflow)
-        if len(data) > 50000:  # Limit to ~50K characters
-            return render_template('index.html', error="Resume is too long. Please use a shorter resume (max ~10 pages)")
-        
-        # Call the ATS extractor
-        result = ats_extractor(data)
-        
-        # Debug: Print the raw result
-        print("="*80)
-        print("RAW AI RESPONSE:")
-        print(result)
-        print("="*80)
-        
-        # Try to parse the result as JSON
-        try:
-            parsed_data = json.loads(result)
-            print("Successfully parsed JSON!")
-            print("Keys in parsed data:", list(parsed_data.keys()))
-        except json.JSONDecodeError as e:
-            print(f"JSON parsing error: {str(e)}")
-            # Try to extract JSON from the response if wrapped in text
-            parsed_data = _extract_json_from_text(result)
-            if parsed_data is None:
-                return render_template('index.html', error="Failed to parse response from AI model")
-            print("Extracted JSON from text. Keys:", list(parsed_data.keys()))
-        
-        # Calculate job match if job description provided
-        job_match_data = None
-        if job_description:
-            print("Calculating job match...")
-            try:
-                job_match_data = calculate_job_match(data, parsed_data, job_description)
-                print("Job match calculated successfully!")
-                if job_match_data:
-                    print(f"Match score: {job_match_data.get('overall_match_score', 'N/A')}")
-            except Exception as e:
-                print(f"Error calculating job match: {str(e)}")
-                # Don't fail the entire request if job matching fails
-                job_match_data = {"error": str(e)}
-        
-        # Calculate ATS score
-        ats_score_data = None
-        print("Calculating ATS score...")
-        try:
-            ats_score_data = calculate_ats_score(data, parsed_data)
-            print("ATS score calculated successfully!")
-            if ats_score_data:
-                print(f"ATS score: {ats_score_data.get('overall_ats_score', 'N/A')}")
-        except Exception as e:
-            print(f"Error calculating ATS score: {str(e)}")
-            # Don't fail the entire request if ATS scoring fails
-            ats_score_data = {"error": str(e)}
-        
-        return render_template('index.html', data=parsed_data, job_match=job_match_data, ats_score=ats_score_data)
-    
+        handle, resume = yield from _resume_plan(doc)
+        results = yield Step(
+            "analyze", resume["text"], job_description, deadline=deadline,
+            parsed=resume.get("parsed"), ats_score=resume.get("ats_score"),
+        )
+        handle = yield Step("store_handle", handle, resume["text"], results["parsed"], results["ats_score"])
+
+        with metrics.timed("render"):
+            page = render_template('index.html', data=results["parsed"], job_match=results["job_match"], ats_score=results["ats_score"],
+                                   resume_handle=handle, job_description=job_description)
+
     except Exception as e:
-        # Log the error (in production, use proper logging)
-        print(f"Error processing resume: {str(e)}")
-        return render_template('index.html', error=f"An error occurred while processing your resume: {str(e)}")
-    
-    finally:
-        # Clean up: remove the uploaded file after processing
-        if os.path.exists(doc_path):
-            try:
-                os.remove(doc_path)
-            except Exception as e:
-                print(f"Warning: Could not remove temporary file {doc_path}: {str(e)}")
+        page = render_template('index.html', error=_error_message(e))
+    yield page
+
 
- 
-def _read_file_from_path(path):
-    reader = PdfReader(path) 
-    data = ""
+def _stream_plan():
+    """Plan for the /process/stream events."""
+    doc, job_description, error = _validate_upload(allow_handle=True)
+    if error:
+        yield _sse("error", {"error": error}) + _sse("done", {})
+        return
 
-    for page_no in range(len(reader.pages)):
-        page = reader.pages[page_no] 
-        data += page.extract_text()
+    deadline = time.monotonic() + pipeline.REQUEST_DEADLINE
 
-    return data 
+    try:
+        handle, resume = yield from _resume_plan(doc)
+        events = yield Step(
+            "analyze_stream", resume["text"], job_description, deadline=deadline,
+            parsed=resume.get("parsed"), ats_score=resume.get("ats_score"),
+        )
+        results = {}
+        while True:
+            event = yield Step("next", events)
+            if event is None:
+                break
+            stage, result = event
+            results[stage] = result
+            yield _stage_event(stage, result)
+        handle = yield Step("store_handle", handle, resume["text"], results["parsed"], results["ats_score"])
+        if handle:
+            yield _sse("resume_handle", {"resume_handle": handle})
+    except Exception as e:
+        yield _sse("error", {"error": _error_message(e)})
+    yield _sse("done", {})
 
 
-def _extract_json_from_text(text):
+def _resume_plan(doc):
     """
-    Attempt to extract JSON from text that may contain extra content.
-    Returns parsed JSON dict or None if extraction fails.
+    Return (handle, resume) for the uploaded file, or for the request's
+    resume_handle if there is none.
+
+    Raises:
+        PipelineError: If the handle is unknown or has expired
     """
-    import re
-    
-    # Try to find JSON object in the text
-    json_match = re.search(r'\{.*\}', text, re.DOTALL)
-    if json_match:
-        try:
-            return json.loads(json_match.group(0))
-        except json.JSONDecodeError:
-            pass
-    
-    # Try to find JSON array in the text
-    json_array_match = re.search(r'\[.*\]', text, re.DOTALL)
-    if json_array_match:
-        try:
-            return json.loads(json_array_match.group(0))
-        except json.JSONDecodeError:
-            pass
-    
-    return None
+    if doc is not None:
+        text = yield Step("extract", doc.stream)
+        return None, {"text": text}
+
+    # Same resume, new job description: only the job match runs
+    handle = request.form.get('resume_handle', '')
+    resume = yield Step("load_handle", handle)
+    if resume is None:
+        raise pipeline.PipelineError("Your earlier upload has expired. Please upload your resume again.")
+    return handle, resume
+
+
+def _error_message(e):
+    """The message shown for an error while processing a resume."""
+    if isinstance(e, pipeline.PipelineError):
+        return str(e)
+    # Log the error (in production, use proper logging)
+    print(f"Error processing resume: {str(e)}")
+    return f"An error occurred while processing your resume: {str(e)}"
+
+
+_STEPS = {
+    "extract": pipeline.extract_resume_text,
+    "load_handle": resumehandles.get,
+    "analyze": pipeline.analyze,
+    "analyze_stream": pipeline.analyze_stream,
+    "next": plans.next_item,
+    "store_handle": resumehandles.put,
+}
+
+
+def _stage_event(stage, result):
+    """One /process/stream event; ats_score and job_match are sent as rendered panels."""
+    if stage == "job_match":
+        with metrics.timed("render"):
+            result = {"html": render_template("_job_match.html", job_match=result)}
+    elif stage == "ats_score":
+        with metrics.timed("render"):
+            result = {"html": render_template("_ats_score.html", ats_score=result)}
+    return _sse(stage, result)
+
+
+@app.route("/batch", methods=["POST"])
+def batch_process():
+    """
+    Score many resumes against one job description, streamed as NDJSON.
+
+    Accepts a zip archive in "archive" and/or several PDFs in "pdf_docs", plus
+    "job_description". Emits one line per resume as it finishes and a ranked
+    summary line at the end.
+    """
+    job_description = request.form.get('job_description', '').strip()
+    if not job_description:
+        return jsonify({"error": "A job description is required to rank resumes"}), 400
+    if len(job_description) > MAX_JOB_DESCRIPTION_CHARS:
+        return jsonify({"error": "Job description is too long (max 10,000 characters)"}), 400
+
+    try:
+        files = []
+        archive = request.files.get('archive')
+        if archive and archive.filename:
+            files.extend(batch.read_zip(archive.stream))
+        for doc in request.files.getlist('pdf_docs'):
+            if not doc.filename:
+                continue
+            if not allowed_file(doc.filename):
+                raise batch.BatchError(f"{doc.filename} is not a PDF")
+            content = doc.stream.read(MAX_UPLOAD_BYTES + 1)
+            if len(content) > MAX_UPLOAD_BYTES:
+                raise batch.BatchError(f"{doc.filename} is larger than 5 MB")
+            files.append((doc.filename, content))
+        if len(files) > batch.BATCH_MAX_FILES:
+            raise batch.BatchError(f"Too many resumes (max {batch.BATCH_MAX_FILES})")
+    except batch.BatchError as e:
+        return jsonify({"error": str(e)}), 400
+    if not files:
+        return jsonify({"error": "No PDF resumes uploaded"}), 400
+
+    feedback_top = min(max(request.form.get('feedback_top', 0, type=int), 0), 10)
+
+    def stream():
+        for record in batch.run_batch(files, job_description, feedback_top=feedback_top):
+            yield json.dumps(record) + "\n"
+
+    return Response(stream(), mimetype="application/x-ndjson", headers=_SSE_HEADERS)
+
+
+@app.route("/jobs", methods=["POST"])
+def submit_job():
+    """Queue a resume for background processing and return its job id."""
+    doc, job_description, error = _validate_upload()
+    if error:
+        return jsonify({"error": error}), 400
+
+    doc.stream.seek(0)
+    job_id = jobs.submit(doc.stream.read(), job_description)
+    return jsonify({
+        "job_id": job_id,
+        "status_url": f"/jobs/{job_id}",
+        "events_url": f"/jobs/{job_id}/events",
+    }), 202
+
+
+@app.route("/jobs/<job_id>")
+def job_status(job_id):
+    """Poll a job: status plus every stage result produced so far."""
+    job = jobs.status(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+    return jsonify(job)
+
+
+@app.route("/jobs/<job_id>/events")
+def job_events(job_id):
+    """Server-Sent Events stream pushing each stage result as soon as it is ready."""
+    if jobs.status(job_id) is None:
+        return jsonify({"error": "Unknown job"}), 404
+
+    def stream():
+        for stage, data in jobs.events(job_id):
+            yield _sse(stage, data)
+
+    return Response(stream(), mimetype="text/event-stream", headers=_SSE_HEADERS)
+
+
+@app.route("/results")
+def list_results():
+    """
+    Page through stored results, best first.
+
+    Query parameters: sort (ats_score, match_score or recent), skill (repeatable,
+    all must match), min_ats, min_match, name (prefix), email, jd (a jd_hash),
+    limit (max 100) and cursor (next_cursor of the previous page).
+    """
+    if not resultstore.enabled():
+        return jsonify({"error": "Result store is disabled"}), 404
+    try:
+        page = resultstore.query(
+            sort=request.args.get("sort", "ats_score"),
+            skills=request.args.getlist("skill"),
+            min_ats=request.args.get("min_ats", type=float),
+            min_match=request.args.get("min_match", type=float),
+            name=request.args.get("name"),
+            email=request.args.get("email"),
+            jd=request.args.get("jd"),
+            limit=request.args.get("limit", resultstore.DEFAULT_PAGE_SIZE, type=int),
+            cursor=request.args.get("cursor"),
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(page)
+
+
+@app.route("/results/<int:result_id>")
+def get_result(result_id):
+    """One stored result with the full analysis."""
+    result = resultstore.get(result_id) if resultstore.enabled() else None
+    if result is None:
+        return jsonify({"error": "Unknown result"}), 404
+    return jsonify(result)
+
+
+@app.route("/results/<int:result_id>/view")
+def view_result(result_id):
+    """Render a stored result like /process did, without rerunning the analysis."""
+    result = resultstore.get(result_id) if resultstore.enabled() else None
+    if result is None:
+        return render_template('index.html', error="Unknown result"), 404
+    return render_template('index.html', data=result["parsed"], job_match=result["job_match"], ats_score=result["ats_score"])
+
+
+_SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def _sse(event, data):
+    """Format one Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
 
 if __name__ == "__main__":
     # Read debug mode from environment variable (default: False for safety)
     debug_mode = os.getenv("FLASK_DEBUG", "False").lower() in ("true", "1", "yes")
     port = int(os.getenv("FLASK_PORT", "8000"))
+    jobs.start_shared_workers()
     app.run(port=port, debug=debug_mode)
 
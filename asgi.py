@@ -0,0 +1,156 @@
+# ASGI entry point: async serving mode
+# POST /process and POST /process/stream (what the web form uses) run on the
+# async Groq client, so one worker process holds hundreds of uploads in flight
+# while they wait on Groq, and PDF parsing runs on worker threads. Every other
+# route is the regular Flask app, served from a thread pool (a2wsgi).
+#
+#   uvicorn asgi:app --host 0.0.0.0 --port 8000
+#   gunicorn asgi:app -k uvicorn.workers.UvicornWorker --bind 0.0.0.0:8000
+
+import asyncio
+import functools
+import os
+from io import BytesIO
+
+from a2wsgi import WSGIMiddleware
+from a2wsgi.wsgi import build_environ
+from werkzeug.exceptions import HTTPException
+
+import app as webapp
+import jobs
+import llmclient
+import pipeline
+import plans
+import resumehandles
+
+# Threads serving the routes that stay synchronous (jobs, batch, results, pages)
+ASGI_WSGI_THREADS = int(os.getenv("ASGI_WSGI_THREADS", "20"))
+# Open a connection on the async Groq client at startup (see gunicorn.conf.py)
+WARM_CONNECTIONS = os.getenv("WARM_CONNECTIONS", "true").lower() in ("true", "1", "yes")
+
+flask_app = webapp.app
+_wsgi = WSGIMiddleware(flask_app, workers=ASGI_WSGI_THREADS)
+
+
+async def app(scope, receive, send):
+    """The ASGI application."""
+    if scope["type"] == "lifespan":
+        await _lifespan(receive, send)
+    elif scope["type"] == "http" and scope["method"] == "POST" and scope["path"] == "/process":
+        await _process(scope, receive, send)
+    elif scope["type"] == "http" and scope["method"] == "POST" and scope["path"] == "/process/stream":
+        await _process_stream(scope, receive, send)
+    else:
+        await _wsgi(scope, receive, send)
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            jobs.start_shared_workers()
+            if WARM_CONNECTIONS:
+                await llmclient.awarm()
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await llmclient.aclose()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def _read_body(receive, limit):
+    """Read the request body, stopping as soon as it is over limit bytes."""
+    body = bytearray()
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body") or len(body) > limit:
+            return bytes(body)
+
+
+async def _process(scope, receive, send):
+    """
+    POST /process on the event loop.
+
+    The request goes through the Flask app's request context and hooks, and
+    runs the same plan as app.ats, so upload validation, templates and
+    response headers match the sync route.
+    """
+    body = await _read_body(receive, flask_app.config["MAX_CONTENT_LENGTH"])
+    environ = build_environ(scope, BytesIO(body))
+    with flask_app.request_context(environ):
+        try:
+            response = flask_app.preprocess_request()
+            if response is None:
+                page = "".join([piece async for piece in plans.drive_async(webapp._process_plan(), _STEPS)])
+                response = flask_app.make_response(page)
+        except HTTPException as e:
+            # e.g. 413 when the upload is over MAX_CONTENT_LENGTH
+            response = e.get_response(environ)
+        response = flask_app.process_response(response)
+
+        await _send_start(send, response)
+        await send({"type": "http.response.body", "body": response.get_data()})
+
+
+async def _process_stream(scope, receive, send):
+    """
+    POST /process/stream on the event loop, sending each Server-Sent Event as it is produced.
+
+    Like _process, it runs inside the Flask request context and runs the
+    same plan as app.ats_stream.
+    """
+    body = await _read_body(receive, flask_app.config["MAX_CONTENT_LENGTH"])
+    environ = build_environ(scope, BytesIO(body))
+    with flask_app.request_context(environ):
+        events = None
+        try:
+            response = flask_app.preprocess_request()
+            if response is None:
+                response = flask_app.response_class(mimetype="text/event-stream", headers=webapp._SSE_HEADERS)
+                events = plans.drive_async(webapp._stream_plan(), _STEPS)
+        except HTTPException as e:
+            response = e.get_response(environ)
+        response = flask_app.process_response(response)
+
+        await _send_start(send, response)
+        if events is None:
+            await send({"type": "http.response.body", "body": response.get_data()})
+            return
+        try:
+            async for message in events:
+                await send({"type": "http.response.body", "body": message.encode("utf-8"), "more_body": True})
+            await send({"type": "http.response.body", "body": b""})
+        finally:
+            # Cancels any stage still running if the client went away
+            await events.aclose()
+
+
+async def _send_start(send, response):
+    await send({
+        "type": "http.response.start",
+        "status": response.status_code,
+        "headers": [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in response.headers.items()],
+    })
+
+
+async def _off_loop(fn, *args):
+    """Run a resume handle lookup or update, on a worker thread if the backend is SQLite."""
+    if resumehandles.blocking():
+        return await asyncio.to_thread(fn, *args)
+    return fn(*args)
+
+
+async def _analysis_stream(*args, **kwargs):
+    return pipeline.analyze_stream_async(*args, **kwargs)
+
+
+# The steps of app's /process plans on the event loop
+_STEPS = {
+    "extract": pipeline.extract_resume_text_async,
+    "load_handle": functools.partial(_off_loop, resumehandles.get),
+    "analyze": pipeline.analyze_async,
+    "analyze_stream": _analysis_stream,
+    "next": plans.anext_item,
+    "store_handle": functools.partial(_off_loop, resumehandles.put),
+}
@@ -0,0 +1,272 @@
+# Deterministic, rule-based ATS scoring
+# Computes the same seven categories, weights and output schema as the LLM
+# prompt in calculate_ats_score, from the parsed resume dict and raw text.
+
+import re
+
+import sections
+from jobdescription import find_skills
+
+# Category weights (percent), matching the LLM prompt
+WEIGHTS = {
+    "contact_info": 10,
+    "keyword_density": 25,
+    "format_compatibility": 15,
+    "section_organization": 15,
+    "experience_quantification": 15,
+    "education_details": 10,
+    "skills_presence": 10,
+}
+
+EMAIL_RE = re.compile(r"[^@\s]+@[^@\s]+\.[A-Za-z]{2,}")
+PHONE_DIGITS_RE = re.compile(r"\d")
+METRIC_RE = re.compile(r"\d|%|\$|€|£")
+TABLE_LIKE_RE = re.compile(r"\S(?: {4,}|\t)\S")
+WORD_RE = re.compile(r"[a-z0-9+#.]+")
+
+ACTION_VERBS = {
+    "achieved", "built", "created", "delivered", "designed", "developed", "improved",
+    "increased", "launched", "led", "managed", "optimized", "reduced", "implemented",
+    "automated", "migrated", "mentored", "scaled", "streamlined", "architected",
+}
+
+# Widely screened-for terms, used to suggest missing keywords when no LLM is consulted
+COMMON_KEYWORDS = [
+    "agile", "git", "ci/cd", "testing", "sql", "rest api", "cloud", "docker",
+    "communication", "leadership", "problem solving", "collaboration",
+    "project management", "data analysis", "linux",
+]
+
+
+def _present(value):
+    if isinstance(value, str):
+        return bool(value.strip())
+    return bool(value)
+
+
+def _list(value):
+    return value if isinstance(value, list) else []
+
+
+def _skill_list(parsed_resume):
+    skills = []
+    technical = parsed_resume.get("technical_skills")
+    if isinstance(technical, dict):
+        for values in technical.values():
+            skills.extend(s for s in _list(values) if isinstance(s, str) and s.strip())
+    elif isinstance(technical, list):
+        skills.extend(s for s in technical if isinstance(s, str) and s.strip())
+    return skills
+
+
+def _score_contact(parsed_resume, notes):
+    score = 0
+    if _present(parsed_resume.get("full_name")):
+        score += 25
+    else:
+        notes["weaknesses"].append("Name could not be identified")
+        notes["suggestions"].append("Put your full name on its own line at the top of the resume")
+    email = parsed_resume.get("email") or ""
+    if EMAIL_RE.search(email):
+        score += 25
+    else:
+        notes["weaknesses"].append("No valid email address found")
+        notes["suggestions"].append("Add a professional email address in the header")
+    if len(PHONE_DIGITS_RE.findall(parsed_resume.get("phone") or "")) >= 7:
+        score += 25
+    else:
+        notes["weaknesses"].append("No phone number found")
+        notes["suggestions"].append("Add a phone number in the header")
+    if _present(parsed_resume.get("location")):
+        score += 25
+    else:
+        notes["suggestions"].append("Add your city and country so location filters can match you")
+    if score == 100:
+        notes["strengths"].append("Complete contact information (name, email, phone, location)")
+    return score
+
+
+def _described_text(parsed_resume):
+    """Experience bullets and project descriptions, where a keyword is used rather than just listed."""
+    parts = []
+    for job in _list(parsed_resume.get("work_experience")):
+        if isinstance(job, dict):
+            parts.extend(_list(job.get("achievements")))
+            parts.extend(_list(job.get("responsibilities")))
+    for project in _list(parsed_resume.get("projects")):
+        if isinstance(project, dict):
+            parts.append(project.get("description"))
+    return "\n".join(p for p in parts if isinstance(p, str))
+
+
+def _score_keywords(resume_data, parsed_resume, notes):
+    # Measured against a reference vocabulary (jobdescription.KNOWN_SKILLS), not
+    # the resume's own skills list: those were extracted from this same text
+    text = resume_data.lower()
+    recognized = find_skills(resume_data)
+    described = set(find_skills(_described_text(parsed_resume)))
+    in_context = [skill for skill in recognized if skill in described]
+
+    words = WORD_RE.findall(text)
+    verbs = {w for w in words if w in ACTION_VERBS}
+
+    score = min(100, 10 + 3 * len(recognized) + 4 * len(in_context) + 3 * len(verbs))
+    if len(recognized) >= 10 and len(in_context) >= 5:
+        notes["strengths"].append(f"Strong keyword coverage: {len(recognized)} recognized technical terms, "
+                                  f"{len(in_context)} of them used in experience or project descriptions")
+    elif len(recognized) < 5:
+        notes["weaknesses"].append("Few recognized technical keywords appear in the resume text")
+    if len(in_context) < len(recognized) / 2 or not recognized:
+        notes["suggestions"].append("Work the tools and technologies you use into your experience bullets")
+    if len(verbs) < 3:
+        notes["suggestions"].append("Start bullets with strong action verbs (developed, led, optimized...)")
+
+    missing = [k for k in COMMON_KEYWORDS if not sections.mentions(text, k)]
+    return score, recognized[:15], missing[:15]
+
+
+def _score_format(resume_data, notes):
+    issues = []
+    lines = [line for line in resume_data.splitlines() if line.strip()]
+    if not lines:
+        return 0, ["No readable text"]
+
+    non_ascii = sum(1 for c in resume_data if ord(c) > 127 and c not in "•–—’‘“”")
+    if non_ascii / max(len(resume_data), 1) > 0.02:
+        issues.append("Unusual special characters or symbols that ATS parsers may garble")
+    table_lines = sum(1 for line in lines if TABLE_LIKE_RE.search(line))
+    if table_lines / len(lines) > 0.2:
+        issues.append("Wide spacing suggests tables or multiple columns")
+    long_lines = sum(1 for line in lines if len(line) > 200)
+    if long_lines / len(lines) > 0.1:
+        issues.append("Very long lines; text may have been extracted out of order")
+    if len(resume_data) / len(lines) < 15:
+        issues.append("Text is fragmented into many short lines (possible text boxes or graphics)")
+
+    score = max(0, 100 - 25 * len(issues))
+    if not issues:
+        notes["strengths"].append("Clean, parseable text layout")
+    else:
+        notes["weaknesses"].append("Layout may not parse cleanly in ATS systems")
+        notes["suggestions"].append("Use a single-column layout without tables, text boxes or graphics")
+    return score, issues
+
+
+def _score_sections(resume_data, parsed_resume, notes):
+    score = 0
+    if _list(parsed_resume.get("work_experience")):
+        score += 30
+    else:
+        notes["weaknesses"].append("No work experience section detected")
+    if _list(parsed_resume.get("education")):
+        score += 25
+    else:
+        notes["weaknesses"].append("No education section detected")
+    if _skill_list(parsed_resume) or _list(parsed_resume.get("soft_skills")):
+        score += 25
+    else:
+        notes["weaknesses"].append("No skills section detected")
+
+    headings = sections.resume_sections(resume_data)
+    score += min(20, 5 * len(headings))
+    if len(headings) < 3:
+        notes["suggestions"].append("Use standard section headings such as Experience, Education and Skills")
+    if score >= 80:
+        notes["strengths"].append("Standard, well-organized resume sections")
+    return score
+
+
+def _score_quantification(parsed_resume, notes):
+    bullets = []
+    for job in _list(parsed_resume.get("work_experience")):
+        if isinstance(job, dict):
+            bullets.extend(_list(job.get("achievements")))
+            bullets.extend(_list(job.get("responsibilities")))
+    bullets = [b for b in bullets if isinstance(b, str) and b.strip()]
+    if not bullets:
+        notes["suggestions"].append("Describe each role with achievement bullets backed by numbers")
+        return 0
+
+    quantified = sum(1 for b in bullets if METRIC_RE.search(b))
+    ratio = quantified / len(bullets)
+    score = min(100, round(ratio * 150))
+    if ratio >= 0.5:
+        notes["strengths"].append(f"{quantified} of {len(bullets)} experience bullets are quantified")
+    else:
+        notes["weaknesses"].append("Most achievements are not quantified with metrics")
+        notes["suggestions"].append("Add numbers to achievements (percentages, revenue, users, time saved)")
+    return score
+
+
+def _score_education(parsed_resume, notes):
+    entries = [e for e in _list(parsed_resume.get("education")) if isinstance(e, dict)]
+    if not entries:
+        notes["suggestions"].append("Add an education section with degree, institution and graduation year")
+        return 0
+    fields = ("degree", "institution", "graduation_year")
+    complete = max(sum(1 for f in fields if _present(e.get(f))) for e in entries)
+    score = round(100 * complete / len(fields))
+    if score < 100:
+        notes["suggestions"].append("Include degree, institution and graduation year for each education entry")
+    return score
+
+
+def _score_skills(parsed_resume, notes):
+    technical = len(_skill_list(parsed_resume))
+    soft = len(_list(parsed_resume.get("soft_skills")))
+    score = min(70, technical * 7) + min(30, soft * 10)
+    if technical == 0:
+        notes["suggestions"].append("Add a dedicated technical skills section")
+    elif technical >= 10 and soft:
+        notes["strengths"].append("Technical and soft skills are clearly listed")
+    return score
+
+
+def score_resume(resume_data, parsed_resume):
+    """
+    Score a resume locally with the same schema as calculate_ats_score.
+
+    Args:
+        resume_data: String containing the raw resume text
+        parsed_resume: Dictionary with parsed resume data
+
+    Returns:
+        Dictionary containing overall_ats_score, category_scores and rule-based
+        strengths, weaknesses, suggestions, keyword analysis and format issues
+    """
+    parsed_resume = parsed_resume if isinstance(parsed_resume, dict) else {}
+    notes = {"strengths": [], "weaknesses": [], "suggestions": []}
+
+    keyword_score, present_keywords, missing_keywords = _score_keywords(resume_data, parsed_resume, notes)
+    format_score, format_issues = _score_format(resume_data, notes)
+    category_scores = {
+        "contact_info": _score_contact(parsed_resume, notes),
+        "keyword_density": keyword_score,
+        "format_compatibility": format_score,
+        "section_organization": _score_sections(resume_data, parsed_resume, notes),
+        "experience_quantification": _score_quantification(parsed_resume, notes),
+        "education_details": _score_education(parsed_resume, notes),
+        "skills_presence": _score_skills(parsed_resume, notes),
+    }
+    overall = round(sum(category_scores[name] * weight for name, weight in WEIGHTS.items()) / 100)
+
+    if overall >= 80:
+        summary = "The resume is highly ATS-compatible with complete, well-structured content."
+    elif overall >= 60:
+        summary = "The resume should pass most ATS systems, but the weaknesses listed below are worth fixing."
+    else:
+        summary = "The resume is likely to be filtered out by ATS systems; address the weaknesses below first."
+
+    return {
+        "overall_ats_score": overall,
+        "category_scores": category_scores,
+        "strengths": notes["strengths"][:5],
+        "weaknesses": notes["weaknesses"][:5],
+        "improvement_suggestions": notes["suggestions"][:7],
+        "keyword_analysis": {
+            "present_keywords": present_keywords,
+            "missing_keywords": missing_keywords,
+        },
+        "format_issues": format_issues,
+        "summary": summary,
+    }
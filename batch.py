@@ -0,0 +1,217 @@
+# Batch resume scoring
+# Processes many PDFs (a zip, a folder or a multi-file upload) against one job
+# description with bounded concurrency, yields one result per resume as it
+# finishes, then a ranked summary from the local matching engine.
+#
+# CLI: python batch.py resumes.zip --jd job.txt [--concurrency 4] [--feedback-top 3]
+
+import argparse
+import contextlib
+import json
+import os
+import sys
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from io import BytesIO
+
+import matching
+import pipeline
+import ratelimit
+import resultstore
+from resumeparser import ats_extractor, calculate_ats_score
+
+# Groq rate limits, not CPU, bound throughput; keep in-flight resumes modest
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", "200"))
+BATCH_MAX_FILE_BYTES = 5 * 1024 * 1024  # same per-resume cap as /process
+# Request size limit for /batch, and the most a zip may inflate to in total
+BATCH_MAX_UPLOAD_BYTES = int(os.getenv("BATCH_MAX_UPLOAD_MB", "100")) * 1024 * 1024
+
+
+class BatchError(Exception):
+    """Invalid batch input; the message is safe to show to the user."""
+
+
+def read_zip(data):
+    """
+    Return [(name, pdf_bytes)] for the PDFs in a zip archive, named by member path.
+
+    Raises:
+        BatchError: If the archive is invalid, has too many PDFs, an oversized
+            entry or inflates to more than BATCH_MAX_UPLOAD_BYTES in total
+    """
+    try:
+        archive = zipfile.ZipFile(BytesIO(data) if isinstance(data, bytes) else data)
+    except zipfile.BadZipFile:
+        raise BatchError("Invalid zip archive")
+
+    # Check the declared sizes before inflating anything (zip bombs); zipfile
+    # stops reading a member at its declared size, so they cannot be understated
+    members = []
+    total = 0
+    for info in archive.infolist():
+        name = info.filename
+        if info.is_dir() or name.startswith("__MACOSX/") or not name.lower().endswith(".pdf"):
+            continue
+        if info.file_size > BATCH_MAX_FILE_BYTES:
+            raise BatchError(f"{name} is larger than 5 MB")
+        if len(members) >= BATCH_MAX_FILES:
+            raise BatchError(f"Too many resumes (max {BATCH_MAX_FILES})")
+        total += info.file_size
+        if total > BATCH_MAX_UPLOAD_BYTES:
+            raise BatchError(f"Resumes in the archive exceed {BATCH_MAX_UPLOAD_BYTES // (1024 * 1024)} MB unzipped")
+        members.append(info)
+    try:
+        return [(info.filename, archive.read(info)) for info in members]
+    except (zipfile.BadZipFile, zipfile.LargeZipFile, NotImplementedError) as e:
+        raise BatchError(f"Invalid zip archive: {str(e)}")
+
+
+def _unique_names(files):
+    """Suffix repeated names (" (2)", " (3)", ...) so every resume keeps its own result."""
+    seen = set()
+    unique = []
+    for name, pdf_bytes in files:
+        candidate, count = name, 1
+        while candidate in seen:
+            count += 1
+            stem, ext = os.path.splitext(name)
+            candidate = f"{stem} ({count}){ext}"
+        seen.add(candidate)
+        unique.append((candidate, pdf_bytes))
+    return unique
+
+
+def _process_one(name, pdf_bytes):
+    with ratelimit.priority(ratelimit.BATCH):
+        data = pipeline.extract_resume_text(BytesIO(pdf_bytes))
+        parsed = pipeline.parse_extraction(ats_extractor(data))
+        ats_score = calculate_ats_score(data, parsed)
+    return data, parsed, ats_score
+
+
+def run_batch(files, job_description, concurrency=BATCH_CONCURRENCY, feedback_top=0):
+    """
+    Score a batch of resumes and rank them against a job description.
+
+    Args:
+        files: List of (name, pdf_bytes); repeated names get a " (2)"-style suffix
+        job_description: Job description string used for the final ranking
+        concurrency: Maximum resumes processed at once
+        feedback_top: Number of top-ranked resumes that also get an LLM job match analysis
+
+    Yields:
+        {"type": "result", ...} per resume in completion order (or
+        {"type": "error", ...} if it failed), then one {"type": "summary", ...}
+    """
+    index = matching.ResumeIndex()
+    text_by_name = {}
+    parsed_by_name = {}
+    ats_by_name = {}
+    failed = 0
+    files = _unique_names(files)
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="batch") as executor:
+        futures = {executor.submit(_process_one, name, pdf_bytes): name for name, pdf_bytes in files}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                data, parsed, ats_score = future.result()
+            except Exception as e:
+                failed += 1
+                yield {"type": "error", "file": name, "error": str(e)}
+                continue
+
+            index.add(name, parsed, data)
+            text_by_name[name] = data
+            parsed_by_name[name] = parsed
+            ats_by_name[name] = ats_score
+            yield {
+                "type": "result",
+                "file": name,
+                "full_name": parsed.get("full_name", ""),
+                "email": parsed.get("email", ""),
+                "ats_score": ats_score.get("overall_ats_score"),
+                "skills": matching.resume_skills(parsed),
+            }
+
+    ranking = []
+    if len(index):
+        index.build()
+        if feedback_top:
+            with ratelimit.priority(ratelimit.BATCH):
+                entries = matching.shortlist_feedback(
+                    index, parsed_by_name, job_description, top_n=len(index), feedback_n=feedback_top
+                )
+        else:
+            entries = index.rank(job_description, top_n=len(index))
+        for position, entry in enumerate(entries, 1):
+            name = entry["resume_id"]
+            resultstore.save(
+                text_by_name[name], job_description, parsed_by_name[name], ats_by_name[name], entry.get("job_match")
+            )
+            ranking.append({
+                "rank": position,
+                "file": name,
+                "full_name": parsed_by_name[name].get("full_name", ""),
+                "match_score": entry["coverage"],
+                "bm25": round(entry["score"], 4),
+                "ats_score": ats_by_name[name].get("overall_ats_score"),
+                "matching_skills": entry["matching_skills"],
+                "missing_skills": entry["missing_skills"],
+                **({"job_match": entry["job_match"]} if "job_match" in entry else {}),
+            })
+
+    yield {"type": "summary", "processed": len(index), "failed": failed, "ranking": ranking}
+
+
+def _collect_paths(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                for filename in sorted(names):
+                    if filename.lower().endswith(".pdf"):
+                        full = os.path.join(root, filename)
+                        with open(full, "rb") as f:
+                            files.append((os.path.relpath(full, path), f.read()))
+        elif path.lower().endswith(".zip"):
+            with open(path, "rb") as f:
+                files.extend(read_zip(f.read()))
+        else:
+            with open(path, "rb") as f:
+                files.append((os.path.basename(path), f.read()))
+    return files
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score and rank many resumes against one job description.")
+    parser.add_argument("inputs", nargs="+", help="PDF files, folders of PDFs or zip archives")
+    parser.add_argument("--jd", required=True, help="Path to a text file with the job description")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY)
+    parser.add_argument("--feedback-top", type=int, default=0,
+                        help="Get an LLM job match analysis for the N best-ranked resumes")
+    parser.add_argument("--output", help="Write NDJSON here instead of stdout")
+    args = parser.parse_args(argv)
+
+    with open(args.jd, encoding="utf-8") as f:
+        job_description = f.read().strip()
+    try:
+        files = _collect_paths(args.inputs)
+    except BatchError as e:
+        parser.error(str(e))
+
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        # Keep stdout clean NDJSON: pipeline logging goes to stderr
+        with contextlib.redirect_stdout(sys.stderr):
+            for record in run_batch(files, job_description, args.concurrency, args.feedback_top):
+                out.write(json.dumps(record) + "\n")
+                out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# Synthetic resume PDFs for benchmarking
+# Deterministic (seeded) resumes of a requested page count, written as minimal
+# single-font PDFs that pypdf can extract. No third-party dependencies.
+
+import random
+import textwrap
+
+FIRST_NAMES = ["Alex", "Priya", "Jordan", "Mei", "Samuel", "Fatima", "Lucas", "Aiko", "Daniel", "Zara"]
+LAST_NAMES = ["Nguyen", "Sharma", "Garcia", "Okafor", "Kowalski", "Chen", "Silva", "Haddad", "Moreau", "Ito"]
+COMPANIES = ["Acme Corp", "Globex", "Initech", "Umbrella Labs", "Stark Industries", "Wayne Tech",
+             "Hooli", "Vandelay Imports", "Cyberdyne", "Soylent Systems"]
+TITLES = ["Software Engineer", "Senior Software Engineer", "Data Engineer", "Backend Developer",
+          "Machine Learning Engineer", "DevOps Engineer", "Full Stack Developer", "Tech Lead"]
+SKILLS = ["Python", "Go", "Java", "TypeScript", "React", "Flask", "Django", "PostgreSQL", "Redis",
+          "Docker", "Kubernetes", "AWS", "GCP", "Terraform", "Kafka", "Spark", "Airflow", "Git",
+          "CI/CD", "GraphQL", "REST APIs", "Linux", "SQL", "Pandas", "PyTorch"]
+VERBS = ["Built", "Designed", "Led", "Optimized", "Migrated", "Automated", "Scaled", "Reduced", "Launched"]
+OBJECTS = ["a payments API", "the search service", "an event pipeline", "the CI system",
+           "a recommendation model", "the data warehouse", "an internal admin tool", "the mobile backend"]
+
+LINES_PER_PAGE = 48
+LINE_WIDTH = 95
+
+
+def _bullet(rng):
+    return (f"- {rng.choice(VERBS)} {rng.choice(OBJECTS)} using {rng.choice(SKILLS)} and "
+            f"{rng.choice(SKILLS)}, improving throughput by {rng.randint(10, 90)}% for "
+            f"{rng.randint(2, 500)}k users")
+
+
+def resume_lines(pages, seed=0):
+    """Return the text lines of a synthetic resume filling roughly `pages` pages."""
+    rng = random.Random(seed)
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    lines = [
+        name,
+        f"{name.lower().replace(' ', '.')}@example.com | +1 555 {rng.randint(100, 999)} {rng.randint(1000, 9999)}"
+        " | Berlin, Germany",
+        "",
+        "Summary",
+        *textwrap.wrap(
+            f"{rng.choice(TITLES)} with {rng.randint(2, 15)} years of experience building reliable, "
+            "well-tested backend systems and data platforms.", LINE_WIDTH),
+        "",
+        "Skills",
+        ", ".join(rng.sample(SKILLS, 12)),
+        "",
+        "Education",
+        f"BSc Computer Science, Technical University, {rng.randint(2005, 2020)}",
+        "",
+        "Experience",
+    ]
+    year = 2024
+    target = pages * LINES_PER_PAGE
+    while len(lines) < target:
+        start = year - rng.randint(1, 4)
+        lines.append(f"{rng.choice(TITLES)}, {rng.choice(COMPANIES)}, {start} - {year}")
+        for _ in range(rng.randint(3, 6)):
+            lines.extend(textwrap.wrap(_bullet(rng), LINE_WIDTH, subsequent_indent="  "))
+        lines.append("")
+        year = start
+    return lines[:target]
+
+
+def make_pdf(lines):
+    """Build a minimal PDF with LINES_PER_PAGE lines of Helvetica text per page."""
+    pages = [lines[i:i + LINES_PER_PAGE] for i in range(0, len(lines), LINES_PER_PAGE)] or [[]]
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        ("<< /Type /Pages /Kids [%s] /Count %d >>" % (
+            " ".join(f"{4 + 2 * i} 0 R" for i in range(len(pages))), len(pages))).encode(),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for i, page in enumerate(pages):
+        ops = ["BT /F1 10 Tf 40 800 Td 15 TL"]
+        for line in page:
+            escaped = line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+            ops.append(f"({escaped}) Tj T*")
+        ops.append("ET")
+        content = "\n".join(ops).encode("latin-1", "replace")
+        objects.append((f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+                        f"/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * i} 0 R >>").encode())
+        objects.append(b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    for offset in offsets:
+        out += f"{offset:010d} 00000 n \n".encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(out)
+
+
+def build_corpus(page_counts, per_size, seed=0):
+    """
+    Generate resumes for each page count.
+
+    Returns:
+        List of (name, pages, pdf_bytes)
+    """
+    corpus = []
+    for pages in page_counts:
+        for i in range(per_size):
+            resume_seed = seed * 100003 + pages * 1009 + i
+            corpus.append((f"resume_{pages}p_{i:03d}.pdf", pages, make_pdf(resume_lines(pages, resume_seed))))
+    return corpus
@@ -0,0 +1,219 @@
+# Fake OpenAI-compatible chat completions server for offline benchmarks
+# Answers POST /chat/completions (streaming or not) with canned JSON for each
+# prompt the app sends, after a simulated delay:
+#   latency + completion_tokens / tokens_per_second
+# Streaming responses pace their chunks at the same token rate.
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PARSED_RESUME = {
+    "full_name": "Alex Nguyen", "email": "alex.nguyen@example.com", "phone": "+1 555 123 4567",
+    "location": "Berlin, Germany", "linkedin_url": "", "github_url": "", "portfolio_url": "",
+    "summary": "Software Engineer with 8 years of experience building backend systems.",
+    "education": [{"degree": "BSc Computer Science", "institution": "Technical University",
+                   "graduation_year": "2015", "gpa": "", "relevant_coursework": ""}],
+    "projects": [], "leadership_roles": [], "volunteering_experience": [],
+    "technical_skills": {"programming_languages": ["Python", "Go", "SQL"], "frameworks": ["Flask", "React"],
+                         "tools": ["Docker", "Git"], "databases": ["PostgreSQL", "Redis"],
+                         "cloud_platforms": ["AWS"], "other_technical_skills": ["CI/CD"]},
+    "soft_skills": ["Communication", "Leadership"], "certifications": [], "awards_and_achievements": [],
+    "languages": [{"language_name": "English", "proficiency_level": "Fluent"}], "publications": [],
+}
+
+JOB_MATCH = {
+    "overall_match_score": 74,
+    "category_scores": {"skills_match": 80, "experience_match": 75, "education_match": 70, "keyword_match": 68},
+    "matching_skills": ["Python", "PostgreSQL", "Docker"], "missing_skills": ["Kubernetes"],
+    "matching_keywords": ["backend", "APIs"], "missing_keywords": ["microservices"],
+    "strengths": ["Relevant backend experience"], "recommendations": ["Mention Kubernetes experience"],
+    "summary": "Good match with a few missing skills.",
+}
+
+JD_ANALYSIS = {
+    "title": "Backend Engineer", "seniority": "senior",
+    "required_skills": ["Python", "PostgreSQL", "Docker", "REST API"], "preferred_skills": ["Kubernetes", "AWS"],
+    "keywords": ["backend", "APIs", "microservices"], "min_years_experience": 5, "education": "bachelor",
+}
+
+ATS_SCORE = {
+    "overall_ats_score": 78,
+    "category_scores": {"contact_info": 100, "keyword_density": 70, "format_compatibility": 85,
+                        "section_organization": 80, "experience_quantification": 70,
+                        "education_details": 70, "skills_presence": 80},
+    "strengths": ["Clear sections"], "weaknesses": ["Few metrics"],
+    "improvement_suggestions": ["Quantify achievements"],
+    "keyword_analysis": {"present_keywords": ["Python"], "missing_keywords": ["Agile"]},
+    "format_issues": [], "summary": "Mostly ATS-friendly.",
+}
+
+ATS_FEEDBACK = {
+    "strengths": ["Clear sections", "Relevant skills listed"], "weaknesses": ["Few metrics"],
+    "improvement_suggestions": ["Quantify achievements", "Add a projects section"],
+    "missing_keywords": ["Agile", "Microservices"], "summary": "Mostly ATS-friendly.",
+}
+
+
+def _estimate_tokens(text):
+    return max(1, len(text) // 4)
+
+
+def _answer(messages):
+    """Pick the canned response for a prompt by its system message."""
+    system = messages[0]["content"] if messages else ""
+    user = messages[-1]["content"] if messages else ""
+    if "malformed JSON" in system:
+        return user
+    if "HR analyst" in system:
+        return json.dumps(JOB_MATCH)
+    if "technical recruiter" in system:
+        return json.dumps(JD_ANALYSIS)
+    if "already computed" in system:
+        return json.dumps(ATS_FEEDBACK)
+    if "ATS" in system:
+        return json.dumps(ATS_SCORE)
+    # Extraction: one work_experience entry per ~1500 input characters, like a real resume
+    jobs = max(1, min(12, len(user) // 1500))
+    parsed = dict(PARSED_RESUME, work_experience=[
+        {"company_name": f"Company {i}", "job_title": "Software Engineer", "start_date": str(2020 - 2 * i),
+         "end_date": str(2022 - 2 * i), "responsibilities": ["Built and operated backend services"],
+         "achievements": [f"Reduced latency by {10 + i}%"]}
+        for i in range(jobs)
+    ])
+    return json.dumps(parsed)
+
+
+class _Server(ThreadingHTTPServer):
+    # The default listen backlog of 5 drops connections when many calls start at once
+    request_queue_size = 256
+
+
+class FakeGroqServer:
+    """
+    Threaded fake Groq server on localhost.
+
+    Usage:
+        with FakeGroqServer(latency=0.2, tokens_per_second=500) as server:
+            llmclient.configure(api_key="bench", base_url=server.base_url)
+    """
+
+    def __init__(self, latency=0.2, tokens_per_second=500.0, host="127.0.0.1", port=0):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = _Server((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                # models.list(), which llmclient.warm() uses to open a connection
+                if not self.path.endswith("/models"):
+                    self.send_error(404)
+                    return
+                payload = json.dumps({"object": "list", "data": []}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_POST(self):
+                if not self.path.endswith("/chat/completions"):
+                    self.send_error(404)
+                    return
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                with server._lock:
+                    server.requests += 1
+                server._respond(self, body)
+
+        return Handler
+
+    def _respond(self, handler, body):
+        messages = body.get("messages", [])
+        content = _answer(messages)
+        prompt_tokens = sum(_estimate_tokens(m.get("content", "")) for m in messages)
+        completion_tokens = _estimate_tokens(content)
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                 "total_tokens": prompt_tokens + completion_tokens}
+        base = {"id": "chatcmpl-bench", "created": int(time.time()), "model": body.get("model", "")}
+
+        time.sleep(self.latency)
+        if not body.get("stream"):
+            time.sleep(completion_tokens / self.tokens_per_second)
+            payload = json.dumps(dict(base, object="chat.completion", usage=usage, choices=[
+                {"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}
+            ])).encode()
+            handler.send_response(200)
+            handler.send_header("Content-Type", "application/json")
+            handler.send_header("Content-Length", str(len(payload)))
+            handler.end_headers()
+            handler.wfile.write(payload)
+            return
+
+        handler.send_response(200)
+        handler.send_header("Content-Type", "text/event-stream")
+        handler.send_header("Transfer-Encoding", "chunked")
+        handler.end_headers()
+        step = 16  # characters (~4 tokens) per chunk
+        for i in range(0, len(content), step):
+            piece = content[i:i + step]
+            time.sleep(_estimate_tokens(piece) / self.tokens_per_second)
+            chunk = dict(base, object="chat.completion.chunk", choices=[
+                {"index": 0, "delta": {"content": piece}, "finish_reason": None}
+            ])
+            self._write_chunk(handler, f"data: {json.dumps(chunk)}\n\n".encode())
+        last = dict(base, object="chat.completion.chunk", x_groq={"usage": usage}, choices=[
+            {"index": 0, "delta": {}, "finish_reason": "stop"}
+        ])
+        self._write_chunk(handler, f"data: {json.dumps(last)}\n\ndata: [DONE]\n\n".encode())
+        self._write_chunk(handler, b"")
+
+    @staticmethod
+    def _write_chunk(handler, data):
+        handler.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        handler.wfile.flush()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fakegroq", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the fake Groq server on its own.")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=500.0)
+    args = parser.parse_args()
+    server = FakeGroqServer(args.latency, args.tokens_per_second, port=args.port)
+    print(f"Fake Groq server on {server.base_url} (set GROQ_BASE_URL to this)")
+    server._server.serve_forever()
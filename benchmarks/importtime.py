@@ -0,0 +1,107 @@
+# Cold-start benchmark
+# Imports each entry module in a fresh interpreter with `python -X importtime`
+# and reports the median import time and the heaviest packages it pulled in,
+# so a new eager import of a heavy dependency shows up before it slows down
+# every worker boot. Runs without GROQ_API_KEY: importing must not need it.
+#
+#   python -m benchmarks.importtime
+#   python -m benchmarks.importtime --modules app,asgi --runs 10 --budget 0.5 --json out.json
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+DEFAULT_MODULES = "resumeparser,pipeline,app,asgi"
+
+
+def import_profile(module):
+    """
+    Import module in a fresh interpreter.
+
+    Returns:
+        Tuple of (seconds to import module, {name: cumulative seconds} for every
+        module imported on its behalf), from the -X importtime report
+    """
+    env = {k: v for k, v in os.environ.items() if k != "GROQ_API_KEY"}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=env,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+
+    # Entries are listed children first, so module's dependencies are the
+    # indented lines between the previous top-level entry and module's own
+    subtree = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or line.count("|") != 2:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue  # the header line
+        seconds = int(cumulative) / 1e6
+        top_level = not name[1:].startswith(" ")
+        if top_level and name.strip() == module:
+            return seconds, subtree
+        if top_level:
+            subtree = {}  # interpreter startup (site, encodings), not ours
+        else:
+            subtree[name.strip()] = max(seconds, subtree.get(name.strip(), 0.0))
+    raise RuntimeError(f"import {module} did not appear in the -X importtime report")
+
+
+def heaviest_packages(subtree, top=5):
+    """Top-level packages in an import subtree, by cumulative time."""
+    totals = {}
+    for name, seconds in subtree.items():
+        package = name.split(".")[0]
+        totals[package] = max(seconds, totals.get(package, 0.0))
+    return sorted(totals.items(), key=lambda item: -item[1])[:top]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure cold import time of the app's entry modules.")
+    parser.add_argument("--modules", default=DEFAULT_MODULES, help="Comma-separated modules to import")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per module")
+    parser.add_argument("--top", type=int, default=5, help="Heaviest packages to list per module")
+    parser.add_argument("--budget", type=float, help="Exit with status 1 if a median import exceeds this (s)")
+    parser.add_argument("--json", help="Write the results to this file as JSON")
+    args = parser.parse_args(argv)
+
+    results = []
+    header = f"{'module':<14}{'runs':>6}{'median s':>10}{'min s':>9}{'max s':>9}  heaviest imports"
+    print(header)
+    print("-" * len(header))
+    for module in args.modules.split(","):
+        times = []
+        subtree = {}
+        for _ in range(args.runs):
+            seconds, subtree = import_profile(module)
+            times.append(seconds)
+        heaviest = heaviest_packages(subtree, args.top)
+        row = {
+            "module": module, "runs": args.runs, "median": statistics.median(times),
+            "min": min(times), "max": max(times),
+            "heaviest": [{"package": name, "seconds": seconds} for name, seconds in heaviest],
+        }
+        results.append(row)
+        packages = ", ".join(f"{name} {seconds:.3f}" for name, seconds in heaviest)
+        print(f"{module:<14}{args.runs:>6}{row['median']:>10.3f}{row['min']:>9.3f}{row['max']:>9.3f}  {packages}",
+              flush=True)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"settings": vars(args), "results": results}, f, indent=2)
+
+    over = [row["module"] for row in results if args.budget is not None and row["median"] > args.budget]
+    if over:
+        print(f"\nOver the {args.budget}s budget: {', '.join(over)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+# Offline benchmark for the resume pipeline
+# Starts the fake Groq server, generates a synthetic PDF corpus and drives either
+# the /process route (through the Flask test client) or the resumeparser
+# functions directly at each requested concurrency. Needs no network access.
+#
+#   python -m benchmarks.run --pages 1,2,5 --per-size 20 --concurrency 1,4,8
+#   python -m benchmarks.run --target functions --latency 0.5 --tokens-per-second 300 --json out.json
+#
+# The client-side rate limiter runs with its default quotas, as in production;
+# --no-rate-limit measures the pipeline alone.
+
+import argparse
+import contextlib
+import json
+import math
+import os
+import resource
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from benchmarks.corpus import build_corpus
+from benchmarks.fakegroq import FakeGroqServer
+
+# The app modules are imported lazily, after these are set
+os.environ.setdefault("GROQ_API_KEY", "bench")
+os.environ.setdefault("CACHE_BACKEND", "off")  # measure the pipeline, not the cache
+
+JOB_DESCRIPTION = (
+    "We are hiring a Senior Backend Engineer with strong Python and Go, PostgreSQL, Redis, "
+    "Docker and Kubernetes experience, building REST APIs and event pipelines on AWS."
+)
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def _seconds(value):
+    return f"{value:9.3f}" if value is not None else f"{'-':>9}"
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process and of its (PDF pool) children, in MB."""
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return round(own / 1024, 1), round(children / 1024, 1)  # ru_maxrss is in KB on Linux
+
+
+def _process_runner():
+    import app
+
+    local = threading.local()
+
+    def run(pdf_bytes):
+        if not hasattr(local, "client"):
+            local.client = app.app.test_client()
+        response = local.client.post(
+            "/process",
+            data={"pdf_doc": (BytesIO(pdf_bytes), "resume.pdf"), "job_description": JOB_DESCRIPTION},
+            content_type="multipart/form-data",
+        )
+        # Errors are rendered into the page too; a finished analysis has the ATS panel
+        if response.status_code != 200 or "ATS Compatibility Score" not in response.get_data(as_text=True):
+            raise RuntimeError(f"/process failed with status {response.status_code}")
+
+    return run
+
+
+def _functions_runner(corpus):
+    import pipeline
+    from resumeparser import ats_extractor, calculate_ats_score, calculate_job_match
+
+    # PDF extraction is not part of this target; do it once up front
+    texts = {pdf_bytes: pipeline.extract_resume_text(BytesIO(pdf_bytes)) for _, _, pdf_bytes in corpus}
+
+    def run(pdf_bytes):
+        data = texts[pdf_bytes]
+        parsed = pipeline.parse_extraction(ats_extractor(data))
+        calculate_ats_score(data, parsed)
+        calculate_job_match(data, parsed, JOB_DESCRIPTION)
+
+    return run
+
+
+def run_scenario(run, pdfs, concurrency):
+    """Run every pdf through run() with the given concurrency; return latencies, errors and wall time."""
+    latencies, errors = [], 0
+    lock = threading.Lock()
+
+    def timed(pdf_bytes):
+        nonlocal errors
+        start = time.perf_counter()
+        try:
+            run(pdf_bytes)
+        except Exception:
+            with lock:
+                errors += 1
+            return
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(timed, pdfs))
+    return latencies, errors, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the resume pipeline against a fake Groq server.")
+    parser.add_argument("--target", choices=("process", "functions"), default="process",
+                        help="Drive the /process route or the resumeparser functions directly")
+    parser.add_argument("--pages", default="1,2,5", help="Comma-separated resume page counts")
+    parser.add_argument("--per-size", type=int, default=10, help="Resumes per page count")
+    parser.add_argument("--concurrency", default="1,4", help="Comma-separated concurrency levels")
+    parser.add_argument("--latency", type=float, default=0.2, help="Fake server seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=500.0, help="Fake server output token rate")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--write-corpus", help="Also save the generated PDFs to this directory")
+    parser.add_argument("--json", help="Write the results to this file as JSON")
+    parser.add_argument("--no-rate-limit", action="store_true", help="Turn the client-side rate limiter off")
+    args = parser.parse_args(argv)
+    if args.no_rate_limit:
+        os.environ["RATE_LIMIT_BACKEND"] = "off"
+
+    page_counts = [int(p) for p in args.pages.split(",")]
+    levels = [int(c) for c in args.concurrency.split(",")]
+    corpus = build_corpus(page_counts, args.per_size, seed=args.seed)
+    if args.write_corpus:
+        os.makedirs(args.write_corpus, exist_ok=True)
+        for name, _, pdf_bytes in corpus:
+            with open(os.path.join(args.write_corpus, name), "wb") as f:
+                f.write(pdf_bytes)
+
+    results = []
+    out = sys.stdout
+    # Keep the results table clean: pipeline logging goes to stderr
+    with FakeGroqServer(args.latency, args.tokens_per_second) as server, contextlib.redirect_stdout(sys.stderr):
+        import llmclient
+
+        run = _process_runner() if args.target == "process" else _functions_runner(corpus)
+        llmclient.configure(base_url=server.base_url)
+        run(corpus[0][2])  # warm up: client pool, templates, imports
+
+        header = (f"{'target':<10}{'pages':>6}{'conc':>6}{'n':>5}{'err':>5}{'p50 s':>9}{'p95 s':>9}"
+                  f"{'p99 s':>9}{'rps/worker':>12}{'rss MB':>9}{'child MB':>10}")
+        print(header, file=out)
+        print("-" * len(header), file=out)
+        for concurrency in levels:
+            for pages in page_counts:
+                pdfs = [pdf for _, p, pdf in corpus if p == pages]
+                latencies, errors, wall = run_scenario(run, pdfs, concurrency)
+                rss, child_rss = peak_rss_mb()
+                row = {
+                    "target": args.target, "pages": pages, "concurrency": concurrency,
+                    "requests": len(pdfs), "errors": errors,
+                    "p50": percentile(latencies, 50) if latencies else None,
+                    "p95": percentile(latencies, 95) if latencies else None,
+                    "p99": percentile(latencies, 99) if latencies else None,
+                    "rps_per_worker": len(latencies) / wall if wall else 0.0,
+                    "peak_rss_mb": rss, "peak_child_rss_mb": child_rss,
+                }
+                results.append(row)
+                print(f"{args.target:<10}{pages:>6}{concurrency:>6}{len(pdfs):>5}{errors:>5}"
+                      f"{_seconds(row['p50'])}{_seconds(row['p95'])}{_seconds(row['p99'])}"
+                      f"{row['rps_per_worker']:>12.2f}{rss:>9}{child_rss:>10}", file=out, flush=True)
+        print(f"\nFake Groq server handled {server.requests} calls "
+              f"(latency {args.latency}s, {args.tokens_per_second:g} tokens/s)", file=out)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"settings": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
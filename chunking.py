@@ -0,0 +1,165 @@
+# Chunked extraction support for long resumes
+# A resume whose text is over CHUNK_TOKENS is split on section headings into
+# chunks under that budget, each chunk is extracted on its own (see
+# resumeparser.ats_extractor) and the partial results are merged back into a
+# single resume dict. The merge is deterministic: chunks are merged in document
+# order and repeated list entries (the same job or project seen in two chunks)
+# are folded together.
+
+import json
+import os
+import re
+
+import sections
+from prompts import estimate_tokens
+
+# Input tokens per extraction call. Kept well under the extractor's max_tokens
+# so the JSON for one chunk always fits in a single response.
+CHUNK_TOKENS = int(os.getenv("CHUNK_TOKENS", "2500"))
+CHUNK_WORKERS = int(os.getenv("CHUNK_WORKERS", "4"))
+
+# Fields that identify the same entry when it shows up in more than one chunk
+ENTRY_IDENTITY = {
+    "education": ("degree", "institution"),
+    "work_experience": ("company_name", "job_title", "start_date"),
+    "projects": ("project_name",),
+    "leadership_roles": ("role_title", "organization"),
+    "volunteering_experience": ("organization", "role"),
+    "certifications": ("certification_name",),
+    "awards_and_achievements": ("award_name",),
+    "languages": ("language_name",),
+    "publications": ("title",),
+}
+
+
+def needs_chunking(text):
+    """True if text is too long for a single extraction call."""
+    return estimate_tokens(text) > CHUNK_TOKENS
+
+
+def split_sections(text):
+    """Split resume text into blocks, each starting at a section heading (the first holds the header)."""
+    blocks, current = [], []
+    for line in text.splitlines():
+        if sections.resume_section(line) and any(l.strip() for l in current):
+            blocks.append("\n".join(current).strip())
+            current = []
+        current.append(line)
+    if any(l.strip() for l in current):
+        blocks.append("\n".join(current).strip())
+    return blocks
+
+
+def _split_block(block, budget):
+    """Split one oversized section on paragraph, then line, boundaries; continuations repeat the heading."""
+    lines = block.splitlines()
+    # "Skills: Python, Go" continues as "Skills (continued)"
+    heading = lines[0].split(":")[0].strip() if lines and sections.resume_section(lines[0]) else ""
+    prefix = f"{heading} (continued)\n" if heading else ""
+
+    units = []
+    for paragraph in re.split(r"\n\s*\n", block):
+        if estimate_tokens(paragraph) <= budget:
+            units.append(paragraph)
+            continue
+        for line in paragraph.splitlines():
+            # A single line over budget (text extracted without line breaks) is cut by characters
+            step = budget * 4
+            units.extend(line[i:i + step] for i in range(0, len(line), step))
+
+    return [
+        piece if i == 0 else prefix + piece
+        for i, piece in enumerate(_pack(units, budget - estimate_tokens(prefix), "\n\n"))
+    ]
+
+
+def _pack(units, budget, separator):
+    """Greedily join consecutive units into pieces of at most budget tokens."""
+    pieces, current, current_tokens = [], [], 0
+    for unit in units:
+        tokens = estimate_tokens(unit)
+        if current and current_tokens + tokens > budget:
+            pieces.append(separator.join(current))
+            current, current_tokens = [], 0
+        current.append(unit)
+        current_tokens += tokens
+    if current:
+        pieces.append(separator.join(current))
+    return pieces
+
+
+def chunk_text(text, budget=None):
+    """
+    Split resume text into chunks of at most budget tokens, on section boundaries where possible.
+
+    Args:
+        text: Resume text
+        budget: Token budget per chunk (default: CHUNK_TOKENS)
+
+    Returns:
+        List of chunk strings in document order
+    """
+    budget = budget or CHUNK_TOKENS
+    blocks = []
+    for block in split_sections(text):
+        if estimate_tokens(block) > budget:
+            blocks.extend(_split_block(block, budget))
+        else:
+            blocks.append(block)
+    return _pack(blocks, budget, "\n\n")
+
+
+def _is_empty(value):
+    return value in ("", None, [], {}) or (isinstance(value, str) and not value.strip())
+
+
+def _identity(value, fields):
+    if isinstance(value, dict):
+        key = tuple(" ".join(str(value.get(f) or "").lower().split()) for f in fields)
+        if any(key):
+            return key
+    if isinstance(value, str):
+        return " ".join(value.lower().split())
+    return json.dumps(value, sort_keys=True)
+
+
+def _merge(name, first, second):
+    """Merge two values for the same field; the earlier chunk wins on conflicting scalars."""
+    if isinstance(first, dict) and isinstance(second, dict):
+        merged = dict(first)
+        for key, value in second.items():
+            merged[key] = _merge(key, merged[key], value) if key in merged else value
+        return merged
+    if isinstance(first, list) and isinstance(second, list):
+        fields = ENTRY_IDENTITY.get(name, ())
+        merged, positions = [], {}
+        for item in first + second:
+            if _is_empty(item):
+                continue
+            key = _identity(item, fields)
+            if key in positions:
+                merged[positions[key]] = _merge(None, merged[positions[key]], item)
+            else:
+                positions[key] = len(merged)
+                merged.append(item)
+        return merged
+    return second if _is_empty(first) else first
+
+
+def merge_extractions(partials):
+    """
+    Merge the parsed extraction results of several chunks of one resume.
+
+    Args:
+        partials: Parsed ats_extractor dicts, in document order
+
+    Returns:
+        One dict with the usual extraction schema: scalar fields take the first
+        non-empty value, lists are concatenated with repeated entries merged
+    """
+    merged = {}
+    for partial in partials:
+        if isinstance(partial, dict):
+            for key, value in partial.items():
+                merged[key] = _merge(key, merged[key], value) if key in merged else value
+    return merged
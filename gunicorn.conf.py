@@ -0,0 +1,35 @@
+# Gunicorn settings (read automatically from the working directory)
+# With GUNICORN_PRELOAD the app is imported once in the master and warmed up
+# (app.warmup) before the workers fork, so every worker starts with the heavy
+# imports done, sharing those pages copy-on-write. Each worker then opens its
+# own Groq connections: pooled sockets must not be shared across a fork.
+
+import os
+
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() in ("true", "1", "yes")
+# Open a Groq connection in each new worker so its first request skips the TLS handshake
+WARM_CONNECTIONS = os.getenv("WARM_CONNECTIONS", "true").lower() in ("true", "1", "yes")
+
+
+def when_ready(server):
+    if preload_app:
+        import app
+
+        app.warmup()
+
+
+def post_fork(server, worker):
+    import llmclient
+
+    llmclient.reset()
+
+
+def post_worker_init(worker):
+    import jobs
+
+    # Job worker threads must start after the fork; the master's would not survive it
+    jobs.start_shared_workers()
+    if WARM_CONNECTIONS:
+        import llmclient
+
+        llmclient.warm()
@@ -0,0 +1,346 @@
+# Job description analysis
+# A job description is reduced once to a compact structured form (required and
+# preferred skills, seniority, keywords, experience and education asks). The
+# analysis is cached by the normalized JD text (see resumeparser), so scoring
+# many resumes against the same job sends only this summary to the model, or
+# with JOB_MATCH_MODE=local skips the model entirely (local_job_match).
+#
+# This module holds the deterministic parts: the heuristic analyzer used when
+# JD_ANALYSIS_MODE=local (or the model call fails) and the local matcher.
+
+import datetime
+import re
+
+import sections
+from matching import SKILL_ALIASES, normalize_skill, resume_skills
+
+# Job match category weights (percent) used by local_job_match
+MATCH_WEIGHTS = {
+    "skills_match": 40,
+    "experience_match": 25,
+    "education_match": 10,
+    "keyword_match": 25,
+}
+
+# Skills the heuristic analyzer recognizes in a job description (plus every SKILL_ALIASES spelling)
+KNOWN_SKILLS = [
+    "python", "java", "javascript", "typescript", "go", "rust", "c", "c++", "c#", "ruby", "php", "scala",
+    "kotlin", "swift", "r", "sql", "bash", "html", "css",
+    "react", "angular", "vue", "node.js", "django", "flask", "fastapi", "spring", "spring boot", ".net",
+    "rails", "express", "next.js", "graphql", "rest api", "grpc",
+    "postgresql", "mysql", "mongodb", "redis", "elasticsearch", "cassandra", "dynamodb", "sqlite",
+    "snowflake", "bigquery",
+    "aws", "gcp", "azure", "docker", "kubernetes", "terraform", "ansible", "jenkins", "ci/cd",
+    "github actions", "linux", "git", "kafka", "rabbitmq", "spark", "hadoop", "airflow",
+    "machine learning", "deep learning", "nlp", "computer vision", "pytorch", "tensorflow",
+    "scikit-learn", "pandas", "numpy", "llm", "data analysis", "statistics", "tableau", "power bi",
+    "excel", "microservices", "distributed systems", "system design", "agile", "scrum", "testing",
+    "unit testing", "security", "networking",
+    "communication", "leadership", "mentoring", "collaboration", "problem solving",
+    "project management", "stakeholder management",
+]
+
+SENIORITY_LEVELS = ["intern", "junior", "mid", "senior", "lead", "principal"]
+
+_SENIORITY_RE = [
+    ("principal", re.compile(r"\b(principal|staff|distinguished|architect|head of|director)\b")),
+    ("lead", re.compile(r"\b(lead|tech lead|team lead|manager)\b")),
+    ("senior", re.compile(r"\b(senior|sr\.?)\b")),
+    ("junior", re.compile(r"\b(junior|jr\.?|entry[- ]level|graduate|new grad)\b")),
+    ("intern", re.compile(r"\b(intern|internship|trainee)\b")),
+    ("mid", re.compile(r"\b(mid[- ]level|intermediate)\b")),
+]
+_YEARS_RE = re.compile(r"(\d{1,2})\s*\+?\s*(?:(?:-|to)\s*\d{1,2}\s*)?years?", re.IGNORECASE)
+_YEAR_RE = re.compile(r"\b(19[5-9]\d|20\d\d)\b")
+_PRESENT_RE = re.compile(r"\b(present|current|now|today|ongoing)\b", re.IGNORECASE)
+
+# Highest degree asked for or held, lowest value first
+EDUCATION_LEVELS = {"bachelor": 1, "master": 2, "phd": 3}
+_EDUCATION_RE = [
+    ("phd", re.compile(r"\b(ph\.?\s?d|doctorate|doctoral)\b", re.IGNORECASE)),
+    ("master", re.compile(r"\b(master'?s?|m\.?s\.?c?|m\.?tech|mba|m\.?eng)\b", re.IGNORECASE)),
+    ("bachelor", re.compile(r"\b(bachelor'?s?|b\.?s\.?c?|b\.?tech|b\.e\.?|b\.a\.?|undergraduate|degree)\b",
+                            re.IGNORECASE)),
+]
+
+# Headings that open a block of required (including the role's duties) or preferred qualifications
+_REQUIRED_HEADING_RE = sections.heading_pattern(
+    r"requirements|required|qualifications|minimum qualifications|basic qualifications|must[- ]haves?|"
+    r"what you(?:'ll)? (?:need|bring|do)|who you are|skills|you have|responsibilities|the role"
+)
+_PREFERRED_HEADING_RE = sections.heading_pattern(
+    r"preferred|nice[- ]to[- ]haves?|bonus|desired|good to have|preferred qualifications|pluses|extra credit"
+)
+# Headings of blocks whose skill mentions are not asks ("About us: we run on AWS")
+_IGNORED_HEADING_RE = sections.heading_pattern(
+    r"about (?:us|the company|the team)|who we are|benefits|perks|what we offer|compensation|salary"
+)
+# Inline markers of an optional skill ("Kafka is a plus")
+_PREFERRED_INLINE_RE = re.compile(r"\b(a plus|nice to have|preferred|bonus|ideally|desirable)\b", re.IGNORECASE)
+
+_WORD_RE = re.compile(r"[a-z][a-z0-9+#./-]{3,}")
+_STOP_WORDS = {
+    "about", "ability", "able", "also", "across", "and", "are", "based", "been", "being", "build", "building",
+    "candidate", "company", "role", "team", "teams", "that", "their", "them", "they", "this", "those", "what",
+    "when", "where", "which", "while", "will", "with", "within", "work", "working", "would", "your",
+    "years", "year", "experience", "including", "strong", "skills", "knowledge", "from", "have", "into",
+    "more", "must", "other", "over", "such", "than", "using", "well", "want", "join", "looking", "help",
+    "good", "great", "plus", "preferred", "required", "requirements", "qualifications", "responsibilities",
+    "opportunity", "equal", "employer", "benefits", "our", "ours", "these", "some", "each", "every",
+    "should", "could", "like", "make", "new", "part", "time", "environment", "related", "understanding",
+}
+
+_skill_pattern = None
+
+
+def skill_pattern():
+    """The regex matching every known skill spelling, compiled on first use."""
+    global _skill_pattern
+    if _skill_pattern is None:
+        terms = set(KNOWN_SKILLS) | set(SKILL_ALIASES)
+        # Longest first so "spring boot" wins over "spring"
+        alternation = "|".join(re.escape(t) for t in sorted(terms, key=len, reverse=True))
+        _skill_pattern = sections.term_pattern(alternation)
+    return _skill_pattern
+
+
+def find_skills(text):
+    """Known skills mentioned in text, normalized, in order of first mention."""
+    found = []
+    for match in skill_pattern().findall(text.lower()):
+        skill = normalize_skill(match)
+        # Single letters are only skills when written as such ("C", "R"), not in prose
+        if len(skill) == 1 and not re.search(r"(?<![A-Za-z])" + skill.upper() + r"(?![A-Za-z+#])", text):
+            continue
+        if skill not in found:
+            found.append(skill)
+    return found
+
+
+def _seniority(text):
+    lowered = text.lower()
+    for level, pattern in _SENIORITY_RE:
+        if pattern.search(lowered):
+            return level
+    return ""
+
+
+def _education_level(text):
+    for level, pattern in _EDUCATION_RE:
+        if pattern.search(text or ""):
+            return level
+    return ""
+
+
+def _keywords(text, skills, limit=15):
+    """Frequent content words that are not already listed as skills."""
+    counts = {}
+    for word in _WORD_RE.findall(text.lower()):
+        word = word.strip("./-")
+        if len(word) > 3 and word not in _STOP_WORDS and word not in skills:
+            counts[word] = counts.get(word, 0) + 1
+    ranked = sorted((w for w, c in counts.items() if c >= 2), key=lambda w: -counts[w])
+    return ranked[:limit]
+
+
+def analyze_locally(job_description):
+    """
+    Reduce a job description to its structured form with heuristics only.
+
+    Skills under a "Nice to have"-style heading, or on a line that marks them
+    optional ("... is a plus"), are preferred; skills under company blurb or
+    benefits headings are ignored; every other skill mentioned is required.
+
+    Args:
+        job_description: Job description text
+
+    Returns:
+        Dict with the same fields as the JD analysis prompt: title, seniority,
+        required_skills, preferred_skills, keywords, min_years_experience, education
+    """
+    required, preferred = [], []
+    section = None
+    lines = [line.strip() for line in (job_description or "").splitlines() if line.strip()]
+    for line in lines:
+        if _PREFERRED_HEADING_RE.match(line):
+            section = "preferred"
+        elif _REQUIRED_HEADING_RE.match(line):
+            section = "required"
+        elif _IGNORED_HEADING_RE.match(line):
+            section = "ignored"
+        if section == "ignored":
+            continue
+        optional = section == "preferred" or bool(_PREFERRED_INLINE_RE.search(line))
+        for skill in find_skills(line):
+            target = preferred if optional else required
+            if skill not in required and skill not in preferred:
+                target.append(skill)
+
+    title = lines[0] if lines and len(lines[0]) <= 80 else ""
+    years = [int(n) for n in _YEARS_RE.findall(job_description or "") if 0 < int(n) <= 30]
+    return {
+        "title": title,
+        "seniority": _seniority(title) or _seniority(job_description or ""),
+        "required_skills": required,
+        "preferred_skills": preferred,
+        "keywords": _keywords(job_description or "", set(required) | set(preferred)),
+        "min_years_experience": min(years) if years else 0,
+        "education": _education_level(job_description),
+    }
+
+
+def normalize_analysis(analysis):
+    """
+    Normalize an analysis (heuristic or from the model) in place: skills folded
+    through SKILL_ALIASES and de-duplicated, keywords lowercased, a preferred
+    skill that is also required listed once.
+    """
+    for field in ("required_skills", "preferred_skills", "keywords"):
+        values = []
+        for value in analysis.get(field) or []:
+            term = normalize_skill(value) if isinstance(value, (str, int, float)) else ""
+            if term and term not in values:
+                values.append(term)
+        analysis[field] = values
+    analysis["preferred_skills"] = [s for s in analysis["preferred_skills"] if s not in analysis["required_skills"]]
+    try:
+        analysis["min_years_experience"] = max(0, int(float(analysis.get("min_years_experience") or 0)))
+    except (TypeError, ValueError):
+        analysis["min_years_experience"] = 0
+    seniority = str(analysis.get("seniority") or "").lower()
+    analysis["seniority"] = seniority if seniority in SENIORITY_LEVELS else _seniority(seniority)
+    analysis["education"] = _education_level(str(analysis.get("education") or ""))
+    analysis["title"] = str(analysis.get("title") or "")
+    return analysis
+
+
+def _resume_years(parsed_resume):
+    """Years between the earliest start date and the latest end date in the work history."""
+    jobs = parsed_resume.get("work_experience") if isinstance(parsed_resume, dict) else None
+    starts, ends = [], []
+    for job in jobs if isinstance(jobs, list) else []:
+        if not isinstance(job, dict):
+            continue
+        start = _YEAR_RE.findall(str(job.get("start_date") or ""))
+        end_text = str(job.get("end_date") or "")
+        end = _YEAR_RE.findall(end_text)
+        if start:
+            starts.append(int(start[0]))
+        if end:
+            ends.append(int(end[-1]))
+        elif start and _PRESENT_RE.search(end_text):
+            ends.append(datetime.date.today().year)
+    if not starts:
+        return None
+    return max(0, max(ends or starts) - min(starts))
+
+
+def _resume_education(parsed_resume):
+    entries = parsed_resume.get("education") if isinstance(parsed_resume, dict) else None
+    best = ""
+    for entry in entries if isinstance(entries, list) else []:
+        if isinstance(entry, dict):
+            level = _education_level(str(entry.get("degree") or ""))
+            if EDUCATION_LEVELS.get(level, 0) > EDUCATION_LEVELS.get(best, 0):
+                best = level
+    return best
+
+
+def local_job_match(resume_data, parsed_resume, analysis):
+    """
+    Score a resume against an analyzed job description without an LLM call.
+
+    Args:
+        resume_data: String containing the raw resume text
+        parsed_resume: Dictionary with parsed resume data
+        analysis: Job description analysis (see analyze_locally)
+
+    Returns:
+        Dict with the same schema as the LLM job match
+    """
+    text = (resume_data or "").lower()
+    listed = set(resume_skills(parsed_resume))
+
+    def has(skill):
+        spellings = [skill] + [alias for alias, term in SKILL_ALIASES.items() if term == skill]
+        return skill in listed or any(sections.mentions(text, spelling) for spelling in spellings)
+
+    required, preferred = analysis["required_skills"], analysis["preferred_skills"]
+    matching = [s for s in required + preferred if has(s)]
+    missing_required = [s for s in required if not has(s)]
+    missing_preferred = [s for s in preferred if not has(s)]
+
+    if required or preferred:
+        required_cover = (len(required) - len(missing_required)) / len(required) if required else 1.0
+        preferred_cover = (len(preferred) - len(missing_preferred)) / len(preferred) if preferred else required_cover
+        skills_score = round(100 * (0.8 * required_cover + 0.2 * preferred_cover))
+    else:
+        skills_score = 50
+
+    years = _resume_years(parsed_resume)
+    wanted_years = analysis["min_years_experience"]
+    if years is None:
+        experience_score = 30
+    elif wanted_years:
+        experience_score = min(100, round(100 * years / wanted_years))
+    else:
+        experience_score = 80
+
+    held = EDUCATION_LEVELS.get(_resume_education(parsed_resume), 0)
+    wanted = EDUCATION_LEVELS.get(analysis["education"], 0)
+    if held >= wanted:
+        education_score = 100 if held or not wanted else 70
+    else:
+        education_score = 60 if held else 30
+
+    keywords = analysis["keywords"]
+    matching_keywords = [k for k in keywords if sections.mentions(text, k)]
+    missing_keywords = [k for k in keywords if k not in matching_keywords]
+    keyword_score = round(100 * len(matching_keywords) / len(keywords)) if keywords else skills_score
+
+    category_scores = {
+        "skills_match": skills_score,
+        "experience_match": experience_score,
+        "education_match": education_score,
+        "keyword_match": keyword_score,
+    }
+    overall = round(sum(category_scores[name] * weight for name, weight in MATCH_WEIGHTS.items()) / 100)
+
+    strengths, recommendations = [], []
+    if required and not missing_required:
+        strengths.append("Covers every required skill in the job description")
+    elif matching:
+        strengths.append(f"Has {len(matching)} of the skills the job asks for: {', '.join(matching[:6])}")
+    if years is not None and wanted_years and years >= wanted_years:
+        strengths.append(f"About {years} years of experience against {wanted_years}+ asked for")
+    if wanted and held >= wanted:
+        strengths.append("Meets the education requirement")
+    if missing_required:
+        recommendations.append(
+            f"Show experience with the required skills you have not listed: {', '.join(missing_required[:6])}"
+        )
+    if missing_preferred:
+        recommendations.append(f"Mention any exposure to: {', '.join(missing_preferred[:6])}")
+    if wanted_years and (years is None or years < wanted_years):
+        recommendations.append(f"Make the length of your relevant experience explicit ({wanted_years}+ years asked)")
+    if missing_keywords:
+        recommendations.append(f"Use the job's own wording where it applies: {', '.join(missing_keywords[:6])}")
+
+    if overall >= 75:
+        summary = "Strong match: the resume covers most of what the job asks for."
+    elif overall >= 50:
+        summary = "Partial match: relevant background, with gaps in the skills or experience listed below."
+    else:
+        summary = "Weak match: the resume is missing much of what this job requires."
+
+    return {
+        "overall_match_score": overall,
+        "category_scores": category_scores,
+        "matching_skills": matching,
+        "missing_skills": missing_required + missing_preferred,
+        "matching_keywords": matching_keywords,
+        "missing_keywords": missing_keywords,
+        "strengths": strengths,
+        "recommendations": recommendations,
+        "summary": summary,
+    }
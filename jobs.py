@@ -0,0 +1,422 @@
+# Background job subsystem for resume processing
+# POST /jobs returns a job id immediately; worker threads run the pipeline and
+# append one event per finished stage (parsed, ats_score, job_match) so clients
+# can poll or follow them over Server-Sent Events.
+#
+# JOB_BACKEND=memory keeps jobs inside one process (use a single gunicorn worker);
+# JOB_BACKEND=sqlite shares the queue between workers through a database file.
+# A SQLite job is leased to the worker running it and the lease is renewed
+# while it runs; if that worker's process dies, the job is queued again once
+# its lease runs out.
+
+import base64
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from io import BytesIO
+
+import pipeline
+import ratelimit
+
+JOB_BACKEND = os.getenv("JOB_BACKEND", "memory").lower()  # memory | sqlite
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_TTL = float(os.getenv("JOB_TTL", "3600"))  # seconds a finished job stays queryable
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", os.path.join("__CACHE__", "jobs.sqlite3"))
+# Seconds a running SQLite job stays claimed without a heartbeat before it is queued again
+JOB_LEASE = float(os.getenv("JOB_LEASE", "30"))
+# Runs a job gets before it is failed instead of queued again (a job that kills its worker)
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+# Longest pause between polls of an idle SQLite queue for jobs queued by other processes
+JOB_POLL_MAX = float(os.getenv("JOB_POLL_MAX", "2"))
+JOB_POLL_MIN = 0.2
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class InProcessJobQueue:
+    """Job queue held in memory; only the process that accepted a job can serve it."""
+
+    def __init__(self):
+        self._pending = queue.Queue()
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, payload):
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._prune()
+            self._jobs[job_id] = {
+                "status": QUEUED, "error": None, "events": [],
+                "payload": payload, "updated_at": time.time(),
+            }
+        self._pending.put(job_id)
+        return job_id
+
+    def claim(self, timeout=1.0):
+        """Block up to timeout for the next queued job; return (job_id, payload) or None."""
+        try:
+            job_id = self._pending.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            job["status"] = RUNNING
+            job["updated_at"] = time.time()
+            # The PDF is no longer needed once a worker has it
+            payload, job["payload"] = job["payload"], None
+        return job_id, payload
+
+    def add_event(self, job_id, stage, data):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job["events"].append({"stage": stage, "data": data})
+                job["updated_at"] = time.time()
+
+    def finish(self, job_id, status, error=None):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job["status"] = status
+                job["error"] = error
+                job["updated_at"] = time.time()
+
+    def get(self, job_id, since=0):
+        """Return {"status", "error", "events"} with events from index since, or None."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            return {"status": job["status"], "error": job["error"], "events": job["events"][since:]}
+
+    def _prune(self):
+        cutoff = time.time() - JOB_TTL
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job["status"] in (DONE, FAILED) and job["updated_at"] < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+class SQLiteJobQueue:
+    """Job queue in a SQLite file, shared by every gunicorn worker on the host."""
+
+    def __init__(self, path=JOB_DB_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        # Wakes this process's idle workers as soon as it queues a job
+        self._submitted = threading.Condition()
+        conn = self._conn()
+        conn.executescript(
+            "PRAGMA journal_mode=WAL;"
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY, status TEXT NOT NULL, payload TEXT, error TEXT,"
+            " created_at REAL NOT NULL, updated_at REAL NOT NULL,"
+            " lease_until REAL, attempts INTEGER NOT NULL DEFAULT 0);"
+            "CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at);"
+            "CREATE TABLE IF NOT EXISTS job_events ("
+            " job_id TEXT NOT NULL, seq INTEGER NOT NULL, stage TEXT NOT NULL, data TEXT NOT NULL,"
+            " PRIMARY KEY (job_id, seq));"
+        )
+        # Files created before leases existed
+        for column in ("lease_until REAL", "attempts INTEGER NOT NULL DEFAULT 0"):
+            try:
+                conn.execute(f"ALTER TABLE jobs ADD COLUMN {column}")
+            except sqlite3.OperationalError:
+                pass  # already there
+
+    def _conn(self):
+        # One connection per thread; sqlite3 connections are not thread-safe
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def submit(self, payload):
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        conn = self._conn()
+        self._prune(conn)
+        conn.execute(
+            "INSERT INTO jobs (id, status, payload, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+            (job_id, QUEUED, json.dumps(payload), now, now),
+        )
+        with self._submitted:
+            self._submitted.notify()
+        return job_id
+
+    def claim(self, timeout=1.0):
+        """
+        Wait up to timeout for a queued job, or one whose lease has expired, and lease it.
+
+        Idle workers only read the table, backing off from JOB_POLL_MIN to
+        JOB_POLL_MAX between polls; the write lock is taken only to claim.
+
+        Returns:
+            (job_id, payload) or None
+        """
+        conn = self._conn()
+        deadline = time.monotonic() + timeout
+        delay = JOB_POLL_MIN
+        while True:
+            if self._has_work(conn):
+                claimed = self._claim_next(conn)
+                if claimed is not None:
+                    return claimed
+                delay = JOB_POLL_MIN  # another worker won the job; more may follow
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            with self._submitted:
+                self._submitted.wait(min(delay, remaining))
+            delay = min(delay * 2, JOB_POLL_MAX)
+
+    def _has_work(self, conn):
+        row = conn.execute(
+            "SELECT 1 FROM jobs WHERE status = ? OR (status = ? AND COALESCE(lease_until, 0) < ?) LIMIT 1",
+            (QUEUED, RUNNING, time.time()),
+        ).fetchone()
+        return row is not None
+
+    def _claim_next(self, conn):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._recover(conn)
+            row = conn.execute(
+                "SELECT id, payload FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1", (QUEUED,)
+            ).fetchone()
+            if row is not None:
+                now = time.time()
+                conn.execute(
+                    "UPDATE jobs SET status = ?, lease_until = ?, attempts = attempts + 1, updated_at = ?"
+                    " WHERE id = ?",
+                    (RUNNING, now + JOB_LEASE, now, row[0]),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        if row is None:
+            return None
+        return row[0], json.loads(row[1])
+
+    def _recover(self, conn):
+        """Queue running jobs whose lease has expired again, or fail them once they are out of attempts."""
+        now = time.time()
+        failed = conn.execute(
+            "UPDATE jobs SET status = ?, error = ?, payload = NULL, lease_until = NULL, updated_at = ?"
+            " WHERE status = ? AND COALESCE(lease_until, 0) < ? AND (attempts >= ? OR payload IS NULL)",
+            (FAILED, "The worker processing this resume stopped. Please try again.", now,
+             RUNNING, now, JOB_MAX_ATTEMPTS),
+        ).rowcount
+        requeued = conn.execute(
+            "UPDATE jobs SET status = ?, lease_until = NULL, updated_at = ?"
+            " WHERE status = ? AND COALESCE(lease_until, 0) < ?",
+            (QUEUED, now, RUNNING, now),
+        ).rowcount
+        if failed or requeued:
+            print(f"Warning: {requeued} job(s) requeued and {failed} failed after their worker stopped")
+
+    def heartbeat(self, job_id):
+        """Renew the lease on a job this process is running."""
+        self._conn().execute(
+            "UPDATE jobs SET lease_until = ? WHERE id = ? AND status = ?",
+            (time.time() + JOB_LEASE, job_id, RUNNING),
+        )
+
+    def add_event(self, job_id, stage, data):
+        conn = self._conn()
+        conn.execute(
+            "INSERT INTO job_events (job_id, seq, stage, data) VALUES"
+            " (?, (SELECT COUNT(*) FROM job_events WHERE job_id = ?), ?, ?)",
+            (job_id, job_id, stage, json.dumps(data)),
+        )
+        conn.execute("UPDATE jobs SET updated_at = ? WHERE id = ?", (time.time(), job_id))
+
+    def finish(self, job_id, status, error=None):
+        # The PDF is kept until now so a job whose worker died can be run again
+        self._conn().execute(
+            "UPDATE jobs SET status = ?, error = ?, payload = NULL, lease_until = NULL, updated_at = ? WHERE id = ?",
+            (status, error, time.time(), job_id),
+        )
+
+    def get(self, job_id, since=0):
+        conn = self._conn()
+        row = conn.execute("SELECT status, error FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        events = conn.execute(
+            "SELECT stage, data FROM job_events WHERE job_id = ? AND seq >= ? ORDER BY seq",
+            (job_id, since),
+        ).fetchall()
+        return {
+            "status": row[0], "error": row[1],
+            "events": [{"stage": stage, "data": json.loads(data)} for stage, data in events],
+        }
+
+    def _prune(self, conn):
+        cutoff = time.time() - JOB_TTL
+        conn.execute(
+            "DELETE FROM job_events WHERE job_id IN"
+            " (SELECT id FROM jobs WHERE status IN (?, ?) AND updated_at < ?)",
+            (DONE, FAILED, cutoff),
+        )
+        conn.execute("DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?", (DONE, FAILED, cutoff))
+
+
+_queue = None
+_workers = []
+_init_lock = threading.Lock()
+# Jobs this process is running, whose leases the heartbeat thread renews
+_running = set()
+_running_lock = threading.Lock()
+
+
+def get_queue():
+    """Return the configured job queue backend, creating it on first use."""
+    global _queue
+    if _queue is None:
+        with _init_lock:
+            if _queue is None:
+                _queue = SQLiteJobQueue() if JOB_BACKEND == "sqlite" else InProcessJobQueue()
+    return _queue
+
+
+def _run_job(job_queue, job_id, payload):
+    with _running_lock:
+        _running.add(job_id)
+    try:
+        data = pipeline.extract_resume_text(BytesIO(base64.b64decode(payload["pdf"])))
+        pipeline.analyze(
+            data,
+            payload.get("job_description", ""),
+            on_result=lambda stage, result: job_queue.add_event(job_id, stage, result),
+        )
+        job_queue.finish(job_id, DONE)
+    except pipeline.PipelineError as e:
+        job_queue.finish(job_id, FAILED, str(e))
+    except Exception as e:
+        print(f"Error processing job {job_id}: {str(e)}")
+        job_queue.finish(job_id, FAILED, f"An error occurred while processing your resume: {str(e)}")
+    finally:
+        with _running_lock:
+            _running.discard(job_id)
+
+
+def _worker_loop():
+    job_queue = get_queue()
+    while True:
+        try:
+            claimed = job_queue.claim(timeout=60)
+        except Exception as e:
+            print(f"Warning: Could not claim job: {str(e)}")
+            time.sleep(1.0)
+            continue
+        if claimed is not None:
+            # Queued jobs give way to interactive requests when Groq quota runs short
+            with ratelimit.priority(ratelimit.BACKGROUND):
+                _run_job(job_queue, *claimed)
+
+
+def _heartbeat_loop():
+    job_queue = get_queue()
+    while True:
+        time.sleep(JOB_LEASE / 3)
+        with _running_lock:
+            running = list(_running)
+        for job_id in running:
+            try:
+                job_queue.heartbeat(job_id)
+            except Exception as e:
+                print(f"Warning: Could not renew the lease on job {job_id}: {str(e)}")
+
+
+def start_workers():
+    """Start the background worker threads for this process (idempotent)."""
+    with _init_lock:
+        if _workers:
+            return
+        for i in range(JOB_WORKERS):
+            worker = threading.Thread(target=_worker_loop, name=f"job-worker-{i}", daemon=True)
+            worker.start()
+            _workers.append(worker)
+        if JOB_BACKEND == "sqlite":
+            heartbeat = threading.Thread(target=_heartbeat_loop, name="job-heartbeat", daemon=True)
+            heartbeat.start()
+            _workers.append(heartbeat)
+
+
+def start_shared_workers():
+    """
+    Start this process's workers at startup if the queue is shared (JOB_BACKEND=sqlite).
+
+    Jobs queued by any process, or left behind by a process that died, are
+    then served without waiting for this process to accept a job itself.
+    With the memory backend workers start on the first submit().
+    Call it in each server process after any fork (see gunicorn.conf.py).
+    """
+    if JOB_BACKEND == "sqlite":
+        start_workers()
+
+
+def submit(pdf_bytes, job_description=""):
+    """Queue a resume for processing and return its job id."""
+    start_workers()
+    payload = {"pdf": base64.b64encode(pdf_bytes).decode("ascii"), "job_description": job_description}
+    return get_queue().submit(payload)
+
+
+def status(job_id):
+    """
+    Return the job state with every result produced so far, or None if unknown.
+
+    Returns:
+        Dict with "status", "error" and "results" (stage name -> result)
+    """
+    job = get_queue().get(job_id)
+    if job is None:
+        return None
+    return {
+        "status": job["status"],
+        "error": job["error"],
+        "results": {event["stage"]: event["data"] for event in job["events"]},
+    }
+
+
+def events(job_id, poll_interval=0.25, timeout=None):
+    """
+    Yield job events as they are produced, ending once the job has finished.
+
+    Yields (stage, data) tuples, followed by ("done", {"status", "error"}).
+    """
+    job_queue = get_queue()
+    since = 0
+    deadline = time.monotonic() + (timeout if timeout is not None else pipeline.REQUEST_DEADLINE * 2)
+    while True:
+        job = job_queue.get(job_id, since=since)
+        if job is None:
+            yield "done", {"status": FAILED, "error": "Unknown job"}
+            return
+        for event in job["events"]:
+            yield event["stage"], event["data"]
+        since += len(job["events"])
+        if job["status"] in (DONE, FAILED):
+            yield "done", {"status": job["status"], "error": job["error"]}
+            return
+        if time.monotonic() >= deadline:
+            yield "done", {"status": job["status"], "error": "Timed out waiting for results"}
+            return
+        time.sleep(poll_interval)
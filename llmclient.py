@@ -0,0 +1,511 @@
+# Shared Groq client layer
+# One pooled HTTP client per process (i.e. per gunicorn worker), reused by every
+# LLM call so keep-alive connections and TLS sessions survive between requests.
+# The ASGI app (asgi.py) uses a second, async client with its own pool.
+#
+# openai and httpx (~0.3 s of imports) and the API key are only loaded when the
+# first client is built, so importing the app stays fast and works without a key.
+
+import asyncio
+import os
+import random
+import threading
+import time
+
+import metrics
+import ratelimit
+
+CONFIG_PATH = "config.yaml"
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL", "https://api.groq.com/openai/v1")
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))
+
+# Pool limits apply per worker process
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "10"))
+LLM_MAX_KEEPALIVE = int(os.getenv("LLM_MAX_KEEPALIVE", "5"))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "60"))
+# The async client serves every in-flight request of an ASGI worker, so it needs a
+# bigger pool. Past ~50 connections httpcore's pool bookkeeping (quadratic in the
+# number of connections) costs more event loop time than the extra concurrency saves.
+LLM_ASYNC_MAX_CONNECTIONS = int(os.getenv("LLM_ASYNC_MAX_CONNECTIONS", "50"))
+
+# Retry policy for 429 and 5xx responses (exponential backoff with full jitter)
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "8"))
+
+_settings = {
+    "api_key": None,
+    "base_url": GROQ_BASE_URL,
+    "transport": None,
+    "async_transport": None,
+}
+_client = None
+_async_client = None
+# Event loop the async client's connections belong to; only it can close them
+_async_loop = None
+# Caps in-flight async calls at the pool size: requests queued inside httpx's
+# pool are rescanned on every connection event, which gets slow with hundreds waiting
+_async_slots = None
+_client_lock = threading.Lock()
+
+
+def configure(api_key=None, base_url=None, transport=None, async_transport=None):
+    """
+    Set client options and drop the current clients so the next call rebuilds them.
+
+    Args:
+        api_key: Groq API key
+        base_url: OpenAI-compatible endpoint (e.g. a local stub server)
+        transport: Optional httpx transport for the sync client (e.g. httpx.MockTransport in tests)
+        async_transport: Optional httpx async transport for the async client
+            (e.g. httpx.AsyncHTTPTransport); transports are not shared between the two
+    """
+    with _client_lock:
+        if api_key is not None:
+            _settings["api_key"] = api_key
+        if base_url is not None:
+            _settings["base_url"] = base_url
+        if transport is not None:
+            _settings["transport"] = transport
+        if async_transport is not None:
+            _settings["async_transport"] = async_transport
+        _close_client()
+
+
+def reset():
+    """Close the pooled client. Call after fork if a client was built in the parent."""
+    with _client_lock:
+        _close_client()
+
+
+def resolve_api_key():
+    """
+    Return the Groq API key from GROQ_API_KEY, falling back to config.yaml.
+
+    Raises:
+        ValueError: If no key is configured
+    """
+    api_key = os.getenv("GROQ_API_KEY")
+    if not api_key:
+        try:
+            import yaml
+
+            with open(CONFIG_PATH) as file:
+                data = yaml.safe_load(file)  # Use safe_load to prevent code execution
+                api_key = data.get('GROQ_API_KEY')
+        except FileNotFoundError:
+            print(f"Warning: Config file {CONFIG_PATH} not found and GROQ_API_KEY environment variable not set")
+        except Exception as e:
+            print(f"Warning: Error reading config file: {str(e)}")
+
+    if not api_key or api_key == "YOUR KEY HERE":
+        raise ValueError(
+            "Groq API key not configured. Please set the GROQ_API_KEY environment variable "
+            "or update the key in config.yaml"
+        )
+    return api_key
+
+
+def preload():
+    """Import the client libraries and resolve the API key now rather than on the first call."""
+    import httpx
+    import openai
+
+    if _settings["api_key"] is None:
+        _settings["api_key"] = resolve_api_key()
+
+
+def _close_client():
+    global _client, _async_client, _async_loop
+    if _client is not None:
+        try:
+            _client.close()
+        except Exception as e:
+            print(f"Warning: Error closing LLM client: {str(e)}")
+        _client = None
+    client, loop = _async_client, _async_loop
+    _async_client = _async_loop = None
+    if client is not None and loop is not None and loop.is_running():
+        # Closing needs the client's own loop, which may be this thread's or another's
+        future = asyncio.run_coroutine_threadsafe(client.close(), loop)
+        future.add_done_callback(_warn_close_error)
+    # A stopped loop took its connections with it; there is nothing left to close
+
+
+def _warn_close_error(future):
+    if not future.cancelled() and future.exception() is not None:
+        print(f"Warning: Error closing async LLM client: {str(future.exception())}")
+
+
+async def aclose():
+    """Close the async client. Called by the ASGI app on shutdown."""
+    global _async_client, _async_loop
+    client, _async_client, _async_loop = _async_client, None, None
+    if client is not None:
+        await client.close()
+
+
+def get_client():
+    """Return the process-wide OpenAI client, building it on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                import httpx
+                from openai import OpenAI
+
+                if _settings["api_key"] is None:
+                    _settings["api_key"] = resolve_api_key()
+                http_client = httpx.Client(
+                    transport=_settings["transport"],
+                    limits=httpx.Limits(
+                        max_connections=LLM_MAX_CONNECTIONS,
+                        max_keepalive_connections=LLM_MAX_KEEPALIVE,
+                        keepalive_expiry=LLM_KEEPALIVE_EXPIRY,
+                    ),
+                    timeout=LLM_TIMEOUT,
+                )
+                _client = OpenAI(
+                    api_key=_settings["api_key"],
+                    base_url=_settings["base_url"],
+                    timeout=LLM_TIMEOUT,
+                    max_retries=0,  # retries are handled in chat_completion
+                    http_client=http_client,
+                )
+    return _client
+
+
+def get_async_client():
+    """Return the process-wide AsyncOpenAI client, building it on first use."""
+    global _async_client, _async_slots, _async_loop
+    if _async_client is None:
+        with _client_lock:
+            if _async_client is None:
+                import httpx
+                from openai import AsyncOpenAI
+
+                if _settings["api_key"] is None:
+                    _settings["api_key"] = resolve_api_key()
+                _async_slots = asyncio.Semaphore(LLM_ASYNC_MAX_CONNECTIONS)
+                http_client = httpx.AsyncClient(
+                    transport=_settings["async_transport"],
+                    limits=httpx.Limits(
+                        max_connections=LLM_ASYNC_MAX_CONNECTIONS,
+                        max_keepalive_connections=LLM_ASYNC_MAX_CONNECTIONS,
+                        keepalive_expiry=LLM_KEEPALIVE_EXPIRY,
+                    ),
+                    timeout=LLM_TIMEOUT,
+                )
+                _async_client = AsyncOpenAI(
+                    api_key=_settings["api_key"],
+                    base_url=_settings["base_url"],
+                    timeout=LLM_TIMEOUT,
+                    max_retries=0,
+                    http_client=http_client,
+                )
+                try:
+                    _async_loop = asyncio.get_running_loop()
+                except RuntimeError:
+                    _async_loop = None
+    return _async_client
+
+
+def warm():
+    """Open a pooled connection to Groq (GET /models) so the first request skips the TCP/TLS handshake."""
+    try:
+        get_client().models.list(timeout=5)
+    except Exception as e:
+        print(f"Warning: Could not warm the LLM connection pool: {str(e)}")
+
+
+async def awarm():
+    """warm() for the async client. Called by the ASGI app on startup."""
+    try:
+        await get_async_client().models.list(timeout=5)
+    except Exception as e:
+        print(f"Warning: Could not warm the async LLM connection pool: {str(e)}")
+
+
+def _is_retryable(error):
+    from openai import APIConnectionError, APIStatusError, APITimeoutError
+
+    if isinstance(error, APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    # Timeouts are not retried: a second 30 s wait would blow the request deadline
+    return isinstance(error, APIConnectionError) and not isinstance(error, APITimeoutError)
+
+
+def _retry_delay(error, attempt):
+    """Backoff delay in seconds, honouring a Retry-After header when the server sends one."""
+    response = getattr(error, "response", None)
+    if response is not None:
+        retry_after = response.headers.get("retry-after")
+        if retry_after:
+            try:
+                return min(float(retry_after), LLM_BACKOFF_MAX)
+            except ValueError:
+                pass
+    return random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * (2 ** attempt)))
+
+
+def _with_retries(call, model="", cost=0):
+    """
+    Invoke call(), retrying 429, 5xx and connection errors with jittered backoff.
+
+    Each attempt first waits for rate-limit quota, and every response's
+    rate-limit headers are fed back to the limiter.
+
+    Args:
+        call: Function making the request through with_raw_response
+        model: Model name the quota is tracked under
+        cost: Estimated tokens the call counts against the TPM quota
+
+    Returns:
+        Tuple of (parsed result, seconds spent waiting for quota and between attempts)
+    """
+    limiter = ratelimit.get_limiter()
+    attempt = 0
+    waited = 0.0
+    while True:
+        try:
+            if limiter is not None:
+                waited += limiter.acquire(model, cost)
+            raw = call()
+            if limiter is not None:
+                limiter.observe(model, raw.headers, raw.status_code)
+            return raw.parse(), waited
+        except Exception as e:
+            delay = _failed_attempt(e, attempt, model, limiter)
+            time.sleep(delay)
+            waited += delay
+            attempt += 1
+
+
+async def _with_retries_async(call, model="", cost=0):
+    """_with_retries for the async client: call returns an awaitable."""
+    limiter = ratelimit.get_limiter()
+    attempt = 0
+    waited = 0.0
+    while True:
+        try:
+            if limiter is not None:
+                waited += await limiter.acquire_async(model, cost)
+            raw = await call()
+            if limiter is not None:
+                await limiter.observe_async(model, raw.headers, raw.status_code)
+            return raw.parse(), waited
+        except Exception as e:
+            from openai import APIStatusError
+
+            if limiter is not None and isinstance(e, APIStatusError):
+                await limiter.observe_async(model, e.response.headers, e.status_code)
+            delay = _failed_attempt(e, attempt, model, None)
+            await asyncio.sleep(delay)
+            waited += delay
+            attempt += 1
+
+
+def _failed_attempt(error, attempt, model, limiter):
+    """
+    Record a failed attempt and decide whether to retry it.
+
+    Returns:
+        Seconds to wait before the next attempt
+
+    Raises:
+        error itself once retries are exhausted or if it is not retryable
+    """
+    from openai import APIStatusError
+
+    if isinstance(error, APIStatusError):
+        if error.status_code == 429:
+            metrics.LLM_RATE_LIMITED.labels(model=model).inc()
+        if limiter is not None:
+            limiter.observe(model, error.response.headers, error.status_code)
+    if attempt >= LLM_MAX_RETRIES or not _is_retryable(error):
+        raise error
+    delay = _retry_delay(error, attempt)
+    print(f"LLM call failed ({str(error)}), retrying in {delay:.2f}s")
+    return delay
+
+
+def _settle(model, cost, usage):
+    """Give the limiter back whatever part of the estimated cost the call did not use."""
+    limiter = ratelimit.get_limiter()
+    if limiter is None or usage is None:
+        return
+    total = usage.get("total_tokens") if isinstance(usage, dict) else getattr(usage, "total_tokens", None)
+    limiter.settle(model, cost, total)
+
+
+async def _settle_async(model, cost, usage):
+    """_settle for the async client."""
+    limiter = ratelimit.get_limiter()
+    if limiter is None or usage is None:
+        return
+    total = usage.get("total_tokens") if isinstance(usage, dict) else getattr(usage, "total_tokens", None)
+    await limiter.settle_async(model, cost, total)
+
+
+def _observe_usage(model, usage):
+    """Record prompt/completion token counts from a usage object or dict."""
+    if usage is None:
+        return
+    for kind in ("prompt", "completion"):
+        count = usage.get(f"{kind}_tokens") if isinstance(usage, dict) else getattr(usage, f"{kind}_tokens", None)
+        if count is not None:
+            metrics.LLM_TOKENS.labels(model=model, kind=kind).observe(count)
+
+
+def chat_completion(**kwargs):
+    """
+    Create a chat completion on the shared client, retrying 429 and 5xx responses.
+
+    Args:
+        **kwargs: Passed straight to client.chat.completions.create
+
+    Returns:
+        The ChatCompletion response
+
+    Raises:
+        The last API error once retries are exhausted, or any non-retryable error
+        ratelimit.RateLimitTimeout: If no rate-limit quota became available in time
+    """
+    client = get_client()
+    model = kwargs.get("model", "")
+    cost = ratelimit.estimate_cost(kwargs.get("messages", []), kwargs.get("max_tokens"))
+    start = time.monotonic()
+    try:
+        response, waited = _with_retries(
+            lambda: client.chat.completions.with_raw_response.create(**kwargs), model, cost
+        )
+    except Exception:
+        metrics.LLM_ERRORS.labels(model=model).inc()
+        raise
+    metrics.LLM_SECONDS.labels(model=model, phase="queue").observe(waited)
+    metrics.LLM_SECONDS.labels(model=model, phase="total").observe(time.monotonic() - start)
+    _observe_usage(model, response.usage)
+    _settle(model, cost, response.usage)
+    return response
+
+
+async def achat_completion(**kwargs):
+    """
+    chat_completion on the shared async client, for the ASGI app.
+
+    Args:
+        **kwargs: Passed straight to client.chat.completions.create
+
+    Returns:
+        The ChatCompletion response
+    """
+    client = get_async_client()
+    model = kwargs.get("model", "")
+    cost = ratelimit.estimate_cost(kwargs.get("messages", []), kwargs.get("max_tokens"))
+    start = time.monotonic()
+
+    async def call():
+        async with _async_slots:
+            return await client.chat.completions.with_raw_response.create(**kwargs)
+
+    try:
+        response, waited = await _with_retries_async(call, model, cost)
+    except Exception:
+        metrics.LLM_ERRORS.labels(model=model).inc()
+        raise
+    metrics.LLM_SECONDS.labels(model=model, phase="queue").observe(waited)
+    metrics.LLM_SECONDS.labels(model=model, phase="total").observe(time.monotonic() - start)
+    _observe_usage(model, response.usage)
+    await _settle_async(model, cost, response.usage)
+    return response
+
+
+def chat_completion_stream(**kwargs):
+    """
+    Stream a chat completion, yielding content deltas as they arrive.
+
+    Only opening the stream is retried; once tokens have been yielded a
+    failure is raised to the caller, which may already have used them.
+    """
+    client = get_client()
+    model = kwargs.get("model", "")
+    cost = ratelimit.estimate_cost(kwargs.get("messages", []), kwargs.get("max_tokens"))
+    start = time.monotonic()
+    try:
+        stream, waited = _with_retries(
+            lambda: client.chat.completions.with_raw_response.create(stream=True, **kwargs), model, cost
+        )
+    except Exception:
+        metrics.LLM_ERRORS.labels(model=model).inc()
+        raise
+    metrics.LLM_SECONDS.labels(model=model, phase="queue").observe(waited)
+
+    first_token = True
+    with stream:
+        for chunk in stream:
+            # Groq reports usage on the last chunk, under x_groq
+            x_groq = getattr(chunk, "x_groq", None)
+            usage = chunk.usage or (x_groq.get("usage") if isinstance(x_groq, dict) else None)
+            _observe_usage(model, usage)
+            _settle(model, cost, usage)
+            if chunk.choices and chunk.choices[0].delta.content:
+                if first_token:
+                    metrics.LLM_SECONDS.labels(model=model, phase="first_token").observe(time.monotonic() - start)
+                    first_token = False
+                yield chunk.choices[0].delta.content
+    metrics.LLM_SECONDS.labels(model=model, phase="total").observe(time.monotonic() - start)
+
+
+async def achat_completion_stream(**kwargs):
+    """
+    chat_completion_stream on the shared async client, for the ASGI app.
+
+    The connection slot is held until the stream ends, not just while it
+    opens. It is also given back, and the response closed, if the caller
+    cancels or closes the generator before the stream has been entered.
+    """
+    client = get_async_client()
+    model = kwargs.get("model", "")
+    cost = ratelimit.estimate_cost(kwargs.get("messages", []), kwargs.get("max_tokens"))
+    start = time.monotonic()
+    # Responses opened by call(), each holding a slot until the finally below
+    opened = []
+
+    async def call():
+        await _async_slots.acquire()
+        try:
+            raw = await client.chat.completions.with_raw_response.create(stream=True, **kwargs)
+        except BaseException:
+            _async_slots.release()
+            raise
+        opened.append(raw)
+        return raw
+
+    try:
+        try:
+            stream, waited = await _with_retries_async(call, model, cost)
+        except Exception:
+            metrics.LLM_ERRORS.labels(model=model).inc()
+            raise
+        metrics.LLM_SECONDS.labels(model=model, phase="queue").observe(waited)
+
+        first_token = True
+        async with stream:
+            async for chunk in stream:
+                # Groq reports usage on the last chunk, under x_groq
+                x_groq = getattr(chunk, "x_groq", None)
+                usage = chunk.usage or (x_groq.get("usage") if isinstance(x_groq, dict) else None)
+                _observe_usage(model, usage)
+                await _settle_async(model, cost, usage)
+                if chunk.choices and chunk.choices[0].delta.content:
+                    if first_token:
+                        metrics.LLM_SECONDS.labels(model=model, phase="first_token").observe(
+                            time.monotonic() - start)
+                        first_token = False
+                    yield chunk.choices[0].delta.content
+    finally:
+        for _ in opened:
+            _async_slots.release()
+        for raw in opened:
+            await raw.http_response.aclose()
+    metrics.LLM_SECONDS.labels(model=model, phase="total").observe(time.monotonic() - start)
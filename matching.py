@@ -0,0 +1,229 @@
+# Local job matching engine for bulk candidate ranking
+# Builds a skills vocabulary from the technical_skills that ats_extractor
+# produces, represents each resume as a sparse BM25 vector over that vocabulary
+# and scores job descriptions with one sparse matrix product. The LLM is only
+# used for narrative feedback on the shortlist (see shortlist_feedback).
+
+import re
+from collections import Counter
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Common spellings folded onto one vocabulary term
+SKILL_ALIASES = {
+    "js": "javascript",
+    "ts": "typescript",
+    "node": "node.js",
+    "nodejs": "node.js",
+    "react.js": "react",
+    "reactjs": "react",
+    "postgres": "postgresql",
+    "k8s": "kubernetes",
+    "golang": "go",
+    "amazon web services": "aws",
+    "google cloud platform": "gcp",
+    "google cloud": "gcp",
+}
+
+
+def normalize_skill(skill):
+    """Lowercase, collapse whitespace and fold aliases."""
+    term = " ".join(str(skill).lower().split())
+    return SKILL_ALIASES.get(term, term)
+
+
+def resume_skills(parsed_resume):
+    """Return the normalized, de-duplicated skills listed in a parsed resume."""
+    technical = parsed_resume.get("technical_skills") if isinstance(parsed_resume, dict) else None
+    if isinstance(technical, dict):
+        values = [v for group in technical.values() if isinstance(group, list) for v in group]
+    elif isinstance(technical, list):
+        values = technical
+    else:
+        values = []
+    skills = []
+    for value in values:
+        if isinstance(value, str) and value.strip():
+            term = normalize_skill(value)
+            if term not in skills:
+                skills.append(term)
+    return skills
+
+
+class ResumeIndex:
+    """
+    In-memory BM25 index of resumes over a skills vocabulary.
+
+    Usage:
+        index = ResumeIndex()
+        index.add("alice.pdf", parsed_resume, resume_text)
+        ...
+        index.build()
+        index.rank(job_description, top_n=10)
+    """
+
+    def __init__(self):
+        self.resume_ids = []
+        self._skills = []
+        self._texts = []
+        self.vocabulary = {}
+        self._terms = []
+        self._matrix = None
+        self._pattern = None
+
+    def __len__(self):
+        return len(self.resume_ids)
+
+    def add(self, resume_id, parsed_resume, resume_text=""):
+        """Add a resume; call build() again before ranking."""
+        self.resume_ids.append(resume_id)
+        self._skills.append(resume_skills(parsed_resume))
+        self._texts.append(resume_text or "")
+        self._matrix = None
+
+    def _count_terms(self, text):
+        """Count vocabulary terms mentioned in text (whole-term, case-insensitive)."""
+        if self._pattern is None or not text:
+            return Counter()
+        return Counter(self.vocabulary[normalize_skill(m)] for m in self._pattern.findall(text.lower()))
+
+    def build(self):
+        """Build the vocabulary and the BM25-weighted resume-term matrix."""
+        # numpy and scipy are imported on first use: most workers never rank a batch
+        import numpy as np
+        from scipy import sparse
+
+        canonical = sorted({term for skills in self._skills for term in skills} | set(SKILL_ALIASES.values()))
+        self._terms = canonical
+        self.vocabulary = {term: i for i, term in enumerate(canonical)}
+        # Aliases are matched in text too but fold onto their canonical term
+        pattern_terms = set(canonical) | set(SKILL_ALIASES)
+        if pattern_terms:
+            # Longest first so "machine learning" wins over "machine"
+            alternation = "|".join(re.escape(t) for t in sorted(pattern_terms, key=len, reverse=True))
+            self._pattern = re.compile(r"(?<![a-z0-9+#])(" + alternation + r")(?![a-z0-9+#])")
+        else:
+            self._pattern = None
+
+        rows, cols, counts = [], [], []
+        for row, (skills, text) in enumerate(zip(self._skills, self._texts)):
+            tf = self._count_terms(text)
+            for term in skills:
+                tf[self.vocabulary[term]] += 1  # listing a skill counts as one mention
+            for col, count in tf.items():
+                rows.append(row)
+                cols.append(col)
+                counts.append(count)
+
+        n_docs, n_terms = len(self.resume_ids), len(self._terms)
+        tf_matrix = sparse.csr_matrix(
+            (np.asarray(counts, dtype=np.float32), (rows, cols)), shape=(n_docs, n_terms)
+        )
+
+        doc_len = np.asarray(tf_matrix.sum(axis=1)).ravel()
+        avg_len = float(doc_len.mean()) if n_docs else 0.0
+        avg_len = avg_len or 1.0
+        df = np.bincount(tf_matrix.indices, minlength=n_terms)
+        idf = np.log1p((n_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+
+        # BM25 term weight, applied to the non-zero entries only
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_len / avg_len)
+        row_norm = np.repeat(norm, np.diff(tf_matrix.indptr)).astype(np.float32)
+        data = tf_matrix.data
+        tf_matrix.data = data * (BM25_K1 + 1) / (data + row_norm) * idf[tf_matrix.indices]
+        self._matrix = tf_matrix
+        return self
+
+    def _query_matrix(self, job_descriptions):
+        import numpy as np
+        from scipy import sparse
+
+        rows, cols = [], []
+        for row, text in enumerate(job_descriptions):
+            for col in self._count_terms(text):
+                rows.append(row)
+                cols.append(col)
+        return sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.float32), (rows, cols)),
+            shape=(len(job_descriptions), len(self._terms)),
+        )
+
+    def rank_many(self, job_descriptions, top_n=10):
+        """
+        Rank all resumes against several job descriptions in one matrix product.
+
+        Returns:
+            One ranking per job description, as returned by rank()
+        """
+        import numpy as np
+
+        if self._matrix is None:
+            self.build()
+        queries = self._query_matrix(job_descriptions)
+        scores = (self._matrix @ queries.T).toarray()  # resumes x job descriptions
+        matrix = self._matrix
+        rankings = []
+        for q in range(len(job_descriptions)):
+            column = scores[:, q]
+            n = min(top_n, len(column))
+            if n == 0:
+                rankings.append([])
+                continue
+            top = np.argpartition(-column, n - 1)[:n]
+            top = top[np.argsort(-column[top], kind="stable")]
+            wanted = set(queries.indices[queries.indptr[q]:queries.indptr[q + 1]])
+            ranking = []
+            for i in top:
+                have = wanted.intersection(matrix.indices[matrix.indptr[i]:matrix.indptr[i + 1]])
+                ranking.append({
+                    "resume_id": self.resume_ids[i],
+                    "score": float(column[i]),
+                    "coverage": round(100 * len(have) / len(wanted)) if wanted else 0,
+                    "matching_skills": sorted(self._terms[t] for t in have),
+                    "missing_skills": sorted(self._terms[t] for t in wanted - have),
+                })
+            rankings.append(ranking)
+        return rankings
+
+    def rank(self, job_description, top_n=10):
+        """
+        Return the top_n resumes for a job description.
+
+        Returns:
+            List of dicts with resume_id, BM25 score, coverage (percent of the
+            job's vocabulary skills the resume mentions), matching_skills and
+            missing_skills, best match first
+        """
+        return self.rank_many([job_description], top_n=top_n)[0]
+
+    def resume_text(self, resume_id):
+        return self._texts[self.resume_ids.index(resume_id)]
+
+
+def shortlist_feedback(index, parsed_resumes, job_description, top_n=10, feedback_n=3):
+    """
+    Rank locally, then ask the LLM for narrative feedback on the best feedback_n only.
+
+    Args:
+        index: Built ResumeIndex
+        parsed_resumes: Dict mapping resume_id to parsed resume
+        job_description: Job description string
+        top_n: Size of the returned ranking
+        feedback_n: How many of the top resumes get an LLM job match analysis
+
+    Returns:
+        The ranking from index.rank(), with a "job_match" entry on the first feedback_n
+    """
+    from resumeparser import calculate_job_match
+
+    ranking = index.rank(job_description, top_n=top_n)
+    for entry in ranking[:feedback_n]:
+        resume_id = entry["resume_id"]
+        try:
+            entry["job_match"] = calculate_job_match(
+                index.resume_text(resume_id), parsed_resumes.get(resume_id, {}), job_description
+            )
+        except Exception as e:
+            entry["job_match"] = {"error": str(e)}
+    return ranking
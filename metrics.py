@@ -0,0 +1,118 @@
+# Prometheus instrumentation
+# Latency histograms for every pipeline stage and Groq call, plus token and PDF
+# size distributions, exported on /metrics. Under gunicorn with several
+# workers set PROMETHEUS_MULTIPROC_DIR so all workers report into one registry.
+#
+# A request can also collect its own stage timings (start_trace) to return
+# them in a Server-Timing header.
+
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from prometheus_client import (
+    CollectorRegistry, CONTENT_TYPE_LATEST, Counter, Histogram, generate_latest, multiprocess,
+)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+TOKEN_BUCKETS = (50, 100, 250, 500, 1000, 2000, 3500, 5000, 8000, 12000)
+
+STAGE_SECONDS = Histogram(
+    "ratemyresume_stage_seconds", "Duration of each request stage",
+    ["stage"], buckets=LATENCY_BUCKETS,
+)
+LLM_SECONDS = Histogram(
+    "ratemyresume_llm_seconds",
+    "Groq call latency: queue (rate limit and retry waits), first_token (streaming only) and total",
+    ["model", "phase"], buckets=LATENCY_BUCKETS,
+)
+LLM_TOKENS = Histogram(
+    "ratemyresume_llm_tokens", "Tokens per Groq call as reported by the API",
+    ["model", "kind"], buckets=TOKEN_BUCKETS,
+)
+LLM_ERRORS = Counter("ratemyresume_llm_errors_total", "Groq calls that failed after retries", ["model"])
+LLM_RATE_LIMITED = Counter("ratemyresume_llm_rate_limited_total", "Groq 429 responses", ["model"])
+MODEL_ROUTE = Counter(
+    "ratemyresume_model_route_total",
+    "Routed model calls by outcome: accepted, or invalid/incomplete/error (escalated to the next model)",
+    ["kind", "model", "outcome"],
+)
+MODEL_ROUTE_SECONDS = Histogram(
+    "ratemyresume_model_route_seconds", "Latency of routed model calls per response kind and model",
+    ["kind", "model"], buckets=LATENCY_BUCKETS,
+)
+JD_ANALYSES = Counter(
+    "ratemyresume_jd_analyses_total",
+    "Job description analyses by source: cache, llm, local, or fallback (local after a failed model call)",
+    ["source"],
+)
+UPLOAD_TRIAGE = Counter(
+    "ratemyresume_upload_triage_total",
+    "Upload triage verdicts: accepted, or the reason the upload was turned away before any Groq call",
+    ["outcome"],
+)
+RESUME_HANDLES = Counter(
+    "ratemyresume_resume_handles_total",
+    "Resume handles created on upload, reused to skip extraction and ATS scoring, or expired",
+    ["outcome"],
+)
+PROMPT_TOKENS = Histogram(
+    "ratemyresume_prompt_tokens", "Estimated input tokens per prompt before and after compaction",
+    ["prompt", "version"], buckets=TOKEN_BUCKETS,
+)
+PDF_PAGES = Histogram("ratemyresume_pdf_pages", "Pages per uploaded PDF", buckets=(1, 2, 3, 5, 10, 20, 50, 100))
+PDF_CHARS = Histogram(
+    "ratemyresume_pdf_chars", "Characters extracted per uploaded PDF",
+    buckets=(500, 1000, 2500, 5000, 10000, 25000, 50000, 100000),
+)
+JSON_REPAIRS = Counter(
+    "ratemyresume_json_repairs_total", "Model responses that needed repair before they parsed",
+    ["kind", "method"],
+)
+
+_trace = ContextVar("trace", default=None)
+
+
+def start_trace():
+    """Start collecting stage timings for the current request; returns the list they are appended to."""
+    timings = []
+    _trace.set(timings)
+    return timings
+
+
+def end_trace():
+    """Stop collecting stage timings for the current request."""
+    _trace.set(None)
+
+
+def observe_stage(stage, seconds):
+    """Record one stage duration (and add it to the current trace, if any)."""
+    STAGE_SECONDS.labels(stage=stage).observe(seconds)
+    timings = _trace.get()
+    if timings is not None:
+        timings.append((stage, seconds))
+
+
+@contextmanager
+def timed(stage):
+    """Time the body of a with block as a stage."""
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.monotonic() - start)
+
+
+def server_timing(timings):
+    """Format trace timings as a Server-Timing header value."""
+    return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings)
+
+
+def export():
+    """Return (body, content type) for the /metrics endpoint."""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
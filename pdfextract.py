@@ -0,0 +1,168 @@
+# PDF text extraction
+# Serial by default; PDF_EXTRACT_ENGINE=parallel spreads the pages of large
+# documents across a bounded process pool (pypdf is pure Python and holds the GIL).
+# pypdf is imported on first use to keep worker startup fast.
+
+import math
+import os
+import signal
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from io import BytesIO
+import multiprocessing
+
+import metrics
+
+PDF_EXTRACT_ENGINE = os.getenv("PDF_EXTRACT_ENGINE", "serial").lower()  # serial | parallel
+PDF_POOL_WORKERS = int(os.getenv("PDF_POOL_WORKERS", str(min(4, os.cpu_count() or 1))))
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "8"))
+PDF_PAGE_TIMEOUT = float(os.getenv("PDF_PAGE_TIMEOUT", "5"))  # seconds per page
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+class PageTimeout(Exception):
+    """Raised inside a pool worker when a single page takes too long."""
+
+
+def _on_page_timeout(signum, frame):
+    raise PageTimeout()
+
+
+def _extract_pages(pdf_bytes, page_numbers, page_timeout):
+    """
+    Pool worker: extract the given pages, giving up on any page that exceeds page_timeout.
+
+    Runs in the worker's main thread, so SIGALRM can interrupt a stuck page and
+    free the worker for the next task. A timed-out page contributes empty text.
+    """
+    from pypdf import PdfReader
+
+    reader = PdfReader(BytesIO(pdf_bytes))
+    texts = []
+    use_alarm = hasattr(signal, "setitimer") and page_timeout > 0
+    if use_alarm:
+        previous = signal.signal(signal.SIGALRM, _on_page_timeout)
+    try:
+        for page_no in page_numbers:
+            try:
+                if use_alarm:
+                    signal.setitimer(signal.ITIMER_REAL, page_timeout)
+                texts.append(reader.pages[page_no].extract_text() or "")
+            except PageTimeout:
+                print(f"Warning: Page {page_no + 1} timed out after {page_timeout}s, skipping")
+                texts.append("")
+            finally:
+                if use_alarm:
+                    signal.setitimer(signal.ITIMER_REAL, 0)
+    finally:
+        if use_alarm:
+            signal.signal(signal.SIGALRM, previous)
+    return texts
+
+
+def preload():
+    """Import pypdf now rather than on the first upload."""
+    import pypdf
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # spawn: forking a threaded gunicorn/Flask worker is not safe
+                _pool = ProcessPoolExecutor(
+                    max_workers=PDF_POOL_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+    return _pool
+
+
+def shutdown_pool():
+    """Stop the extraction pool (it is recreated on next use)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def _extract_serial(reader, max_chars, page_texts):
+    pages = []
+    total = 0
+
+    for page_no, page in enumerate(reader.pages):
+        text = page_texts[page_no] if page_no in page_texts else (page.extract_text() or "")
+        pages.append(text)
+        total += len(text)
+        if max_chars is not None and total > max_chars:
+            break
+
+    return "".join(pages)
+
+
+def _extract_parallel(pdf_bytes, page_count, max_chars):
+    # One contiguous chunk per worker so the PDF bytes are shipped once per worker
+    chunk_size = math.ceil(page_count / PDF_POOL_WORKERS)
+    chunks = [list(range(start, min(start + chunk_size, page_count)))
+              for start in range(0, page_count, chunk_size)]
+
+    pool = _get_pool()
+    futures = [pool.submit(_extract_pages, pdf_bytes, chunk, PDF_PAGE_TIMEOUT) for chunk in chunks]
+
+    pages = []
+    total = 0
+    try:
+        # Collect in submission order so page order is preserved
+        for future, chunk in zip(futures, chunks):
+            # Backstop in case a worker ignores its per-page alarm
+            texts = future.result(timeout=PDF_PAGE_TIMEOUT * len(chunk) + 5)
+            for text in texts:
+                pages.append(text)
+                total += len(text)
+                if max_chars is not None and total > max_chars:
+                    return "".join(pages)
+    except FutureTimeoutError:
+        # A wedged worker would keep blocking the pool; start a fresh one
+        print("Warning: PDF extraction worker stalled, restarting pool")
+        shutdown_pool()
+        raise TimeoutError("PDF extraction timed out")
+    finally:
+        for future in futures:
+            future.cancel()
+
+    return "".join(pages)
+
+
+def extract_text(stream, max_chars=None, reader=None, page_texts=None):
+    """
+    Extract text from a PDF file object without touching disk.
+
+    Args:
+        stream: Binary file object positioned anywhere (rewound before reading)
+        max_chars: Stop extracting as soon as the text grows past this many characters
+        reader: PdfReader already opened on stream (see triage.check_pdf)
+        page_texts: {page index: text} already extracted from reader, reused by serial extraction
+
+    Returns:
+        The extracted text. When max_chars is exceeded the partial text returned
+        is already longer than max_chars, so callers can reject it with a length check.
+    """
+    if reader is None:
+        from pypdf import PdfReader
+
+        stream.seek(0)
+        reader = PdfReader(stream)
+    page_count = len(reader.pages)
+
+    if PDF_EXTRACT_ENGINE != "parallel" or page_count < PDF_PARALLEL_MIN_PAGES:
+        text = _extract_serial(reader, max_chars, page_texts or {})
+    else:
+        stream.seek(0)
+        text = _extract_parallel(stream.read(), page_count, max_chars)
+
+    metrics.PDF_PAGES.observe(page_count)
+    metrics.PDF_CHARS.observe(len(text))
+    return text
@@ -0,0 +1,455 @@
+# Resume analysis pipeline
+# Shared by the synchronous /process route and the background job workers:
+# PDF text -> ats_extractor -> (ATS score || job match)
+# The *_async variants drive the same plan on the event loop for asgi.py.
+
+import asyncio
+import contextlib
+import contextvars
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FutureTimeoutError
+
+import metrics
+import pdfextract
+import plans
+import ratelimit
+import resultstore
+import triage
+from plans import Step
+from resumeparser import (
+    ats_extractor, ats_extractor_stream, calculate_job_match, calculate_ats_score, parse_llm_json,
+    analyze_job_description, uses_jd_analysis, SectionStreamParser, STREAM_RESTART,
+    ats_extractor_async, ats_extractor_stream_async, calculate_job_match_async, calculate_ats_score_async,
+    parse_llm_json_async, analyze_job_description_async,
+)
+
+# ~20 pages. Resumes over chunking.CHUNK_TOKENS are extracted in chunks, so this
+# only bounds the number of chunks (and so the latency) for one upload.
+MAX_RESUME_CHARS = int(os.getenv("MAX_RESUME_CHARS", "100000"))
+
+# Scoring stages (job match, ATS score) run concurrently once extraction is done.
+# REQUEST_DEADLINE bounds the whole pipeline, extraction and rate-limit waits included.
+STAGE_WORKERS = int(os.getenv("STAGE_WORKERS", "4"))
+REQUEST_DEADLINE = float(os.getenv("REQUEST_DEADLINE", "60"))
+
+_stage_executor = ThreadPoolExecutor(max_workers=STAGE_WORKERS, thread_name_prefix="stage")
+
+
+class PipelineError(Exception):
+    """An error whose message is safe to show to the user as-is."""
+
+
+def extract_resume_text(stream):
+    """
+    Extract and validate resume text from an uploaded PDF.
+
+    Unusable uploads (see triage) are turned away before any Groq call.
+
+    Raises:
+        PipelineError: If the upload fails triage, no text could be extracted
+            or the resume is too long
+    """
+    try:
+        with metrics.timed("triage"):
+            reader, page_texts = triage.check_pdf(stream)
+
+        # Stops early once the limit is exceeded
+        with metrics.timed("pdf_extract"):
+            data = pdfextract.extract_text(stream, max_chars=MAX_RESUME_CHARS, reader=reader, page_texts=page_texts)
+
+        if not data.strip():
+            raise PipelineError("No text could be extracted from the PDF")
+
+        # Validate extracted text length (prevent token overflow)
+        if len(data) > MAX_RESUME_CHARS:
+            raise PipelineError("Resume is too long. Please use a shorter resume (max ~20 pages)")
+
+        triage.check_text(data)
+    except triage.Rejected as e:
+        raise PipelineError(str(e))
+
+    return data
+
+
+def parse_extraction(result):
+    """
+    Parse the raw ats_extractor response into a dict.
+
+    Raises:
+        PipelineError: If no valid resume JSON can be recovered from the response
+    """
+    # Recovers fenced or truncated JSON, retrying with a repair call if needed
+    try:
+        with metrics.timed("parse"):
+            return parse_llm_json(result, "extraction")
+    except ValueError:
+        raise PipelineError("Failed to parse response from AI model")
+
+
+def analyze(data, job_description, deadline=None, on_result=None, parsed=None, ats_score=None):
+    """
+    Run extraction and scoring for one resume.
+
+    Args:
+        data: Extracted resume text
+        job_description: Job description string, or empty to skip job matching
+        deadline: time.monotonic() value bounding the whole run (default: now + REQUEST_DEADLINE)
+        on_result: Optional callback(stage, result) invoked as soon as each of
+            "parsed", "ats_score" and "job_match" is available
+        parsed: ats_extractor output from an earlier run (see resumehandles); skips extraction
+        ats_score: ATS score from an earlier run; skips ATS scoring unless it was an error
+
+    Returns:
+        Dict with "parsed", "ats_score" and "job_match" (None without a job description)
+
+    Raises:
+        PipelineError: If the extractor response cannot be parsed
+    """
+    results = {}
+    plan = _analysis_plan(data, job_description, deadline, parsed, ats_score, stream=False)
+    for stage, result in plans.drive(plan, _STEPS):
+        results[stage] = result
+        if on_result is not None:
+            on_result(stage, result)
+    return _analysis_response(results)
+
+
+def analyze_stream(data, job_description, deadline=None, parsed=None, ats_score=None):
+    """
+    Streaming variant of analyze().
+
+    Yields (event, payload) tuples: ("section", {"key", "value"}) for each
+    top-level resume field as soon as the model has finished writing it, then
+    ("parsed", dict), then ("ats_score", ...) and ("job_match", ...) in
+    completion order. With parsed from an earlier run there are no "section"
+    events; a reused ats_score comes right after "parsed".
+
+    Raises:
+        PipelineError: If the extractor response cannot be parsed
+    """
+    yield from plans.drive(_analysis_plan(data, job_description, deadline, parsed, ats_score, stream=True), _STEPS)
+
+
+def _analysis_response(results):
+    return {"parsed": results["parsed"], "ats_score": results["ats_score"], "job_match": results.get("job_match")}
+
+
+# ---------------------------------------------------------------------------
+# The analysis is written once, as a plan (see plans.py) that yields its
+# (event, payload) results. analyze and analyze_stream run its steps with
+# _STEPS, the async variants with _ASYNC_STEPS.
+
+def _analysis_plan(data, job_description, deadline, parsed, ats_score, stream):
+    """The plan behind analyze, analyze_stream and their async variants; stream picks the streaming extractor."""
+    start = time.monotonic()
+    if deadline is None:
+        deadline = start + REQUEST_DEADLINE
+    timings = {}
+
+    with ratelimit.deadline(deadline):
+        # A future (a task under asyncio), or None
+        jd_pending = yield Step("start_jd_analysis", job_description)
+        if parsed is None:
+            if stream:
+                result = yield from _extraction_stream_plan(data, start, timings)
+            else:
+                # Call the ATS extractor
+                result = yield Step("extract", data)
+            timings["extract"] = time.monotonic() - start
+            parsed = yield Step("parse", result)
+        yield "parsed", parsed
+
+        results = {}
+        if reusable_ats_score(ats_score):
+            results["ats_score"] = ats_score
+            yield "ats_score", ats_score
+        stages = yield Step("stages", data, parsed, job_description, ats_score, jd_pending, deadline)
+        while True:
+            stage = yield Step("next", stages)
+            if stage is None:
+                break
+            name, value, elapsed = stage
+            results[name] = value
+            if elapsed is not None:
+                timings[name] = elapsed
+            yield name, value
+        _record_timings(timings, start)
+        yield Step("save", data, job_description, parsed, results["ats_score"], results.get("job_match"))
+
+
+def _extraction_stream_plan(data, start, timings):
+    """Stream the extraction, yielding a "section" event for each finished field; returns the response text."""
+    deltas = yield Step("extract_stream", data)
+    parser = SectionStreamParser()
+    chunks = []
+    while True:
+        delta = yield Step("next", deltas)
+        if delta is None:
+            return "".join(chunks)
+        if delta is STREAM_RESTART:
+            # Escalated to a larger model: its sections replace the ones already sent
+            parser = SectionStreamParser()
+            chunks = []
+            continue
+        if "first_token" not in timings:
+            timings["first_token"] = time.monotonic() - start
+        chunks.append(delta)
+        for key, value in parser.feed(delta):
+            yield "section", {"key": key, "value": value}
+
+
+def _iter_scoring_stages(data, parsed_data, job_description, ats_score, jd_future, deadline):
+    stages = _scoring_stages(data, parsed_data, job_description, ats_score, _jd_analysis_result(jd_future, deadline))
+    return iter_stages(stages, deadline)
+
+
+def reusable_ats_score(ats_score):
+    """Whether an ATS score from an earlier run can be reused (it exists and is not an error)."""
+    return isinstance(ats_score, dict) and "error" not in ats_score
+
+
+def _scoring_stages(data, parsed_data, job_description, ats_score=None, jd_analysis=None):
+    # Job match and ATS score only depend on the extraction output, so run them together
+    stages = {}
+    if not reusable_ats_score(ats_score):
+        stages["ats_score"] = (calculate_ats_score, (data, parsed_data))
+    if job_description:
+        stages["job_match"] = (calculate_job_match, (data, parsed_data, job_description, jd_analysis))
+    return stages
+
+
+def _start_jd_analysis(job_description):
+    """
+    Start analyzing the job description on the stage executor.
+
+    The analysis only needs the job description, so it runs while the resume
+    is extracted instead of in series with the job match call.
+
+    Returns:
+        The future, or None if the job match does not use an analysis
+    """
+    if not job_description or not uses_jd_analysis():
+        return None
+    return _stage_executor.submit(contextvars.copy_context().run, analyze_job_description, job_description)
+
+
+def _jd_analysis_result(future, deadline):
+    """
+    The analysis started by _start_jd_analysis, or None if there is none.
+
+    It is collected here in the request thread, not inside the job match
+    stage, so a busy stage executor cannot end up waiting on itself.
+    """
+    if future is None:
+        return None
+    try:
+        return future.result(timeout=max(0.0, deadline - time.monotonic()))
+    except Exception as e:
+        print(f"Warning: Job description analysis did not finish: {str(e)}")
+        return None
+
+
+def _record_timings(timings, start):
+    for name, elapsed in timings.items():
+        metrics.observe_stage(name, elapsed)
+    metrics.observe_stage("analyze", time.monotonic() - start)
+
+
+def _timed_call(fn, args):
+    """Run fn(*args) and return (result, exception, elapsed seconds)."""
+    start = time.monotonic()
+    try:
+        return fn(*args), None, time.monotonic() - start
+    except Exception as e:
+        return None, e, time.monotonic() - start
+
+
+def iter_stages(stages, deadline):
+    """
+    Run independent pipeline stages concurrently on the shared stage executor.
+
+    Args:
+        stages: Dict mapping stage name to a (function, args) tuple
+        deadline: time.monotonic() value by which all stages must finish
+
+    Yields:
+        (name, result, elapsed seconds) as each stage completes. A stage that
+        raised or missed the deadline yields {"error": ...} as its result (with
+        elapsed None on timeout) so one failing stage never fails the whole request.
+    """
+    # Each stage runs in a copy of the caller's context so it keeps the caller's
+    # rate-limit priority (see ratelimit.priority)
+    futures = {
+        _stage_executor.submit(contextvars.copy_context().run, _timed_call, fn, args): name
+        for name, (fn, args) in stages.items()
+    }
+
+    finished = set()
+    try:
+        for future in as_completed(futures, timeout=max(0.0, deadline - time.monotonic())):
+            name = futures[future]
+            finished.add(name)
+            value, error, elapsed = future.result()
+            if error is not None:
+                print(f"Error in stage {name}: {str(error)}")
+                # Don't fail the entire request if a scoring stage fails
+                value = {"error": str(error)}
+            yield name, value, elapsed
+    except FutureTimeoutError:
+        pass
+
+    for future, name in futures.items():
+        if name not in finished:
+            # Queued stages are dropped; a stage already in flight cannot be
+            # interrupted, but its result is discarded and its client timeout ends it.
+            future.cancel()
+            print(f"Stage {name} cancelled: request deadline exceeded")
+            yield name, {"error": "Timed out before the analysis finished. Please try again."}, None
+
+
+# ---------------------------------------------------------------------------
+# Async variants (asgi.py)
+
+async def extract_resume_text_async(stream):
+    """extract_resume_text on a worker thread, so PDF parsing never blocks the event loop."""
+    return await asyncio.to_thread(extract_resume_text, stream)
+
+
+async def parse_extraction_async(result):
+    """parse_extraction with the repair retry on the async Groq client."""
+    try:
+        with metrics.timed("parse"):
+            return await parse_llm_json_async(result, "extraction")
+    except ValueError:
+        raise PipelineError("Failed to parse response from AI model")
+
+
+async def analyze_async(data, job_description, deadline=None, parsed=None, ats_score=None):
+    """
+    analyze() on the async Groq client, with the same reuse of parsed and ats_score.
+
+    Returns:
+        Dict with "parsed", "ats_score" and "job_match" (None without a job description)
+
+    Raises:
+        PipelineError: If the extractor response cannot be parsed
+    """
+    results = {}
+    plan = _analysis_plan(data, job_description, deadline, parsed, ats_score, stream=False)
+    async with contextlib.aclosing(plans.drive_async(plan, _ASYNC_STEPS)) as events:
+        async for stage, result in events:
+            results[stage] = result
+    return _analysis_response(results)
+
+
+def analyze_stream_async(data, job_description, deadline=None, parsed=None, ats_score=None):
+    """
+    analyze_stream() on the async Groq client: an async generator of the same (event, payload) tuples.
+
+    Close it with aclose() if you stop early, so the stages still running are cancelled.
+
+    Raises:
+        PipelineError: If the extractor response cannot be parsed
+    """
+    plan = _analysis_plan(data, job_description, deadline, parsed, ats_score, stream=True)
+    return plans.drive_async(plan, _ASYNC_STEPS)
+
+
+async def _extraction_stream_async(data):
+    return ats_extractor_stream_async(data)
+
+
+async def _iter_scoring_stages_async(data, parsed_data, job_description, ats_score, jd_task, deadline):
+    return iter_stages_async(_scoring_stages_async(data, parsed_data, job_description, ats_score, jd_task), deadline)
+
+
+async def _save_async(*args):
+    if resultstore.enabled():
+        await asyncio.to_thread(resultstore.save, *args)
+
+
+def _scoring_stages_async(data, parsed_data, job_description, ats_score=None, jd_task=None):
+    stages = {}
+    if not reusable_ats_score(ats_score):
+        stages["ats_score"] = calculate_ats_score_async(data, parsed_data)
+    if job_description:
+        stages["job_match"] = _job_match_async(data, parsed_data, job_description, jd_task)
+    return stages
+
+
+async def _start_jd_analysis_async(job_description):
+    """_start_jd_analysis on the event loop: returns a task, or None."""
+    if not job_description or not uses_jd_analysis():
+        return None
+    return asyncio.ensure_future(analyze_job_description_async(job_description))
+
+
+async def _job_match_async(data, parsed_data, job_description, jd_task):
+    jd_analysis = await jd_task if jd_task is not None else None
+    return await calculate_job_match_async(data, parsed_data, job_description, jd_analysis)
+
+
+async def _timed_coroutine(coroutine):
+    start = time.monotonic()
+    return await coroutine, time.monotonic() - start
+
+
+async def iter_stages_async(stages, deadline):
+    """
+    iter_stages for coroutines: yield (name, result, elapsed seconds) in completion order.
+
+    A stage that raised yields {"error": ...} with elapsed None; stages still
+    running at the deadline, or when the caller stops iterating, are cancelled.
+
+    Args:
+        stages: Dict mapping stage name to a coroutine
+        deadline: time.monotonic() value by which all stages must finish
+    """
+    tasks = {asyncio.ensure_future(_timed_coroutine(coroutine)): name for name, coroutine in stages.items()}
+    pending = set(tasks)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, timeout=max(0.0, deadline - time.monotonic()), return_when=asyncio.FIRST_COMPLETED
+            )
+            if not done:
+                break
+            for task in done:
+                name = tasks[task]
+                if task.exception() is not None:
+                    print(f"Error in stage {name}: {str(task.exception())}")
+                    # Don't fail the entire request if a scoring stage fails
+                    yield name, {"error": str(task.exception())}, None
+                else:
+                    value, elapsed = task.result()
+                    yield name, value, elapsed
+
+        for task in pending:
+            task.cancel()
+            print(f"Stage {tasks[task]} cancelled: request deadline exceeded")
+            yield tasks[task], {"error": "Timed out before the analysis finished. Please try again."}, None
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+# The blocking steps of _analysis_plan, and their async twins
+_STEPS = {
+    "start_jd_analysis": _start_jd_analysis,
+    "extract": ats_extractor,
+    "extract_stream": ats_extractor_stream,
+    "parse": parse_extraction,
+    "stages": _iter_scoring_stages,
+    "next": plans.next_item,
+    "save": resultstore.save,
+}
+_ASYNC_STEPS = {
+    "start_jd_analysis": _start_jd_analysis_async,
+    "extract": ats_extractor_async,
+    "extract_stream": _extraction_stream_async,
+    "parse": parse_extraction_async,
+    "stages": _iter_scoring_stages_async,
+    "next": plans.anext_item,
+    "save": _save_async,
+}
@@ -0,0 +1,94 @@
+# Plans: request flows written once for the sync and the async server
+# A plan is a generator that yields its output (pipeline events, pieces of a
+# response body) and a Step for each blocking step it needs, and is sent back
+# the step's result (or has the step's exception thrown in). drive() runs the
+# steps with blocking functions for app.py and the job workers, drive_async()
+# with coroutines for asgi.py, so the flow itself is only written once.
+# (resumeparser's plans, which yield chat completion requests, work the same way.)
+
+import types
+
+
+class Step(tuple):
+    """A blocking step for the driver to run: (name, args, kwargs)."""
+
+    def __new__(cls, name, *args, **kwargs):
+        return super().__new__(cls, (name, args, kwargs))
+
+
+def drive(plan, steps):
+    """
+    Run a plan, yielding its output.
+
+    Generators returned by a step (e.g. an event stream the plan reads with a
+    "next" step) are closed when the plan ends or the caller stops early.
+
+    Args:
+        plan: The plan generator
+        steps: Dict mapping step name to the function that runs it
+    """
+    opened = []
+    try:
+        item = next(plan)
+        while True:
+            if not isinstance(item, Step):
+                yield item
+                item = next(plan)
+                continue
+            name, args, kwargs = item
+            try:
+                result = steps[name](*args, **kwargs)
+            except Exception as e:
+                item = plan.throw(e)
+            else:
+                if isinstance(result, types.GeneratorType):
+                    opened.append(result)
+                item = plan.send(result)
+    except StopIteration:
+        return
+    finally:
+        plan.close()
+        for generator in opened:
+            generator.close()
+
+
+async def drive_async(plan, steps):
+    """
+    drive() on the event loop: every function in steps returns an awaitable.
+
+    Async generators returned by a step are closed with aclose(), which
+    cancels the work they still have running.
+    """
+    opened = []
+    try:
+        item = next(plan)
+        while True:
+            if not isinstance(item, Step):
+                yield item
+                item = next(plan)
+                continue
+            name, args, kwargs = item
+            try:
+                result = await steps[name](*args, **kwargs)
+            except Exception as e:
+                item = plan.throw(e)
+            else:
+                if isinstance(result, types.AsyncGeneratorType):
+                    opened.append(result)
+                item = plan.send(result)
+    except StopIteration:
+        return
+    finally:
+        plan.close()
+        for generator in opened:
+            await generator.aclose()
+
+
+def next_item(items):
+    """The "next" step: the next item of a generator, or None once it is exhausted."""
+    return next(items, None)
+
+
+def anext_item(items):
+    """next_item for async generators (returns an awaitable)."""
+    return anext(items, None)
@@ -0,0 +1,361 @@
+# Prompt building for the Groq calls
+# Every prompt is split into a static system message (instructions + schema,
+# byte-identical across calls so provider-side prompt caching can reuse it) and
+# a user message carrying only the per-request data, compacted:
+#   - PDF text with whitespace normalized
+#   - parsed resume JSON without indentation or empty fields
+#   - no resume content sent twice in the same prompt
+
+import functools
+import json
+import os
+import re
+
+import metrics
+
+# tiktoken encoding, loaded on first use (reading the BPE ranks takes a while); False if unavailable
+_encoding = None
+
+# Resume tokens a scoring prompt carries before it switches from the raw text
+# to the (much shorter) parsed resume; see resume_context()
+PROMPT_RESUME_TOKENS = int(os.getenv("PROMPT_RESUME_TOKENS", "6000"))
+
+_SPACES_RE = re.compile(r"[ \t\f\v\u00a0]+")
+_ZERO_WIDTH_RE = re.compile(r"[\u200b\u200c\u200d\ufeff]")
+_BLANK_LINES_RE = re.compile(r"\n{3,}")
+
+
+def normalize_whitespace(text):
+    """Collapse runs of spaces/tabs, trim every line and keep at most one blank line in a row."""
+    text = (text or "").replace("\r\n", "\n").replace("\r", "\n")
+    text = _SPACES_RE.sub(" ", _ZERO_WIDTH_RE.sub("", text))
+    text = "\n".join(line.strip() for line in text.split("\n"))
+    return _BLANK_LINES_RE.sub("\n\n", text).strip()
+
+
+def drop_empty(data):
+    """Recursively remove empty strings, lists, dicts and None values."""
+    if isinstance(data, dict):
+        cleaned = {k: drop_empty(v) for k, v in data.items()}
+        return {k: v for k, v in cleaned.items() if v not in ("", None, [], {})}
+    if isinstance(data, list):
+        cleaned = [drop_empty(v) for v in data]
+        return [v for v in cleaned if v not in ("", None, [], {})]
+    if isinstance(data, str):
+        return data.strip()
+    return data
+
+
+def compact_json(data):
+    """Serialize without indentation or empty fields."""
+    return json.dumps(drop_empty(data), separators=(",", ":"), ensure_ascii=False)
+
+
+def _get_encoding():
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _encoding = False
+    return _encoding
+
+
+def estimate_tokens(text):
+    """Token count with tiktoken when installed, else the ~4 characters per token rule of thumb."""
+    encoding = _get_encoding()
+    if encoding:
+        return len(encoding.encode(text))
+    return (len(text) + 3) // 4
+
+
+def _messages_tokens(messages):
+    return sum(estimate_tokens(m["content"]) for m in messages)
+
+
+def resume_context(resume_text, parsed_resume):
+    """
+    Resume content for a scoring prompt: the normalized text, or for resumes over
+    PROMPT_RESUME_TOKENS the compact parsed resume, which covers every section
+    where truncating the text would drop the later ones.
+
+    Returns:
+        Tuple of (content, is_parsed)
+    """
+    text = normalize_whitespace(resume_text)
+    if estimate_tokens(text) <= PROMPT_RESUME_TOKENS or not isinstance(parsed_resume, dict) or not parsed_resume:
+        return text, False
+    return "(Parsed from a long resume)\n" + compact_json(parsed_resume), True
+
+
+def record_savings(stage, before, messages):
+    """Record estimated input tokens before and after compaction for one call in /metrics."""
+    after = _messages_tokens(messages)
+    metrics.PROMPT_TOKENS.labels(prompt=stage, version="before").observe(before)
+    metrics.PROMPT_TOKENS.labels(prompt=stage, version="after").observe(after)
+    return after
+
+
+# ---------------------------------------------------------------------------
+# Resume extraction
+
+EXTRACTION_SCHEMA = {
+    "full_name": "string", "email": "string", "phone": "string", "location": "string",
+    "linkedin_url": "string", "github_url": "string", "portfolio_url": "string", "summary": "string",
+    "education": [{"degree": "string", "institution": "string", "graduation_year": "string",
+                   "gpa": "string", "relevant_coursework": "string"}],
+    "work_experience": [{"company_name": "string", "job_title": "string", "start_date": "string",
+                         "end_date": "string", "responsibilities": ["string"], "achievements": ["string"]}],
+    "projects": [{"project_name": "string", "description": "string", "technologies_used": ["string"],
+                  "link": "string", "duration": "string"}],
+    "leadership_roles": [{"role_title": "string", "organization": "string", "duration": "string",
+                          "responsibilities": ["string"]}],
+    "volunteering_experience": [{"organization": "string", "role": "string", "duration": "string",
+                                 "activities": ["string"]}],
+    "technical_skills": {"programming_languages": ["string"], "frameworks": ["string"], "tools": ["string"],
+                         "databases": ["string"], "cloud_platforms": ["string"],
+                         "other_technical_skills": ["string"]},
+    "soft_skills": ["string"],
+    "certifications": [{"certification_name": "string", "issuing_organization": "string",
+                        "date_obtained": "string"}],
+    "awards_and_achievements": [{"award_name": "string", "issuing_organization": "string", "date": "string",
+                                 "description": "string"}],
+    "languages": [{"language_name": "string", "proficiency_level": "string"}],
+    "publications": [{"title": "string", "publication_venue": "string", "date": "string",
+                      "co_authors": "string"}],
+}
+
+_EXTRACTION_HEAD = (
+    "You are an AI bot designed to act as a professional for parsing resumes. "
+    "Extract ALL available information from the resume and return it in this JSON format:\n"
+)
+_EXTRACTION_TAIL = (
+    "\nReturn ONLY valid JSON. No explanatory text before or after. Extract as much detail as possible. "
+    'If information is not available for a field, use "" for strings or [] for arrays.'
+)
+EXTRACTION_PROMPT = _EXTRACTION_HEAD + json.dumps(EXTRACTION_SCHEMA, separators=(",", ":")) + _EXTRACTION_TAIL
+
+
+@functools.lru_cache(maxsize=None)
+def _pretty_extraction_tokens():
+    """
+    Tokens of the same prompt with the schema pretty-printed, as it used to be sent,
+    for the before/after report. Counted on first use, not at import, so importing
+    this module never loads the tokenizer.
+    """
+    return estimate_tokens(_EXTRACTION_HEAD + json.dumps(EXTRACTION_SCHEMA, indent=6) + _EXTRACTION_TAIL)
+
+
+def extraction_messages(resume_text, part=None):
+    """
+    Messages for ats_extractor: static schema prefix, then the normalized resume text.
+
+    Args:
+        resume_text: Resume text, or one chunk of it
+        part: (index, count) when resume_text is one chunk of a longer resume
+    """
+    content = normalize_whitespace(resume_text)
+    if part is not None:
+        content = (f"(Part {part[0]} of {part[1]} of a longer resume. Extract only what this part contains; "
+                   f"leave everything else empty.)\n\n{content}")
+    messages = [
+        {"role": "system", "content": EXTRACTION_PROMPT},
+        {"role": "user", "content": content},
+    ]
+    record_savings("extract", _pretty_extraction_tokens() + estimate_tokens(resume_text), messages)
+    return messages
+
+
+# ---------------------------------------------------------------------------
+# Job match
+
+JOB_MATCH_FORMAT = (
+    '{"overall_match_score":<number 0-100>,"category_scores":{"skills_match":<number 0-100>,'
+    '"experience_match":<number 0-100>,"education_match":<number 0-100>,"keyword_match":<number 0-100>},'
+    '"matching_skills":["skill"],"missing_skills":["skill"],"matching_keywords":["keyword"],'
+    '"missing_keywords":["keyword"],"strengths":["strength"],"recommendations":["recommendation"],'
+    '"summary":"Brief summary of the match"}'
+)
+
+JOB_MATCH_PROMPT = (
+    "You are an expert HR analyst specializing in resume-job matching. Analyze how well the resume "
+    "matches the job (given either as the full job description or as its analyzed requirements) "
+    "and return ONLY this JSON:\n"
+    + JOB_MATCH_FORMAT
+    + "\nBe specific and actionable in your recommendations."
+)
+
+
+def job_match_messages(resume_text, parsed_resume, job_description, jd_analysis=None):
+    """
+    Messages for calculate_job_match.
+
+    Args:
+        jd_analysis: Analyzed job description (see jobdescription.py); when given
+            it is sent instead of the full job description text
+    """
+    resume, _ = resume_context(resume_text, parsed_resume)
+    if jd_analysis is not None:
+        job = f"JOB REQUIREMENTS:\n{compact_json(jd_analysis)}"
+    else:
+        job = f"JOB DESCRIPTION:\n{normalize_whitespace(job_description)}"
+    messages = [
+        {"role": "system", "content": JOB_MATCH_PROMPT},
+        {"role": "user", "content": f"RESUME DATA:\n{resume}\n\n{job}"},
+    ]
+    before = estimate_tokens(JOB_MATCH_PROMPT) + estimate_tokens(resume_text) + estimate_tokens(job_description)
+    record_savings("job_match", before, messages)
+    return messages
+
+
+# ---------------------------------------------------------------------------
+# Job description analysis
+
+JD_ANALYSIS_FORMAT = (
+    '{"title":"job title","seniority":"intern|junior|mid|senior|lead|principal",'
+    '"required_skills":["skill"],"preferred_skills":["skill"],"keywords":["keyword"],'
+    '"min_years_experience":<number>,"education":"bachelor|master|phd or empty"}'
+)
+
+JD_ANALYSIS_PROMPT = (
+    "You are an expert technical recruiter. Reduce the job description to the requirements a resume "
+    "is screened against and return ONLY this JSON:\n"
+    + JD_ANALYSIS_FORMAT
+    + "\nrequired_skills are the must-haves, preferred_skills the nice-to-haves. Use short canonical "
+    "skill names (\"python\", \"kubernetes\"), no sentences. keywords are up to 15 other domain terms "
+    "a screener would look for. Use 0 or \"\" when the description does not say."
+)
+
+
+def jd_analysis_messages(job_description):
+    """Messages for the job description analysis (cached per job description)."""
+    messages = [
+        {"role": "system", "content": JD_ANALYSIS_PROMPT},
+        {"role": "user", "content": normalize_whitespace(job_description)},
+    ]
+    record_savings("jd_analysis", estimate_tokens(JD_ANALYSIS_PROMPT) + estimate_tokens(job_description), messages)
+    return messages
+
+
+# ---------------------------------------------------------------------------
+# ATS scoring
+
+ATS_SCORE_FORMAT = (
+    '{"overall_ats_score":<number 0-100>,"category_scores":{"contact_info":<n>,"keyword_density":<n>,'
+    '"format_compatibility":<n>,"section_organization":<n>,"experience_quantification":<n>,'
+    '"education_details":<n>,"skills_presence":<n>},'
+    '"strengths":["3-5 specific ATS-friendly strengths"],"weaknesses":["3-5 specific weaknesses"],'
+    '"improvement_suggestions":["5-7 specific, actionable suggestions"],'
+    '"keyword_analysis":{"present_keywords":["10-15 important keywords found"],'
+    '"missing_keywords":["10-15 common industry keywords to add"]},'
+    '"format_issues":["tables, images, columns, special characters, etc."],'
+    '"summary":"2-3 sentence overall assessment of ATS readiness"}'
+)
+
+ATS_FEEDBACK_FORMAT = (
+    '{"strengths":["3-5 specific strengths that make this resume ATS-friendly"],'
+    '"weaknesses":["3-5 specific weaknesses that hurt ATS compatibility"],'
+    '"improvement_suggestions":["5-7 specific, actionable suggestions to improve ATS score"],'
+    '"missing_keywords":["10-15 common industry keywords that should be added"],'
+    '"summary":"2-3 sentence overall assessment of ATS readiness"}'
+)
+
+ATS_SCORE_PROMPT = (
+    "You are an expert ATS (Applicant Tracking System) analyzer. Evaluate the resume and score (0-100) "
+    "each ATS criterion:\n"
+    "1. contact_info (10%): name, email, phone, location provided?\n"
+    "2. keyword_density (25%): relevant industry keywords, skills and job-related terms?\n"
+    "3. format_compatibility (15%): clean, parseable structure, no complex formatting?\n"
+    "4. section_organization (15%): standard sections present (Experience, Education, Skills)?\n"
+    "5. experience_quantification (15%): achievements quantified with metrics and numbers?\n"
+    "6. education_details (10%): degree, institution, year complete?\n"
+    "7. skills_presence (10%): technical and soft skills clearly listed?\n"
+    "The user message has the resume text and a summary of what a parser extracted from it.\n"
+    "Return ONLY this JSON:\n"
+    + ATS_SCORE_FORMAT
+)
+
+ATS_FEEDBACK_PROMPT = (
+    "You are an expert ATS (Applicant Tracking System) analyzer. The user message has ATS category "
+    "scores (0-100) already computed for a resume, followed by the resume text. Return ONLY this JSON:\n"
+    + ATS_FEEDBACK_FORMAT
+)
+
+
+def extraction_summary(parsed_resume):
+    """
+    What the parser found, without repeating resume content that is already in
+    the raw text: contact fields, section entry counts and the skills list.
+    """
+    parsed_resume = parsed_resume if isinstance(parsed_resume, dict) else {}
+    summary = {
+        "contact": {k: parsed_resume.get(k) for k in ("full_name", "email", "phone", "location")},
+        "sections": {k: len(v) for k, v in parsed_resume.items() if isinstance(v, list) and v},
+    }
+    technical = parsed_resume.get("technical_skills")
+    if isinstance(technical, dict):
+        summary["technical_skills"] = technical
+    education = parsed_resume.get("education")
+    if isinstance(education, list):
+        summary["education"] = [
+            {k: e.get(k) for k in ("degree", "institution", "graduation_year")}
+            for e in education if isinstance(e, dict)
+        ]
+    return summary
+
+
+def ats_score_messages(resume_text, parsed_resume):
+    """Messages for the full-LLM ATS score (ATS_SCORING_MODE=llm)."""
+    resume, is_parsed = resume_context(resume_text, parsed_resume)
+    content = f"Resume Data:\n{resume}"
+    if not is_parsed:
+        content += f"\n\nParsed Information:\n{compact_json(extraction_summary(parsed_resume))}"
+    messages = [
+        {"role": "system", "content": ATS_SCORE_PROMPT},
+        {"role": "user", "content": content},
+    ]
+    before = (estimate_tokens(ATS_SCORE_PROMPT) + estimate_tokens(resume_text)
+              + estimate_tokens(json.dumps(parsed_resume, indent=2)))
+    record_savings("ats_score", before, messages)
+    return messages
+
+
+def ats_feedback_messages(resume_text, parsed_resume, category_scores):
+    """Messages for the feedback-only call (ATS_SCORING_MODE=hybrid)."""
+    resume, _ = resume_context(resume_text, parsed_resume)
+    messages = [
+        {"role": "system", "content": ATS_FEEDBACK_PROMPT},
+        {"role": "user", "content": f"Scores:\n{compact_json(category_scores)}\n\nResume Data:\n{resume}"},
+    ]
+    before = estimate_tokens(ATS_FEEDBACK_PROMPT) + estimate_tokens(resume_text) + estimate_tokens(
+        json.dumps(category_scores))
+    record_savings("ats_feedback", before, messages)
+    return messages
+
+
+# ---------------------------------------------------------------------------
+# JSON repair
+
+RESPONSE_FORMATS = {
+    "extraction": json.dumps(EXTRACTION_SCHEMA, separators=(",", ":")),
+    "job_match": JOB_MATCH_FORMAT,
+    "jd_analysis": JD_ANALYSIS_FORMAT,
+    "ats_score": ATS_SCORE_FORMAT,
+    "ats_feedback": ATS_FEEDBACK_FORMAT,
+}
+
+REPAIR_PROMPT = (
+    "You fix malformed JSON. The user message has a response that should have been JSON in the "
+    "format below but is invalid, cut off or missing required fields. Return ONLY the corrected JSON "
+    "object. Keep every value that is present; do not invent content. Close anything left unfinished.\n"
+    "Format:\n"
+)
+
+
+def repair_messages(content, kind):
+    """Messages for the cheap retry that turns an unparseable response into valid JSON."""
+    return [
+        {"role": "system", "content": REPAIR_PROMPT + RESPONSE_FORMATS[kind]},
+        {"role": "user", "content": content},
+    ]
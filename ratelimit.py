@@ -0,0 +1,388 @@
+# Client-side rate limiting for Groq calls
+# Two token buckets per model, requests per minute and tokens per minute, so a
+# burst waits for quota instead of turning into a wall of 429s. Callers that
+# cannot be served yet wait in a priority queue per model: interactive requests
+# go ahead of background jobs, which go ahead of batch scoring.
+#
+# RATE_LIMIT_BACKEND=memory shares the buckets between the threads of one
+# process; sqlite shares them between all gunicorn workers through one file.
+# Bucket sizes adapt to the x-ratelimit-* headers Groq returns, and a 429 pauses
+# every caller for its Retry-After.
+
+import asyncio
+import heapq
+import itertools
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from prompts import estimate_tokens
+
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory").lower()  # memory | sqlite | off
+RATE_LIMIT_PATH = os.getenv("RATE_LIMIT_PATH", os.path.join("__CACHE__", "ratelimit.sqlite3"))
+LLM_RPM = float(os.getenv("LLM_RPM", "30"))
+LLM_TPM = float(os.getenv("LLM_TPM", "12000"))
+# Longest a call waits for quota before giving up (never past its request's deadline)
+RATE_LIMIT_MAX_WAIT = float(os.getenv("RATE_LIMIT_MAX_WAIT", "60"))
+# Output tokens reserved per call before its real usage is known (capped at its
+# max_tokens); the difference is settled from the usage Groq reports
+RATE_LIMIT_OUTPUT_TOKENS = int(os.getenv("RATE_LIMIT_OUTPUT_TOKENS", "600"))
+
+# Priorities, lowest value served first
+INTERACTIVE = 0
+BACKGROUND = 1
+BATCH = 2
+
+_priority = ContextVar("llm_priority", default=INTERACTIVE)
+_deadline = ContextVar("llm_deadline", default=None)
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+class RateLimitTimeout(Exception):
+    """A call waited longer than RATE_LIMIT_MAX_WAIT for rate-limit quota."""
+
+
+@contextmanager
+def priority(level):
+    """Run the body's Groq calls at the given priority (INTERACTIVE, BACKGROUND or BATCH)."""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+@contextmanager
+def deadline(when):
+    """Stop the body's Groq calls waiting for quota at when (a time.monotonic() value)."""
+    token = _deadline.set(when)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def _max_wait(max_wait):
+    """max_wait, shortened to what is left of the current deadline."""
+    when = _deadline.get()
+    if when is None:
+        return max_wait
+    return min(max_wait, when - time.monotonic())
+
+
+def estimate_cost(messages, max_tokens):
+    """
+    Tokens to reserve for a call: the prompt plus a typical response.
+
+    Reserving the whole max_tokens budget would serialize calls long before
+    the real TPM limit; settle() corrects the estimate once usage is known.
+    """
+    output = min(max_tokens, RATE_LIMIT_OUTPUT_TOKENS) if max_tokens else RATE_LIMIT_OUTPUT_TOKENS
+    return sum(estimate_tokens(m.get("content") or "") for m in messages) + output
+
+
+def parse_duration(value):
+    """Parse Groq reset durations such as "7.66s", "2m59.56s" or "120ms" into seconds."""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_RE.findall(value)
+    if not parts:
+        return None
+    return sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts)
+
+
+# ---------------------------------------------------------------------------
+# Bucket state
+# One dict per model, so the memory and SQLite backends share the same logic:
+# {"requests", "tokens": current levels, "rpm", "tpm": capacities,
+#  "updated": last refill (wall clock), "blocked_until": wall clock}
+
+def _new_state(now):
+    return {"requests": LLM_RPM, "tokens": LLM_TPM, "rpm": LLM_RPM, "tpm": LLM_TPM,
+            "updated": now, "blocked_until": 0.0}
+
+
+def _refill(state, now):
+    elapsed = max(0.0, now - state["updated"])
+    state["requests"] = min(state["rpm"], state["requests"] + elapsed * state["rpm"] / 60)
+    state["tokens"] = min(state["tpm"], state["tokens"] + elapsed * state["tpm"] / 60)
+    state["updated"] = now
+
+
+def _take(state, now, tokens):
+    """Take one request and `tokens` tokens; return 0 on success, else seconds until they may be available."""
+    _refill(state, now)
+    if now < state["blocked_until"]:
+        return state["blocked_until"] - now
+    tokens = min(tokens, state["tpm"])  # an oversized call must still be able to run on a full bucket
+    if state["requests"] >= 1 and state["tokens"] >= tokens:
+        state["requests"] -= 1
+        state["tokens"] -= tokens
+        return 0.0
+    return max((1 - state["requests"]) * 60 / state["rpm"], (tokens - state["tokens"]) * 60 / state["tpm"], 0.01)
+
+
+def _observe(state, now, headers, status_code):
+    """Adapt the buckets to Groq's x-ratelimit-* headers and 429 responses."""
+    _refill(state, now)
+    limit_tokens = headers.get("x-ratelimit-limit-tokens")
+    if limit_tokens:
+        state["tpm"] = float(limit_tokens)
+    remaining_tokens = headers.get("x-ratelimit-remaining-tokens")
+    if remaining_tokens:
+        state["tokens"] = min(state["tokens"], float(remaining_tokens))
+        if float(remaining_tokens) <= 0:
+            reset = parse_duration(headers.get("x-ratelimit-reset-tokens"))
+            state["blocked_until"] = max(state["blocked_until"], now + (reset or 1.0))
+    # Groq's request headers count a daily quota; only honour it once it runs out
+    remaining_requests = headers.get("x-ratelimit-remaining-requests")
+    if remaining_requests and float(remaining_requests) <= 0:
+        reset = parse_duration(headers.get("x-ratelimit-reset-requests"))
+        state["blocked_until"] = max(state["blocked_until"], now + (reset or 60.0))
+    if status_code == 429:
+        retry_after = parse_duration(headers.get("retry-after")) or 1.0
+        state["blocked_until"] = max(state["blocked_until"], now + retry_after)
+        state["tokens"] = min(state["tokens"], 0.0)
+
+
+def _refund(state, now, tokens):
+    _refill(state, now)
+    state["tokens"] = min(state["tpm"], state["tokens"] + tokens)
+
+
+class MemoryBuckets:
+    """Bucket state shared by the threads of this process."""
+
+    blocking = False  # updates take microseconds; safe on the event loop
+
+    def __init__(self):
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def update(self, model, fn):
+        with self._lock:
+            now = time.time()
+            state = self._states.setdefault(model, _new_state(now))
+            return fn(state, now)
+
+
+class SQLiteBuckets:
+    """Bucket state shared by every process using the same SQLite file."""
+
+    blocking = True  # BEGIN IMMEDIATE may wait up to 10s for another worker
+
+    def __init__(self, path=RATE_LIMIT_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS buckets (model TEXT PRIMARY KEY, state TEXT NOT NULL)")
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def update(self, model, fn):
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            row = conn.execute("SELECT state FROM buckets WHERE model = ?", (model,)).fetchone()
+            state = json.loads(row[0]) if row else _new_state(now)
+            result = fn(state, now)
+            conn.execute("INSERT OR REPLACE INTO buckets (model, state) VALUES (?, ?)", (model, json.dumps(state)))
+            conn.execute("COMMIT")
+            return result
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+
+class RateLimiter:
+    """
+    Token-bucket governor with a priority wait queue per model.
+
+    Only the highest-priority waiter (then the oldest) for a model takes from
+    its buckets, so lower-priority work queues up behind it instead of competing
+    for quota, while calls to a model with quota left never wait on another.
+    Bucket updates run without self._cond held, and off the event loop for
+    async callers when the backend blocks (SQLite locks between workers).
+    """
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self._cond = threading.Condition()
+        self._waiting = {}  # model -> heap of (priority, sequence)
+        self._sequence = itertools.count()
+        # Bumped on every change a waiter may be waiting for, so no wakeup is lost
+        self._version = 0
+        # (loop, asyncio.Event) of each acquire_async waiter, set by _notify
+        self._async_waiters = set()
+
+    def acquire(self, model, tokens, max_wait=RATE_LIMIT_MAX_WAIT):
+        """
+        Block until one request and `tokens` tokens are available for model.
+
+        Returns:
+            Seconds spent waiting
+
+        Raises:
+            RateLimitTimeout: If the quota was not available within max_wait
+                seconds, or before the deadline set by deadline()
+        """
+        start = time.monotonic()
+        max_wait = _max_wait(max_wait)
+        entry = self._enqueue(model)
+        try:
+            while True:
+                version, first = self._head(model, entry)
+                taken = self.buckets.update(model, lambda state, now: _take(state, now, tokens)) if first else None
+                wait = self._next_wait(taken, model, start, max_wait)
+                if wait == 0:
+                    return time.monotonic() - start
+                with self._cond:
+                    self._cond.wait_for(lambda: self._version != version, timeout=wait)
+        finally:
+            self._dequeue(model, entry)
+
+    async def acquire_async(self, model, tokens, max_wait=RATE_LIMIT_MAX_WAIT):
+        """acquire() for the event loop: waits in the same queue without blocking other tasks."""
+        start = time.monotonic()
+        max_wait = _max_wait(max_wait)
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._cond:
+            self._async_waiters.add(waiter)
+        entry = self._enqueue(model)
+        try:
+            while True:
+                # Clear before looking at the queue so a _notify from here on is not lost
+                waiter[1].clear()
+                _, first = self._head(model, entry)
+                taken = None
+                if first:
+                    taken = await self._update_async(model, lambda state, now: _take(state, now, tokens))
+                wait = self._next_wait(taken, model, start, max_wait)
+                if wait == 0:
+                    return time.monotonic() - start
+                try:
+                    await asyncio.wait_for(waiter[1].wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            with self._cond:
+                self._async_waiters.discard(waiter)
+            self._dequeue(model, entry)
+
+    async def _update_async(self, model, fn):
+        if self.buckets.blocking:
+            return await asyncio.to_thread(self.buckets.update, model, fn)
+        return self.buckets.update(model, fn)
+
+    def _enqueue(self, model):
+        entry = (_priority.get(), next(self._sequence))
+        with self._cond:
+            heapq.heappush(self._waiting.setdefault(model, []), entry)
+        return entry
+
+    def _dequeue(self, model, entry):
+        with self._cond:
+            waiting = self._waiting[model]
+            waiting.remove(entry)
+            if waiting:
+                heapq.heapify(waiting)
+            else:
+                del self._waiting[model]
+            self._notify()
+
+    def _head(self, model, entry):
+        """Return (current version, whether entry is first in model's queue)."""
+        with self._cond:
+            return self._version, self._waiting[model][0] == entry
+
+    def _notify(self):
+        """Wake every waiter. Call with self._cond held."""
+        self._version += 1
+        self._cond.notify_all()
+        for loop, event in self._async_waiters:
+            loop.call_soon_threadsafe(event.set)
+
+    def _next_wait(self, taken, model, start, max_wait):
+        """
+        Turn the result of a take attempt into the next wait.
+
+        Args:
+            taken: What _take returned, or None if the entry was not first in its queue
+
+        Returns:
+            0 once the quota is taken, else seconds to wait before polling again
+
+        Raises:
+            RateLimitTimeout: If the quota cannot be available within max_wait seconds
+        """
+        if taken == 0:
+            return 0.0
+        remaining = max_wait - (time.monotonic() - start)
+        if remaining <= 0 or (taken is not None and taken > remaining):
+            raise RateLimitTimeout(
+                f"Groq rate limit: no quota for {model} within {max(max_wait, 0):.0f}s, try again shortly"
+            )
+        # Re-check at least every half second: other workers share SQLite buckets
+        return min(taken if taken is not None else 0.5, 0.5, remaining)
+
+    def observe(self, model, headers, status_code):
+        """Feed a response's rate-limit headers (or a 429) back into the buckets."""
+        self.buckets.update(model, lambda state, now: _observe(state, now, headers, status_code))
+        with self._cond:
+            self._notify()
+
+    async def observe_async(self, model, headers, status_code):
+        """observe() for the event loop."""
+        await self._update_async(model, lambda state, now: _observe(state, now, headers, status_code))
+        with self._cond:
+            self._notify()
+
+    def settle(self, model, estimated, actual):
+        """Correct a call's estimated token cost once its real usage is known (refund or charge the rest)."""
+        if actual is not None and estimated != actual:
+            self.buckets.update(model, lambda state, now: _refund(state, now, estimated - actual))
+            with self._cond:
+                self._notify()
+
+    async def settle_async(self, model, estimated, actual):
+        """settle() for the event loop."""
+        if actual is not None and estimated != actual:
+            await self._update_async(model, lambda state, now: _refund(state, now, estimated - actual))
+            with self._cond:
+                self._notify()
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_limiter():
+    """Return the process-wide limiter, or None when RATE_LIMIT_BACKEND=off."""
+    global _limiter
+    if RATE_LIMIT_BACKEND == "off":
+        return None
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                buckets = SQLiteBuckets() if RATE_LIMIT_BACKEND == "sqlite" else MemoryBuckets()
+                _limiter = RateLimiter(buckets)
+    return _limiter
@@ -0,0 +1,194 @@
+# Content-addressed cache for LLM results
+# Keys are SHA-256 hashes of the inputs, so an identical resume (or resume + job
+# description) skips the Groq call entirely. In-memory LRU by default, optional
+# SQLite backend so entries survive restarts and are shared between workers.
+
+import copy
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory").lower()  # memory | sqlite | off
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "1024"))
+CACHE_TTL = float(os.getenv("CACHE_TTL", "86400"))  # seconds
+CACHE_PATH = os.getenv("CACHE_PATH", os.path.join("__CACHE__", "results.sqlite3"))
+
+
+def normalize_text(text):
+    """Lowercase and collapse whitespace so cosmetic edits don't change the key."""
+    return " ".join((text or "").split()).lower()
+
+
+def make_key(namespace, *parts):
+    """
+    Build a cache key from a namespace and any JSON-serializable parts.
+
+    Dicts are serialized with sorted keys so equal content always hashes the same.
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        if not isinstance(part, str):
+            part = json.dumps(part, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x00")
+    return f"{namespace}:{digest.hexdigest()}"
+
+
+class MemoryCache:
+    """Thread-safe LRU cache with per-entry TTL."""
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return copy.deepcopy(value)
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl, copy.deepcopy(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteCache:
+    """SQLite-backed cache with the same LRU/TTL semantics, shareable across processes."""
+
+    def __init__(self, path=CACHE_PATH, max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+            " expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed_at)")
+        self._conn.commit()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] < now:
+                self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+        return json.loads(row[0])
+
+    def set(self, key, value):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now + self.ttl, now),
+            )
+            self._conn.execute("DELETE FROM cache WHERE expires_at < ?", (now,))
+            self._conn.execute(
+                "DELETE FROM cache WHERE key IN ("
+                " SELECT key FROM cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache")
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+
+_stats = {"hits": 0, "misses": 0}
+_stats_lock = threading.Lock()
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def _get_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                if CACHE_BACKEND == "sqlite":
+                    _backend = SQLiteCache()
+                else:
+                    _backend = MemoryCache()
+    return _backend
+
+
+def blocking():
+    """Whether get and put do SQLite I/O, so async callers should run them on a worker thread."""
+    return CACHE_BACKEND == "sqlite"
+
+
+def get(key):
+    """Return the cached value for key, or None on a miss."""
+    if CACHE_BACKEND == "off":
+        return None
+    try:
+        value = _get_backend().get(key)
+    except Exception as e:
+        print(f"Warning: Cache read failed: {str(e)}")
+        value = None
+    with _stats_lock:
+        _stats["hits" if value is not None else "misses"] += 1
+    return value
+
+
+def put(key, value):
+    """Store a JSON-serializable value under key."""
+    if CACHE_BACKEND == "off":
+        return
+    try:
+        _get_backend().set(key, value)
+    except Exception as e:
+        print(f"Warning: Cache write failed: {str(e)}")
+
+
+def stats():
+    """Return hit/miss counters and the current entry count."""
+    with _stats_lock:
+        counters = dict(_stats)
+    lookups = counters["hits"] + counters["misses"]
+    counters["hit_rate"] = counters["hits"] / lookups if lookups else 0.0
+    counters["backend"] = CACHE_BACKEND
+    counters["entries"] = len(_get_backend()) if CACHE_BACKEND != "off" else 0
+    return counters
@@ -0,0 +1,279 @@
+# Persistent store of scored resumes
+# Every finished analysis (ats_extractor output, ATS score, job match) is kept in
+# SQLite as one zlib-compressed JSON blob, with the fields worth querying (name,
+# email, scores, skills) copied into indexed columns. /results pages through it
+# with keyset cursors, so listing the top ATS scores or every resume with a
+# given skill reads one page of rows however large the table grows.
+#
+# RESULT_STORE=off by default: the rows hold personal data and the app has no
+# authentication. Enable it only behind something that restricts who can reach it.
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+import metrics
+import resultcache
+from matching import normalize_skill, resume_skills
+
+RESULT_STORE = os.getenv("RESULT_STORE", "off").lower()  # sqlite | off
+RESULT_STORE_PATH = os.getenv("RESULT_STORE_PATH", os.path.join("__CACHE__", "resultstore.sqlite3"))
+
+MAX_PAGE_SIZE = 100
+DEFAULT_PAGE_SIZE = 20
+
+# Sort name -> column; rows are always ordered by (column, id) descending
+SORTS = {"ats_score": "ats_score", "match_score": "match_score", "recent": "updated_at"}
+
+_SUMMARY_COLUMNS = (
+    "id, full_name, email, ats_score, match_score, jd_hash, created_at, updated_at,"
+    " (SELECT json_group_array(skill) FROM result_skills WHERE result_id = results.id)"
+)
+
+
+def _score(result, field):
+    """The overall score of a stage result, or None if the stage failed or did not run."""
+    if not isinstance(result, dict) or "error" in result:
+        return None
+    value = result.get(field)
+    return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+
+
+def _compress(value):
+    return zlib.compress(json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8"))
+
+
+def _decompress(blob):
+    return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+
+def jd_hash(job_description):
+    """Key a job description the way the result cache does ("" without one)."""
+    if not job_description:
+        return ""
+    return resultcache.make_key("jd", resultcache.normalize_text(job_description))
+
+
+class ResultStore:
+    """Scored resumes in a SQLite file, shared by every gunicorn worker on the host."""
+
+    def __init__(self, path=RESULT_STORE_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        conn = self._conn()
+        conn.executescript(
+            "PRAGMA journal_mode=WAL;"
+            "CREATE TABLE IF NOT EXISTS results ("
+            " id INTEGER PRIMARY KEY, content_hash TEXT NOT NULL, jd_hash TEXT NOT NULL,"
+            " full_name TEXT NOT NULL, name_key TEXT NOT NULL, email TEXT NOT NULL,"
+            " ats_score REAL, match_score REAL, data BLOB NOT NULL,"
+            " created_at REAL NOT NULL, updated_at REAL NOT NULL,"
+            " UNIQUE (content_hash, jd_hash));"
+            "CREATE INDEX IF NOT EXISTS results_ats ON results (ats_score, id);"
+            "CREATE INDEX IF NOT EXISTS results_match ON results (match_score, id);"
+            "CREATE INDEX IF NOT EXISTS results_jd_match ON results (jd_hash, match_score, id);"
+            "CREATE INDEX IF NOT EXISTS results_updated ON results (updated_at, id);"
+            "CREATE INDEX IF NOT EXISTS results_name ON results (name_key);"
+            "CREATE INDEX IF NOT EXISTS results_email ON results (email);"
+            "CREATE TABLE IF NOT EXISTS result_skills ("
+            " skill TEXT NOT NULL, result_id INTEGER NOT NULL,"
+            " PRIMARY KEY (skill, result_id)) WITHOUT ROWID;"
+            "CREATE INDEX IF NOT EXISTS result_skills_result ON result_skills (result_id);"
+        )
+
+    def _conn(self):
+        # One connection per thread; sqlite3 connections are not thread-safe
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def save(self, resume_text, job_description, parsed, ats_score, job_match=None):
+        """
+        Insert or replace the result for this resume and job description.
+
+        Returns:
+            The row id
+        """
+        now = time.time()
+        parsed = parsed if isinstance(parsed, dict) else {}
+        full_name = str(parsed.get("full_name") or "").strip()
+        content_hash = resultcache.make_key("resume", resultcache.normalize_text(resume_text))
+        key = (content_hash, jd_hash(job_description))
+        blob = _compress({
+            "parsed": parsed, "ats_score": ats_score, "job_match": job_match,
+            "job_description": job_description or "",
+        })
+
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT INTO results (content_hash, jd_hash, full_name, name_key, email, ats_score,"
+                " match_score, data, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (content_hash, jd_hash) DO UPDATE SET full_name = excluded.full_name,"
+                " name_key = excluded.name_key, email = excluded.email, ats_score = excluded.ats_score,"
+                " match_score = excluded.match_score, data = excluded.data, updated_at = excluded.updated_at",
+                (*key, full_name, full_name.lower(), str(parsed.get("email") or "").strip().lower(),
+                 _score(ats_score, "overall_ats_score"), _score(job_match, "overall_match_score"),
+                 blob, now, now),
+            )
+            row_id = conn.execute(
+                "SELECT id FROM results WHERE content_hash = ? AND jd_hash = ?", key
+            ).fetchone()[0]
+            conn.execute("DELETE FROM result_skills WHERE result_id = ?", (row_id,))
+            conn.executemany(
+                "INSERT OR IGNORE INTO result_skills (skill, result_id) VALUES (?, ?)",
+                [(skill, row_id) for skill in resume_skills(parsed)],
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return row_id
+
+    def query(self, sort="ats_score", skills=(), min_ats=None, min_match=None, name=None, email=None,
+              jd=None, limit=DEFAULT_PAGE_SIZE, cursor=None):
+        """
+        One page of result summaries, best first.
+
+        Args:
+            sort: "ats_score", "match_score" or "recent"; sorting by a score skips rows without one
+            skills: Skills every result must list (normalized like matching.resume_skills)
+            min_ats: Lowest ATS score to include
+            min_match: Lowest job match score to include
+            name: Case-insensitive prefix of the candidate's name
+            email: Exact email address (case-insensitive)
+            jd: jd_hash of the job description the resume was scored against
+            limit: Page size, at most MAX_PAGE_SIZE
+            cursor: next_cursor of the previous page
+
+        Returns:
+            Dict with "results" (summaries without the full analysis) and
+            "next_cursor" (None on the last page)
+
+        Raises:
+            ValueError: If sort or cursor is invalid
+        """
+        if sort not in SORTS:
+            raise ValueError(f"Unknown sort {sort!r} (expected one of {', '.join(SORTS)})")
+        column = SORTS[sort]
+        limit = min(max(int(limit), 1), MAX_PAGE_SIZE)
+
+        where, params = [], []
+        if column != "updated_at":
+            where.append(f"{column} IS NOT NULL")
+        if min_ats is not None:
+            where.append("ats_score >= ?")
+            params.append(float(min_ats))
+        if min_match is not None:
+            where.append("match_score >= ?")
+            params.append(float(min_match))
+        if name:
+            # Prefix range on the name_key index
+            prefix = name.strip().lower()
+            where.append("name_key >= ? AND name_key < ?")
+            params.extend([prefix, prefix + "\U0010ffff"])
+        if email:
+            where.append("email = ?")
+            params.append(email.strip().lower())
+        if jd is not None:
+            where.append("jd_hash = ?")
+            params.append(jd)
+        for skill in dict.fromkeys(normalize_skill(s) for s in skills if s and s.strip()):
+            where.append("id IN (SELECT result_id FROM result_skills WHERE skill = ?)")
+            params.append(skill)
+        if cursor:
+            value, row_id = _parse_cursor(cursor)
+            where.append(f"({column}, id) < (?, ?)")
+            params.extend([value, row_id])
+
+        sql = f"SELECT {_SUMMARY_COLUMNS} FROM results"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += f" ORDER BY {column} DESC, id DESC LIMIT ?"
+        rows = self._conn().execute(sql, (*params, limit + 1)).fetchall()
+
+        results = [_summary(row) for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            last = rows[limit - 1]
+            sort_value = {"ats_score": last[3], "match_score": last[4], "updated_at": last[7]}[column]
+            next_cursor = f"{sort_value!r}:{last[0]}"
+        return {"results": results, "next_cursor": next_cursor}
+
+    def get(self, result_id):
+        """The stored analysis with its summary fields, or None if unknown."""
+        conn = self._conn()
+        row = conn.execute(f"SELECT {_SUMMARY_COLUMNS}, data FROM results WHERE id = ?", (result_id,)).fetchone()
+        if row is None:
+            return None
+        return {**_summary(row), **_decompress(row[-1])}
+
+    def __len__(self):
+        return self._conn().execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+
+def _parse_cursor(cursor):
+    """Split a "value:id" cursor; raises ValueError if it is malformed."""
+    value, sep, row_id = str(cursor).rpartition(":")
+    if not sep:
+        raise ValueError("Invalid cursor")
+    try:
+        return float(value), int(row_id)
+    except ValueError:
+        raise ValueError("Invalid cursor")
+
+
+def _summary(row):
+    return {
+        "id": row[0], "full_name": row[1], "email": row[2], "ats_score": row[3], "match_score": row[4],
+        "jd_hash": row[5], "created_at": row[6], "updated_at": row[7], "skills": json.loads(row[8]),
+    }
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def enabled():
+    return RESULT_STORE == "sqlite"
+
+
+def get_store():
+    """Return the configured store, creating it on first use."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ResultStore()
+    return _store
+
+
+def save(resume_text, job_description, parsed, ats_score, job_match=None):
+    """Store a finished analysis if the store is enabled; a failure is logged, never raised."""
+    if not enabled():
+        return None
+    try:
+        with metrics.timed("store"):
+            return get_store().save(resume_text, job_description, parsed, ats_score, job_match)
+    except Exception as e:
+        print(f"Warning: Could not store result: {str(e)}")
+        return None
+
+
+def query(**filters):
+    """ResultStore.query on the configured store."""
+    return get_store().query(**filters)
+
+
+def get(result_id):
+    """ResultStore.get on the configured store."""
+    return get_store().get(result_id)
@@ -0,0 +1,90 @@
+# Resume handles
+# The first /process upload stores the extracted text, the ats_extractor output
+# and the ATS score under a random handle. A later request that sends the handle
+# instead of the PDF (e.g. after editing the job description) skips the upload,
+# extraction and ATS scoring and only runs the job match. Under the default
+# JOB_MATCH_MODE=structured that is the JD analysis plus the match call for a new
+# job description, and the match call alone once its analysis is cached.
+#
+# RESUME_HANDLE_BACKEND=memory keeps handles inside one worker process;
+# sqlite shares them between workers. Handles hold personal data, so they expire
+# after RESUME_HANDLE_TTL seconds without use.
+
+import os
+import secrets
+import threading
+
+import metrics
+from resultcache import MemoryCache, SQLiteCache
+
+RESUME_HANDLE_BACKEND = os.getenv("RESUME_HANDLE_BACKEND", "memory").lower()  # memory | sqlite | off
+RESUME_HANDLE_TTL = float(os.getenv("RESUME_HANDLE_TTL", "3600"))  # seconds since last use
+RESUME_HANDLE_MAX_ENTRIES = int(os.getenv("RESUME_HANDLE_MAX_ENTRIES", "1024"))
+RESUME_HANDLE_PATH = os.getenv("RESUME_HANDLE_PATH", os.path.join("__CACHE__", "resumehandles.sqlite3"))
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def _get_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                if RESUME_HANDLE_BACKEND == "sqlite":
+                    _backend = SQLiteCache(RESUME_HANDLE_PATH, RESUME_HANDLE_MAX_ENTRIES, RESUME_HANDLE_TTL)
+                else:
+                    _backend = MemoryCache(RESUME_HANDLE_MAX_ENTRIES, RESUME_HANDLE_TTL)
+    return _backend
+
+
+def enabled():
+    return RESUME_HANDLE_BACKEND != "off"
+
+
+def blocking():
+    """Whether get and put do SQLite I/O, so async callers should run them on a worker thread."""
+    return RESUME_HANDLE_BACKEND == "sqlite"
+
+
+def put(handle, resume_text, parsed, ats_score):
+    """
+    Store an analyzed resume, renewing its expiry.
+
+    Args:
+        handle: Existing handle to update, or None to create a new one
+        resume_text: Extracted resume text
+        parsed: ats_extractor output
+        ats_score: ATS score result
+
+    Returns:
+        The handle, or None if handles are off or could not be stored
+    """
+    if not enabled():
+        return None
+    created = handle is None
+    if created:
+        handle = secrets.token_urlsafe(18)
+    try:
+        _get_backend().set(handle, {"text": resume_text, "parsed": parsed, "ats_score": ats_score})
+    except Exception as e:
+        print(f"Warning: Could not store resume handle: {str(e)}")
+        return None
+    if created:
+        metrics.RESUME_HANDLES.labels(outcome="created").inc()
+    return handle
+
+
+def get(handle):
+    """
+    Return {"text", "parsed", "ats_score"} for a handle, or None if it is unknown or expired.
+    """
+    if not enabled() or not handle:
+        return None
+    try:
+        entry = _get_backend().get(handle)
+    except Exception as e:
+        print(f"Warning: Could not read resume handle: {str(e)}")
+        entry = None
+    metrics.RESUME_HANDLES.labels(outcome="reused" if entry is not None else "expired").inc()
+    return entry
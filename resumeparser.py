@@ -1,35 +1,70 @@
 # import libraries
 
-from openai import OpenAI
-import yaml
 import os
 import json
+import time
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+import llmclient
+import resultcache
+import atsscoring
+import jobdescription
+import prompts
+import metrics
+import chunking
 
-api_key = None
-CONFIG_PATH = r"config.yaml"
+# llm: the model scores everything (original behaviour)
+# hybrid: scores are computed locally, the model only writes the qualitative feedback
+# local: no model call at all
+ATS_SCORING_MODE = os.getenv("ATS_SCORING_MODE", "hybrid").lower()
 
-# Try to get API key from environment first, then fallback to config file
-api_key = os.getenv("GROQ_API_KEY")
+# llm: the model reads the full job description for every resume (original behaviour)
+# structured: the job description is analyzed once (cached) and the model matches
+#   each resume against that compact summary
+# local: resumes are matched against the analysis without a model call
+JOB_MATCH_MODE = os.getenv("JOB_MATCH_MODE", "structured").lower()
 
-if not api_key:
-    try:
-        with open(CONFIG_PATH) as file:
-            data = yaml.safe_load(file)  # Use safe_load to prevent code execution
-            api_key = data.get('GROQ_API_KEY')
-    except FileNotFoundError:
-        print(f"Warning: Config file {CONFIG_PATH} not found and GROQ_API_KEY environment variable not set")
-    except Exception as e:
-        print(f"Warning: Error reading config file: {str(e)}")
+# How a job description is analyzed: llm (small model first, see MODEL_ROUTES)
+# or local (heuristics in jobdescription.py). A failed model call falls back to local.
+JD_ANALYSIS_MODE = os.getenv("JD_ANALYSIS_MODE", "llm").lower()
 
-if not api_key or api_key == "YOUR KEY HERE":
-    raise ValueError(
-        "Groq API key not configured. Please set the GROQ_API_KEY environment variable "
-        "or update the key in config.yaml"
-    )
+# Small, fast model used only to repair a response that could not be parsed locally
+REPAIR_MODEL = os.getenv("REPAIR_MODEL", "llama-3.1-8b-instant")
+
+# Output budget per response kind, shared by the original call and its repair retry
+RESPONSE_MAX_TOKENS = {"extraction": 3500, "job_match": 2000, "jd_analysis": 600, "ats_score": 2500,
+                       "ats_feedback": 800}
+
+# Model tiers per response kind (comma-separated, fastest first). Each model's
+# response is validated and escalates to the next model only if it is invalid
+# or incomplete; the last model gets the REPAIR_MODEL retry instead.
+MODEL_ROUTES = {
+    "extraction": os.getenv("EXTRACTION_MODELS", "llama-3.1-8b-instant,llama-3.3-70b-versatile"),
+    "ats_score": os.getenv("ATS_MODELS", "llama-3.1-8b-instant,llama-3.3-70b-versatile"),
+    "job_match": os.getenv("JOB_MATCH_MODELS", "llama-3.3-70b-versatile"),
+    "jd_analysis": os.getenv("JD_ANALYSIS_MODELS", "llama-3.1-8b-instant,llama-3.3-70b-versatile"),
+}
+MODEL_ROUTES["ats_feedback"] = MODEL_ROUTES["ats_score"]
+MODEL_ROUTES = {kind: [m.strip() for m in models.split(",") if m.strip()] for kind, models in MODEL_ROUTES.items()}
+
+# Timeout for every model but the last in a route, so a slow answer still leaves time to escalate
+FAST_MODEL_TIMEOUT = float(os.getenv("FAST_MODEL_TIMEOUT", "10"))
+
+# Yielded by ats_extractor_stream when it escalates to a larger model: the text
+# streamed so far is void and the next model's response follows
+STREAM_RESTART = object()
+
+# Chunks of a long resume are extracted concurrently (see chunking.py)
+_chunk_executor = ThreadPoolExecutor(max_workers=chunking.CHUNK_WORKERS, thread_name_prefix="chunk")
 
 def ats_extractor(resume_data):
     """
     Extract structured information from resume text using Groq AI.
+
+    Resumes longer than chunking.CHUNK_TOKENS are split on section boundaries,
+    the chunks are extracted in parallel and the results merged.
     
     Args:
         resume_data: String containing the resume text
@@ -43,227 +78,348 @@ def ats_extractor(resume_data):
     if not resume_data or not resume_data.strip():
         raise ValueError("Resume data is empty")
 
-    prompt = '''
-    You are an AI bot designed to act as a professional for parsing resumes. Extract ALL available information from the resume and return it in the following JSON format.
-
-    IMPORTANT: Return ONLY valid JSON. No explanatory text before or after.
-
-    {
-      "full_name": "string",
-      "email": "string",
-      "phone": "string",
-      "location": "string",
-      "linkedin_url": "string",
-      "github_url": "string",
-      "portfolio_url": "string",
-      "summary": "string",
-      "education": [
-        {
-          "degree": "string",
-          "institution": "string",
-          "graduation_year": "string",
-          "gpa": "string",
-          "relevant_coursework": "string"
-        }
-      ],
-      "work_experience": [
-        {
-          "company_name": "string",
-          "job_title": "string",
-          "start_date": "string",
-          "end_date": "string",
-          "responsibilities": ["string"],
-          "achievements": ["string"]
-        }
-      ],
-      "projects": [
-        {
-          "project_name": "string",
-          "description": "string",
-          "technologies_used": ["string"],
-          "link": "string",
-          "duration": "string"
-        }
-      ],
-      "leadership_roles": [
-        {
-          "role_title": "string",
-          "organization": "string",
-          "duration": "string",
-          "responsibilities": ["string"]
-        }
-      ],
-      "volunteering_experience": [
-        {
-          "organization": "string",
-          "role": "string",
-          "duration": "string",
-          "activities": ["string"]
-        }
-      ],
-      "technical_skills": {
-        "programming_languages": ["string"],
-        "frameworks": ["string"],
-        "tools": ["string"],
-        "databases": ["string"],
-        "cloud_platforms": ["string"],
-        "other_technical_skills": ["string"]
-      },
-      "soft_skills": ["string"],
-      "certifications": [
-        {
-          "certification_name": "string",
-          "issuing_organization": "string",
-          "date_obtained": "string"
-        }
-      ],
-      "awards_and_achievements": [
-        {
-          "award_name": "string",
-          "issuing_organization": "string",
-          "date": "string",
-          "description": "string"
-        }
-      ],
-      "languages": [
-        {
-          "language_name": "string",
-          "proficiency_level": "string"
-        }
-      ],
-      "publications": [
-        {
-          "title": "string",
-          "publication_venue": "string",
-          "date": "string",
-          "co_authors": "string"
-        }
-      ]
-    }
-
-    Extract as much detail as possible from the resume. If information is not available for a field, use empty string "" for strings or empty array [] for arrays.
-    '''
+    cache_key = resultcache.make_key("extract", resume_data)
+    cached = resultcache.get(cache_key)
+    if cached is not None:
+        return cached
 
     try:
-        # Initialize Groq client with timeout
-        groq_client = OpenAI(
-            api_key=api_key,
-            base_url="https://api.groq.com/openai/v1",
-            timeout=30.0  # 30 second timeout
-        )
+        if chunking.needs_chunking(resume_data):
+            data = _extract_chunked(resume_data)
+        else:
+            data = json.dumps(_run(_route_plan("extraction", prompts.extraction_messages(resume_data), 0.1)))
+        resultcache.put(cache_key, data)
+
+        return data
+    
+    except Exception as e:
+        raise Exception(f"Failed to extract resume information: {str(e)}")
 
-        messages=[
-            {"role": "system", "content": prompt}
-        ]
-        
-        user_content = resume_data
-        
-        messages.append({"role": "user", "content": user_content})
 
-        response = groq_client.chat.completions.create(
-                    model="llama-3.3-70b-versatile",
+async def ats_extractor_async(resume_data):
+    """ats_extractor on the async Groq client (see asgi.py)."""
+    if not resume_data or not resume_data.strip():
+        raise ValueError("Resume data is empty")
+
+    cache_key = resultcache.make_key("extract", resume_data)
+    cached = await _cache_step_async(functools.partial(resultcache.get, cache_key))
+    if cached is not None:
+        return cached
+
+    try:
+        if chunking.needs_chunking(resume_data):
+            chunk_messages = _chunk_messages(resume_data)
+            results = await asyncio.gather(
+                *(_run_async(_route_plan("extraction", messages, 0.1)) for messages in chunk_messages),
+                return_exceptions=True,
+            )
+            data = _merge_chunks(results)
+        else:
+            plan = _route_plan("extraction", prompts.extraction_messages(resume_data), 0.1)
+            data = json.dumps(await _run_async(plan))
+        await _cache_step_async(functools.partial(resultcache.put, cache_key, data))
+        return data
+
+    except Exception as e:
+        raise Exception(f"Failed to extract resume information: {str(e)}")
+
+
+def _chunk_messages(resume_data):
+    chunks = chunking.chunk_text(resume_data)
+    print(f"Resume split into {len(chunks)} chunks for extraction")
+    return [prompts.extraction_messages(chunk, part=(i, len(chunks))) for i, chunk in enumerate(chunks, 1)]
+
+
+def _extract_chunked(resume_data):
+    """Extract each chunk of a long resume concurrently and return the merged JSON string."""
+    futures = [
+        _chunk_executor.submit(contextvars.copy_context().run, _run, _route_plan("extraction", messages, 0.1))
+        for messages in _chunk_messages(resume_data)
+    ]
+    results = []
+    for future in futures:
+        try:
+            results.append(future.result())
+        except ValueError as e:
+            results.append(e)
+    return _merge_chunks(results)
+
+
+def _merge_chunks(results):
+    """Merge per-chunk extractions into one JSON string, skipping chunks that raised ValueError."""
+    partials = []
+    for i, result in enumerate(results, 1):
+        if isinstance(result, ValueError):
+            print(f"Warning: could not parse extraction for chunk {i}/{len(results)}, skipping it")
+        elif isinstance(result, BaseException):
+            raise result
+        else:
+            partials.append(result)
+    if not partials:
+        raise ValueError("No chunk of the resume could be parsed")
+    return json.dumps(chunking.merge_extractions(partials))
+
+
+def ats_extractor_stream(resume_data):
+    """
+    Streaming variant of ats_extractor: yields the JSON response text as it arrives.
+
+    A cache hit, or a resume long enough to need chunked extraction, yields the
+    whole response at once. Feed the chunks to a SectionStreamParser to get
+    top-level sections as soon as they are complete. If a model fails or its
+    response fails validation and the extraction escalates to the next model
+    in MODEL_ROUTES, STREAM_RESTART is yielded before the new response.
+    """
+    if not resume_data or not resume_data.strip():
+        raise ValueError("Resume data is empty")
+
+    if chunking.needs_chunking(resume_data):
+        yield ats_extractor(resume_data)
+    else:
+        yield from _stream(_extraction_stream_plan(resume_data))
+
+
+async def ats_extractor_stream_async(resume_data):
+    """ats_extractor_stream on the async Groq client (see asgi.py); same events, including STREAM_RESTART."""
+    if not resume_data or not resume_data.strip():
+        raise ValueError("Resume data is empty")
+
+    if chunking.needs_chunking(resume_data):
+        yield await ats_extractor_async(resume_data)
+    else:
+        async for delta in _stream_async(_extraction_stream_plan(resume_data)):
+            yield delta
+
+
+def _extraction_stream_plan(resume_data):
+    """
+    Stream plan for ats_extractor_stream: the routing of _route_plan, but every
+    model's response is streamed to the caller as it arrives.
+
+    The final model's response is passed on even if it is invalid: the
+    caller's parse_llm_json retries it with REPAIR_MODEL.
+    """
+    cache_key = resultcache.make_key("extract", resume_data)
+    cached = yield from _cache_get(cache_key)
+    if cached is not None:
+        yield cached
+        return
+
+    models = MODEL_ROUTES["extraction"]
+    messages = prompts.extraction_messages(resume_data)
+    try:
+        for i, model in enumerate(models):
+            final = i == len(models) - 1
+            start = time.monotonic()
+            try:
+                data = yield dict(
+                    model=model,
                     messages=messages,
                     temperature=0.1,
-                    max_tokens=3500)
-            
-        data = response.choices[0].message.content
+                    max_tokens=RESPONSE_MAX_TOKENS["extraction"],
+                    **_tier_options(final),
+                )
+            except Exception as e:
+                _record_route("extraction", model, "error", start)
+                if final:
+                    raise
+                print(f"Warning: {model} failed on extraction ({str(e)}), escalating to {models[i + 1]}")
+                yield STREAM_RESTART
+                continue
+
+            outcome, _ = _route_outcome(data, "extraction")
+            if final and outcome == "incomplete":
+                outcome = "accepted"  # nothing left to escalate to
+            _record_route("extraction", model, outcome, start)
+            if outcome == "accepted":
+                yield from _cache_put(cache_key, data)
+                return
+            if final:
+                return
+            print(f"Warning: {outcome} extraction response from {model}, escalating to {models[i + 1]}")
+            yield STREAM_RESTART
 
-        return data
-    
     except Exception as e:
         raise Exception(f"Failed to extract resume information: {str(e)}")
 
 
-def calculate_job_match(resume_data, parsed_resume, job_description):
+class SectionStreamParser:
+    """
+    Incrementally parse a streamed JSON object, emitting each top-level field
+    (full_name, education, work_experience, ...) as soon as its value is complete.
+
+    Text before the opening brace (e.g. a code fence) and after the closing
+    brace is ignored.
+    """
+
+    def __init__(self):
+        self._member = []  # characters of the current top-level "key": value pair
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._finished = False
+
+    def feed(self, chunk):
+        """Consume a chunk of text and return a list of completed (key, value) pairs."""
+        completed = []
+        for char in chunk:
+            if self._finished:
+                break
+            if self._depth == 0:
+                if char == "{":
+                    self._depth = 1
+                continue
+
+            if self._in_string:
+                self._member.append(char)
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if self._depth == 1 and char in ",}":
+                member = self._emit()
+                if member is not None:
+                    completed.append(member)
+                if char == "}":
+                    self._depth = 0
+                    self._finished = True
+                continue
+
+            self._member.append(char)
+            if char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+        return completed
+
+    def _emit(self):
+        text = "".join(self._member).strip()
+        self._member = []
+        if not text:
+            return None
+        try:
+            member = json.loads("{" + text + "}")
+        except json.JSONDecodeError:
+            return None
+        return next(iter(member.items()), None)
+
+
+def calculate_job_match(resume_data, parsed_resume, job_description, jd_analysis=None):
     """
     Calculate how well the resume matches the job description.
+
+    Unless JOB_MATCH_MODE=llm the job description is first reduced to a cached
+    analysis (see analyze_job_description), so repeat job descriptions cost
+    only the resume side of the prompt, or no model call at all in local mode.
     
     Args:
         resume_data: String containing the raw resume text
         parsed_resume: Dict with parsed resume data
         job_description: String containing the job description
+        jd_analysis: analyze_job_description output computed ahead of time
+            (see pipeline), or None to analyze the job description here
     
     Returns:
         Dict with match score and detailed analysis
     """
     if not job_description or not job_description.strip():
         return None
-    
-    prompt = f'''
-    You are an expert HR analyst. Analyze how well this resume matches the job description and provide a detailed assessment.
-
-    RESUME DATA:
-    {resume_data[:3000]}  # Limit to avoid token overflow
-
-    JOB DESCRIPTION:
-    {job_description}
-
-    Provide a comprehensive analysis in the following JSON format:
-
-    {{
-      "overall_match_score": <number 0-100>,
-      "category_scores": {{
-        "skills_match": <number 0-100>,
-        "experience_match": <number 0-100>,
-        "education_match": <number 0-100>,
-        "keyword_match": <number 0-100>
-      }},
-      "matching_skills": ["skill1", "skill2"],
-      "missing_skills": ["skill1", "skill2"],
-      "matching_keywords": ["keyword1", "keyword2"],
-      "missing_keywords": ["keyword1", "keyword2"],
-      "strengths": ["strength1", "strength2"],
-      "recommendations": ["recommendation1", "recommendation2"],
-      "summary": "Brief summary of the match"
-    }}
-
-    Be specific and actionable in your recommendations.
-    '''
+    return _run(_job_match_plan(resume_data, parsed_resume, job_description, jd_analysis))
 
-    try:
-        groq_client = OpenAI(
-            api_key=api_key,
-            base_url="https://api.groq.com/openai/v1",
-            timeout=30.0  # 30 second timeout
-        )
 
-        response = groq_client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[
-                {"role": "system", "content": "You are an expert HR analyst specializing in resume-job matching."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.2,
-            max_tokens=2000
-        )
-        
-        result = response.choices[0].message.content
-        
-        # Try to parse as JSON
-        try:
-            import json
-            match_data = json.loads(result)
-            return match_data
-        except json.JSONDecodeError:
-            # Try to extract JSON from response
-            import re
-            json_match = re.search(r'\{.*\}', result, re.DOTALL)
-            if json_match:
-                try:
-                    match_data = json.loads(json_match.group(0))
-                    return match_data
-                except:
-                    pass
-            
-            # If all fails, return a basic structure
-            return {
-                "overall_match_score": 50,
-                "summary": "Unable to parse detailed analysis. Please try again.",
-                "error": "JSON parsing failed"
-            }
-    
+async def calculate_job_match_async(resume_data, parsed_resume, job_description, jd_analysis=None):
+    """calculate_job_match on the async Groq client (see asgi.py)."""
+    if not job_description or not job_description.strip():
+        return None
+    return await _run_async(_job_match_plan(resume_data, parsed_resume, job_description, jd_analysis))
+
+
+def _job_match_key(resume_data, job_description):
+    jd_key = resultcache.make_key("jd", resultcache.normalize_text(job_description))
+    return resultcache.make_key(f"job_match:{JOB_MATCH_MODE}", resume_data, jd_key)
+
+
+def _job_match_plan(resume_data, parsed_resume, job_description, jd_analysis=None):
+    cache_key = _job_match_key(resume_data, job_description)
+    cached = yield from _cache_get(cache_key)
+    if cached is not None:
+        return cached
+
+    try:
+        match_data = yield from _match_plan(resume_data, parsed_resume, job_description, jd_analysis)
     except Exception as e:
         raise Exception(f"Failed to calculate job match: {str(e)}")
+    yield from _cache_put(cache_key, match_data)
+    return match_data
+
+
+def _match_plan(resume_data, parsed_resume, job_description, jd_analysis):
+    if JOB_MATCH_MODE == "llm":
+        messages = prompts.job_match_messages(resume_data, parsed_resume, job_description)
+        return (yield from _route_plan("job_match", messages, 0.2))
+    analysis = jd_analysis if jd_analysis is not None else (yield from _jd_analysis_plan(job_description))
+    if JOB_MATCH_MODE == "local":
+        return jobdescription.local_job_match(resume_data, parsed_resume, analysis)
+    messages = prompts.job_match_messages(resume_data, parsed_resume, job_description, jd_analysis=analysis)
+    return (yield from _route_plan("job_match", messages, 0.2))
+
+
+def uses_jd_analysis():
+    """Whether job matching works from a job description analysis (any JOB_MATCH_MODE but llm)."""
+    return JOB_MATCH_MODE != "llm"
+
+
+def analyze_job_description(job_description):
+    """
+    Reduce a job description to its required/preferred skills, seniority and keywords.
+
+    The analysis is cached under the normalized job description, so every
+    resume matched against the same job reuses it.
+
+    Args:
+        job_description: String containing the job description
+
+    Returns:
+        Dict with title, seniority, required_skills, preferred_skills, keywords,
+        min_years_experience and education
+    """
+    return _run(_jd_analysis_plan(job_description))
+
+
+async def analyze_job_description_async(job_description):
+    """analyze_job_description on the async Groq client (see asgi.py)."""
+    return await _run_async(_jd_analysis_plan(job_description))
+
+
+def _jd_analysis_plan(job_description):
+    cache_key = resultcache.make_key(f"jd_analysis:{JD_ANALYSIS_MODE}", resultcache.normalize_text(job_description))
+    cached = yield from _cache_get(cache_key)
+    if cached is not None:
+        metrics.JD_ANALYSES.labels(source="cache").inc()
+        return cached
+
+    source = JD_ANALYSIS_MODE
+    if JD_ANALYSIS_MODE == "local":
+        analysis = jobdescription.analyze_locally(job_description)
+    else:
+        try:
+            analysis = yield from _route_plan("jd_analysis", prompts.jd_analysis_messages(job_description), 0)
+        except Exception as e:
+            print(f"Warning: Job description analysis failed, using the local analyzer: {str(e)}")
+            analysis = jobdescription.analyze_locally(job_description)
+            source = "fallback"
+    analysis = jobdescription.normalize_analysis(analysis)
+    metrics.JD_ANALYSES.labels(source=source).inc()
+    # A fallback is not cached, so the next request for this job tries the model again
+    if source != "fallback":
+        yield from _cache_put(cache_key, analysis)
+    return analysis
 
 
 def calculate_ats_score(resume_data, parsed_resume):
@@ -283,114 +439,495 @@ def calculate_ats_score(resume_data, parsed_resume):
     """
     if not resume_data or not resume_data.strip():
         raise ValueError("Resume data is empty")
+    return _run(_ats_score_plan(resume_data, parsed_resume))
+
+
+async def calculate_ats_score_async(resume_data, parsed_resume):
+    """calculate_ats_score on the async Groq client (see asgi.py)."""
+    if not resume_data or not resume_data.strip():
+        raise ValueError("Resume data is empty")
+    return await _run_async(_ats_score_plan(resume_data, parsed_resume))
+
+
+def _ats_score_plan(resume_data, parsed_resume):
+    cache_key = resultcache.make_key(f"ats_score:{ATS_SCORING_MODE}", resume_data, parsed_resume)
+    cached = yield from _cache_get(cache_key)
+    if cached is not None:
+        return cached
+
+    if ATS_SCORING_MODE == "local":
+        ats_data = atsscoring.score_resume(resume_data, parsed_resume)
+    elif ATS_SCORING_MODE == "hybrid":
+        ats_data = atsscoring.score_resume(resume_data, parsed_resume)
+        # Rule-based feedback kept after a failed call is not cached, so the
+        # next request for this resume asks the model again
+        if not (yield from _ats_feedback_plan(resume_data, parsed_resume, ats_data)):
+            return ats_data
+    else:
+        ats_data = yield from _llm_ats_score_plan(resume_data, parsed_resume)
+    yield from _cache_put(cache_key, ats_data)
+    return ats_data
+
+
+def _llm_ats_score_plan(resume_data, parsed_resume):
+    """Score every ATS category with the LLM (ATS_SCORING_MODE=llm)."""
+    try:
+        return (yield from _route_plan("ats_score", prompts.ats_score_messages(resume_data, parsed_resume), 0.2))
     
-    prompt = f'''
-    You are an expert ATS (Applicant Tracking System) analyzer. Evaluate this resume and provide a comprehensive ATS compatibility score.
-
-    Resume Data:
-    {resume_data}
-
-    Parsed Information:
-    {json.dumps(parsed_resume, indent=2)}
-
-    Analyze the resume based on these ATS criteria and provide scores (0-100) for each:
-
-    1. **Contact Information Completeness (10%)**: Are name, email, phone, location provided?
-    2. **Keyword Density (25%)**: Does it have relevant industry keywords, skills, and job-related terms?
-    3. **Format Compatibility (15%)**: Is the structure clean, parseable, no complex formatting?
-    4. **Section Organization (15%)**: Are standard sections present (Experience, Education, Skills)?
-    5. **Experience Quantification (15%)**: Are achievements quantified with metrics and numbers?
-    6. **Education Details (10%)**: Is education information complete (degree, institution, year)?
-    7. **Skills Presence (10%)**: Are technical and soft skills clearly listed?
-
-    Return your analysis in this EXACT JSON format (no additional text):
-    {{
-        "overall_ats_score": <number 0-100>,
-        "category_scores": {{
-            "contact_info": <number 0-100>,
-            "keyword_density": <number 0-100>,
-            "format_compatibility": <number 0-100>,
-            "section_organization": <number 0-100>,
-            "experience_quantification": <number 0-100>,
-            "education_details": <number 0-100>,
-            "skills_presence": <number 0-100>
-        }},
-        "strengths": [
-            "List 3-5 specific strengths that make this resume ATS-friendly"
-        ],
-        "weaknesses": [
-            "List 3-5 specific weaknesses that hurt ATS compatibility"
-        ],
-        "improvement_suggestions": [
-            "Provide 5-7 specific, actionable suggestions to improve ATS score"
-        ],
-        "keyword_analysis": {{
-            "present_keywords": ["list of 10-15 important keywords found in resume"],
-            "missing_keywords": ["list of 10-15 common industry keywords that should be added"]
-        }},
-        "format_issues": [
-            "List any formatting issues (tables, images, columns, special characters, etc.)"
-        ],
-        "summary": "2-3 sentence overall assessment of ATS readiness"
-    }}
-    '''
+    except Exception as e:
+        raise Exception(f"Failed to calculate ATS score: {str(e)}")
+
+
+def _ats_feedback_plan(resume_data, parsed_resume, ats_data):
+    """
+    Ask the LLM only for qualitative feedback on locally computed ATS scores
+    (ATS_SCORING_MODE=hybrid) and merge it into ats_data in place.
+
+    On any failure the rule-based feedback from atsscoring is kept.
 
+    Returns:
+        True if the model's feedback was merged, False if the call failed
+    """
     try:
-        client = OpenAI(
-            api_key=api_key,
-            base_url="https://api.groq.com/openai/v1",
-            timeout=30.0  # 30 second timeout
+        feedback = yield from _route_plan(
+            "ats_feedback",
+            prompts.ats_feedback_messages(resume_data, parsed_resume, ats_data["category_scores"]),
+            0.2,
         )
-        
-        response = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[
-                {"role": "system", "content": "You are an ATS expert. Return only valid JSON, no other text."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=2500,
-            temperature=0.2
-        )
-        
-        content = response.choices[0].message.content.strip()
-        print(f"DEBUG - ATS Score Raw Response: {content[:500]}...")
-        
-        # Try to parse the JSON response
-        try:
-            # Remove markdown code blocks if present
-            if content.startswith("```"):
-                content = content.split("```")[1]
-                if content.startswith("json"):
-                    content = content[4:]
-            
-            ats_data = json.loads(content)
-            
-            # Validate required fields
-            if "overall_ats_score" not in ats_data:
-                ats_data["overall_ats_score"] = 70
-            
-            return ats_data
-            
-        except json.JSONDecodeError as e:
-            print(f"DEBUG - JSON Decode Error: {str(e)}")
-            print(f"DEBUG - Failed content: {content}")
-            
-            # Try to extract JSON from the response using regex
-            import re
-            json_match = re.search(r'\{.*\}', content, re.DOTALL)
-            if json_match:
-                try:
-                    ats_data = json.loads(json_match.group(0))
-                    return ats_data
-                except:
-                    pass
-            
-            # If all fails, return a basic structure
-            return {
-                "overall_ats_score": 70,
-                "summary": "Unable to generate detailed ATS analysis. Please try again.",
-                "error": "JSON parsing failed"
-            }
-    
     except Exception as e:
-        raise Exception(f"Failed to calculate ATS score: {str(e)}")
\ No newline at end of file
+        print(f"Warning: ATS feedback call failed, keeping rule-based feedback: {str(e)}")
+        return False
+
+    for key in ("strengths", "weaknesses", "improvement_suggestions", "summary"):
+        if feedback.get(key):
+            ats_data[key] = feedback[key]
+    if feedback.get("missing_keywords"):
+        ats_data["keyword_analysis"]["missing_keywords"] = feedback["missing_keywords"]
+    return True
+
+
+# ---------------------------------------------------------------------------
+# Model routing
+# The routing and repair logic is written once, as "plans": generators that
+# yield the keyword arguments of each chat completion they need and are sent
+# back the response text (or have the call's exception thrown in). _run
+# drives a plan with the blocking client, _run_async with the async one.
+# Plans also yield their result cache reads and writes (see _cache_get), which
+# _run_async keeps off the event loop when the cache is SQLite.
+
+def _run(plan):
+    """Drive a plan with llmclient.chat_completion and return its result."""
+    try:
+        request = next(plan)
+        while True:
+            if callable(request):
+                request = plan.send(request())
+                continue
+            try:
+                content = llmclient.chat_completion(**request).choices[0].message.content
+            except Exception as e:
+                request = plan.throw(e)
+            else:
+                request = plan.send(content)
+    except StopIteration as stop:
+        return stop.value
+
+
+async def _run_async(plan):
+    """Drive a plan with llmclient.achat_completion and return its result."""
+    try:
+        request = next(plan)
+        while True:
+            if callable(request):
+                request = plan.send(await _cache_step_async(request))
+                continue
+            try:
+                content = (await llmclient.achat_completion(**request)).choices[0].message.content
+            except Exception as e:
+                request = plan.throw(e)
+            else:
+                request = plan.send(content)
+    except StopIteration as stop:
+        return stop.value
+
+
+# A stream plan yields the same requests, but each response is streamed: its
+# deltas are passed on to the caller before the plan is sent the full text.
+# Anything else a stream plan yields besides cache steps (a cached response,
+# STREAM_RESTART) goes straight to the caller.
+
+def _stream(plan):
+    """Drive a stream plan with llmclient.chat_completion_stream, yielding what the caller sees."""
+    try:
+        request = next(plan)
+        while True:
+            if callable(request):
+                request = plan.send(request())
+                continue
+            if not isinstance(request, dict):
+                yield request
+                request = next(plan)
+                continue
+            chunks = []
+            try:
+                for delta in llmclient.chat_completion_stream(**request):
+                    chunks.append(delta)
+                    yield delta
+            except Exception as e:
+                request = plan.throw(e)
+            else:
+                request = plan.send("".join(chunks))
+    except StopIteration:
+        return
+
+
+async def _stream_async(plan):
+    """Drive a stream plan with llmclient.achat_completion_stream."""
+    try:
+        request = next(plan)
+        while True:
+            if callable(request):
+                request = plan.send(await _cache_step_async(request))
+                continue
+            if not isinstance(request, dict):
+                yield request
+                request = next(plan)
+                continue
+            chunks = []
+            try:
+                async for delta in llmclient.achat_completion_stream(**request):
+                    chunks.append(delta)
+                    yield delta
+            except Exception as e:
+                request = plan.throw(e)
+            else:
+                request = plan.send("".join(chunks))
+    except StopIteration:
+        return
+
+
+def _cache_get(key):
+    """Plan step: resultcache.get(key)."""
+    return (yield functools.partial(resultcache.get, key))
+
+
+def _cache_put(key, value):
+    """Plan step: resultcache.put(key, value)."""
+    yield functools.partial(resultcache.put, key, value)
+
+
+async def _cache_step_async(step):
+    """Run a cache step from async code, on a worker thread if the cache is SQLite."""
+    if resultcache.blocking():
+        return await asyncio.to_thread(step)
+    return step()
+
+
+def _tier_options(final):
+    return {} if final else {"timeout": FAST_MODEL_TIMEOUT}
+
+
+def _record_route(kind, model, outcome, start):
+    metrics.MODEL_ROUTE.labels(kind=kind, model=model, outcome=outcome).inc()
+    metrics.MODEL_ROUTE_SECONDS.labels(kind=kind, model=model).observe(time.monotonic() - start)
+
+
+def _route_outcome(content, kind):
+    """
+    Classify a raw model response.
+
+    Returns:
+        Tuple of ("accepted", "invalid" or "incomplete", the validated dict or None)
+    """
+    data = validate_response(extract_json(content, kind), kind)
+    if data is None:
+        return "invalid", None
+    # A response that stops before its closing brace ran out of output tokens
+    if not (content or "").strip().rstrip("`").rstrip().endswith("}") or not _is_complete(data, kind):
+        return "incomplete", data
+    return "accepted", data
+
+
+def _is_complete(data, kind):
+    """Whether a valid response is also complete enough to skip escalating to a larger model."""
+    if kind == "extraction":
+        # Chunks of a long resume legitimately miss most fields, so only reject empty answers
+        return any(data.get(key) for key in prompts.EXTRACTION_SCHEMA if key != "technical_skills")
+    if kind == "ats_score":
+        return all(name in data.get("category_scores", {}) for name in atsscoring.WEIGHTS)
+    if kind == "ats_feedback":
+        return bool(data.get("strengths")) and bool(data.get("improvement_suggestions"))
+    if kind == "job_match":
+        return bool(data.get("category_scores")) and bool(data.get("summary"))
+    if kind == "jd_analysis":
+        return bool(data.get("required_skills") or data.get("preferred_skills"))
+    return True
+
+
+def _route_plan(kind, messages, temperature):
+    """
+    Plan calling the models in MODEL_ROUTES[kind] in turn until one gives a usable response.
+
+    Every model but the last runs with FAST_MODEL_TIMEOUT and is skipped if
+    its response is invalid or incomplete. The last model is the quality
+    fallback: its response goes through the parse_llm_json repair retry.
+
+    Returns:
+        The validated response dict
+
+    Raises:
+        ValueError: If the last model's response cannot be parsed
+        The last model's API error
+    """
+    models = MODEL_ROUTES[kind]
+    for i, model in enumerate(models):
+        final = i == len(models) - 1
+        start = time.monotonic()
+        try:
+            content = yield dict(
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=RESPONSE_MAX_TOKENS[kind],
+                **_tier_options(final),
+            )
+            if final:
+                data = yield from _parse_plan(content, kind)
+                _record_route(kind, model, "accepted", start)
+                return data
+            outcome, data = _route_outcome(content, kind)
+        except Exception as e:
+            _record_route(kind, model, "invalid" if isinstance(e, ValueError) else "error", start)
+            if final:
+                raise
+            print(f"Warning: {model} failed on {kind} ({str(e)}), escalating to {models[i + 1]}")
+            continue
+
+        _record_route(kind, model, outcome, start)
+        if outcome == "accepted":
+            return data
+        print(f"Warning: {outcome} {kind} response from {model}, escalating to {models[i + 1]}")
+
+
+# ---------------------------------------------------------------------------
+# Response parsing
+
+# List fields of the scoring responses; a bare string is accepted as a one-item list
+_RESPONSE_LIST_FIELDS = (
+    "matching_skills", "missing_skills", "matching_keywords", "missing_keywords", "strengths",
+    "weaknesses", "recommendations", "improvement_suggestions", "format_issues",
+    "required_skills", "preferred_skills", "keywords",
+)
+
+# Deepest nesting extract_json accepts; real responses stay under ten levels
+MAX_JSON_DEPTH = 64
+
+
+def extract_json(text, kind="unknown"):
+    """
+    Recover the JSON object from a model response in one linear scan.
+
+    Code fences and prose around the object are skipped, braces inside strings
+    or in trailing text are ignored, and an object cut off at max_tokens is
+    closed at the last complete value. Objects nested deeper than
+    MAX_JSON_DEPTH are skipped.
+
+    Args:
+        text: Raw model response
+        kind: Response kind, only used to label the repair counter in /metrics
+
+    Returns:
+        The parsed dict, or None if no object can be recovered
+    """
+    if not text:
+        return None
+
+    start = None
+    stack = []  # closers expected for the open objects and arrays
+    in_string = escape = False
+    # (end index, depth) of the last point the object can be truncated at. Any
+    # pop below that depth records a newer cut, so stack[:depth] still holds the
+    # closers it needs when the scan ends.
+    cut = None
+
+    for i, char in enumerate(text):
+        if start is None:
+            if char == "{":
+                start, stack, cut = i, ["}"], (i + 1, 1)
+            continue
+
+        if in_string:
+            if escape:
+                escape = False
+            elif char == "\\":
+                escape = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            if len(stack) >= MAX_JSON_DEPTH:
+                start = None  # too deep to be a model response; look for the next object
+                continue
+            stack.append("}" if char == "{" else "]")
+            cut = (i + 1, len(stack))
+        elif char in "}]":
+            if char != stack[-1]:
+                start = None  # not JSON after all; look for the next object
+                continue
+            stack.pop()
+            if stack:
+                cut = (i + 1, len(stack))
+                continue
+            value = _loads(text[start:i + 1])
+            if isinstance(value, dict):
+                return value
+            start = None
+        elif char == ",":
+            cut = (i, len(stack))
+
+    if start is None:
+        return None
+
+    # Truncated: first try closing everything where the text stops, then fall
+    # back to the last complete value
+    tail = text[start:].rstrip()
+    if in_string:
+        candidate = (tail[:-1] if escape else tail) + '"'
+    else:
+        candidate = tail.rstrip(",")
+    end, depth = cut
+    for attempt in (candidate + "".join(reversed(stack)), text[start:end] + "".join(reversed(stack[:depth]))):
+        value = _loads(attempt)
+        if isinstance(value, dict):
+            metrics.JSON_REPAIRS.labels(kind=kind, method="truncated").inc()
+            return value
+    return None
+
+
+def _loads(text):
+    """json.loads, or None if text is not valid (or too deeply nested) JSON."""
+    try:
+        return json.loads(text)
+    except (ValueError, RecursionError):
+        return None
+
+
+def _score(value):
+    """A 0-100 score as a number, or None if value is not one."""
+    if isinstance(value, str):
+        try:
+            value = float(value.strip().rstrip("%"))
+        except ValueError:
+            return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not 0 <= value <= 100:
+        return None
+    return round(value)
+
+
+def validate_response(data, kind):
+    """
+    Check a parsed response against the expected schema and normalize it in place.
+
+    Args:
+        data: Output of extract_json
+        kind: "extraction", "job_match", "jd_analysis", "ats_score" or "ats_feedback"
+
+    Returns:
+        The normalized dict, or None if required fields are missing or invalid
+    """
+    if not isinstance(data, dict):
+        return None
+
+    if kind == "extraction":
+        if not any(key in data for key in prompts.EXTRACTION_SCHEMA):
+            return None
+        for key, template in prompts.EXTRACTION_SCHEMA.items():
+            value = data.get(key)
+            if isinstance(template, str) and not isinstance(value, str):
+                data[key] = str(value) if isinstance(value, (int, float)) else ""
+            elif isinstance(template, list) and not isinstance(value, list):
+                data[key] = []
+            elif isinstance(template, dict) and not isinstance(value, (dict, list)):
+                data[key] = {}
+        return data
+
+    for field in _RESPONSE_LIST_FIELDS:
+        if field in data and not isinstance(data[field], list):
+            data[field] = [data[field]] if isinstance(data[field], str) and data[field] else []
+
+    if "category_scores" in data:
+        scores = data["category_scores"] if isinstance(data["category_scores"], dict) else {}
+        data["category_scores"] = {k: _score(v) for k, v in scores.items() if _score(v) is not None}
+
+    if kind == "job_match":
+        data["overall_match_score"] = _score(data.get("overall_match_score"))
+        return data if data["overall_match_score"] is not None else None
+
+    if kind == "jd_analysis":
+        if not any(key in data for key in ("required_skills", "preferred_skills", "keywords")):
+            return None
+        return jobdescription.normalize_analysis(data)
+
+    if kind == "ats_score":
+        overall = _score(data.get("overall_ats_score"))
+        scores = data.get("category_scores", {})
+        if overall is None and all(name in scores for name in atsscoring.WEIGHTS):
+            # Same weighting the prompt asks for
+            overall = round(sum(scores[name] * weight for name, weight in atsscoring.WEIGHTS.items()) / 100)
+        if overall is None:
+            return None
+        data["overall_ats_score"] = overall
+        if not isinstance(data.get("keyword_analysis"), dict):
+            data["keyword_analysis"] = {}
+        return data
+
+    if kind == "ats_feedback":
+        keys = ("strengths", "weaknesses", "improvement_suggestions", "summary")
+        return data if any(data.get(key) for key in keys) else None
+
+    raise ValueError(f"Unknown response kind: {kind}")
+
+
+def parse_llm_json(content, kind):
+    """
+    Parse and validate a model response, with one cheap repair retry if needed.
+
+    The response is first recovered locally with extract_json. Only if that
+    fails, or the result does not validate, REPAIR_MODEL is asked to fix it.
+
+    Args:
+        content: Raw model response
+        kind: "extraction", "job_match", "jd_analysis", "ats_score" or "ats_feedback"
+
+    Returns:
+        The validated dict
+
+    Raises:
+        ValueError: If neither the response nor the repaired one is valid
+    """
+    return _run(_parse_plan(content, kind))
+
+
+async def parse_llm_json_async(content, kind):
+    """parse_llm_json with the repair retry on the async Groq client."""
+    return await _run_async(_parse_plan(content, kind))
+
+
+def _parse_plan(content, kind):
+    data = validate_response(extract_json(content, kind), kind)
+    if data is not None:
+        return data
+
+    print(f"Warning: invalid {kind} response from the model, retrying with {REPAIR_MODEL}")
+    metrics.JSON_REPAIRS.labels(kind=kind, method="retry").inc()
+    repaired = yield dict(
+        model=REPAIR_MODEL,
+        messages=prompts.repair_messages(content or "", kind),
+        temperature=0,
+        max_tokens=RESPONSE_MAX_TOKENS[kind],
+    )
+    data = validate_response(extract_json(repaired, kind), kind)
+    if data is None:
+        raise ValueError(f"The AI model returned an invalid {kind.replace('_', ' ')} response")
+    return data
@@ -0,0 +1,60 @@
+# Section headings and term matching shared by the text heuristics
+# Upload triage, chunking, the rule-based ATS scorer and the local job
+# description parser all need to know which lines open a section and whether a
+# term is mentioned in some text. They use the definitions here so they agree.
+
+import re
+
+# Most characters a heading line may have after its heading term ("Skills: Python, Go")
+HEADING_TAIL_CHARS = 30
+
+# Resume section kinds and the heading terms that open them
+RESUME_SECTIONS = {
+    "experience": r"(?:work |professional |relevant )?experience|employment(?: history)?|work history|"
+                  r"career history|internships?",
+    "education": r"education|academic background|qualifications",
+    "skills": r"(?:technical |core |key )?skills|technologies|tech stack|competencies",
+    "projects": r"(?:personal |academic |selected )?projects",
+    "summary": r"(?:professional )?summary|objective|profile|about me",
+    "other": r"certifications?|licenses|awards|honors|achievements|publications|languages|volunteer(?:ing)?|"
+             r"leadership",
+}
+
+
+def heading_pattern(alternation):
+    """
+    Compile a regex for heading lines that start with one of the terms in alternation.
+
+    The term may follow bullets or numbering and be followed by at most
+    HEADING_TAIL_CHARS more characters. MULTILINE is set, so search() finds
+    heading lines anywhere in a block of text.
+    """
+    return re.compile(
+        r"^[^\w\n]*(?:" + alternation + r")\b[^\n]{0,%d}$" % HEADING_TAIL_CHARS, re.IGNORECASE | re.MULTILINE
+    )
+
+
+_RESUME_HEADING_RES = {kind: heading_pattern(terms) for kind, terms in RESUME_SECTIONS.items()}
+
+
+def resume_section(line):
+    """The kind of resume section (a RESUME_SECTIONS key) a line opens, or None if it is not a heading."""
+    for kind, pattern in _RESUME_HEADING_RES.items():
+        if pattern.match(line):
+            return kind
+    return None
+
+
+def resume_sections(text):
+    """The set of resume section kinds with a heading somewhere in text."""
+    return {kind for kind, pattern in _RESUME_HEADING_RES.items() if pattern.search(text)}
+
+
+def term_pattern(alternation):
+    """Compile a regex for whole terms of alternation in lowercased text ("c" does not match "c++")."""
+    return re.compile(r"(?<![a-z0-9+#])(" + alternation + r")(?![a-z0-9+#])")
+
+
+def mentions(text, term):
+    """Whole-term match in lowercased text ("Go" must not match "Google")."""
+    return term_pattern(re.escape(term.lower())).search(text) is not None
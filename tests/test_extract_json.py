@@ -0,0 +1,35 @@
+import time
+
+import resumeparser
+from resumeparser import extract_json
+
+
+def test_skips_fences_and_prose():
+    assert extract_json('Here you go:\n```json\n{"a": 1, "b": "}"}\n```\nDone {x}') == {"a": 1, "b": "}"}
+
+
+def test_closes_truncated_object():
+    assert extract_json('{"a": "x", "b": [1, 2], "c": {"d": "tr') == {"a": "x", "b": [1, 2], "c": {"d": "tr"}}
+    assert extract_json('{"a": {"b": [1, 2]}, "c": [3, {"d": ') == {"a": {"b": [1, 2]}, "c": [3, {}]}
+
+
+def test_deep_nesting_is_rejected_not_raised():
+    assert extract_json('{"a":' + "[" * 5000) is None
+    assert extract_json('{"a":' + "[" * 5000 + "]" * 5000 + "}") is None
+    # A sane object after the deep one is still found
+    assert extract_json('{"a":' + "[" * 5000 + ' {"ok": true}') == {"ok": True}
+
+
+def test_long_run_of_unclosed_brackets_is_linear():
+    for text in ("{" * 200000, '{"a": ' + "[" * 200000, '{"a": [' + "[1," * 100000):
+        start = time.monotonic()
+        extract_json(text)
+        assert time.monotonic() - start < 2
+
+
+def test_unparseable_response_escalates_to_next_model():
+    plan = resumeparser._route_plan("ats_score", [], 0)
+    first = next(plan)
+    second = plan.send('{"a":' + "[" * 5000)
+    assert first["model"] != second["model"]
+    assert second["model"] == resumeparser.MODEL_ROUTES["ats_score"][-1]
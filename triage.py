@@ -0,0 +1,166 @@
+# Upload triage
+# Cheap checks that turn away unusable uploads before any Groq call: not a PDF,
+# unreadable or password-protected, too many pages, no selectable text on the
+# sampled pages (scanned or image-only), garbled text from a broken font
+# encoding, or text that does not look like a resume. Each verdict is counted
+# in ratemyresume_upload_triage_total{outcome}.
+#
+# check_pdf runs before extraction and hands back the opened reader and the
+# sampled page texts so extraction does not parse them again; check_text runs
+# on the extracted text.
+
+import os
+import re
+
+import metrics
+import sections
+
+TRIAGE = os.getenv("TRIAGE", "true").lower() in ("true", "1", "yes")
+TRIAGE_MAX_PAGES = int(os.getenv("TRIAGE_MAX_PAGES", "50"))
+TRIAGE_SAMPLE_PAGES = int(os.getenv("TRIAGE_SAMPLE_PAGES", "3"))
+TRIAGE_MIN_CHARS_PER_PAGE = int(os.getenv("TRIAGE_MIN_CHARS_PER_PAGE", "100"))
+TRIAGE_MIN_RESUME_SCORE = int(os.getenv("TRIAGE_MIN_RESUME_SCORE", "3"))
+
+# Share of sampled characters that must be letters, digits, whitespace or common punctuation
+MIN_READABLE_RATIO = 0.85
+# The PDF header may follow up to 1 KB of leading junk
+HEADER_WINDOW = 1024
+
+_PUNCTUATION = set(".,;:!?'\"()[]{}<>-–—_/\\|@#$%&*+=~`^•·●▪■◦○►✓→…’‘“”€£¥°©®™")
+
+_EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+_PHONE_RE = re.compile(r"(?<!\d)\+?\(?\d[\d\s().-]{7,}\d(?!\d)")
+_PROFILE_RE = re.compile(r"\b(linkedin\.com|github\.com|gitlab\.com|portfolio)\b", re.IGNORECASE)
+_DATE_RANGE_RE = re.compile(
+    r"\b(?:(?:jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*\.?\s+)?(?:19|20)\d\d\s*"
+    r"(?:-|–|—|to)\s*(?:(?:jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*\.?\s+)?"
+    r"(?:(?:19|20)\d\d|present|current|now)\b",
+    re.IGNORECASE,
+)
+
+
+class Rejected(Exception):
+    """An upload triage turned away; the message is safe to show to the user as-is."""
+
+    def __init__(self, outcome, message):
+        super().__init__(message)
+        self.outcome = outcome
+
+
+def _reject(outcome, message):
+    metrics.UPLOAD_TRIAGE.labels(outcome=outcome).inc()
+    raise Rejected(outcome, message)
+
+
+def _sample_pages(page_count):
+    """First, last and evenly spaced middle pages, at most TRIAGE_SAMPLE_PAGES of them."""
+    if page_count <= TRIAGE_SAMPLE_PAGES:
+        return list(range(page_count))
+    if TRIAGE_SAMPLE_PAGES <= 1:
+        return [0]
+    step = (page_count - 1) / (TRIAGE_SAMPLE_PAGES - 1)
+    return sorted({round(i * step) for i in range(TRIAGE_SAMPLE_PAGES)})
+
+
+def _unlocked(reader):
+    """Whether an encrypted PDF opens without a password (many are only locked against editing)."""
+    try:
+        return bool(reader.decrypt(""))
+    except Exception:
+        # Wrong password, or an encryption scheme pypdf cannot handle here
+        return False
+
+
+def readable_ratio(text):
+    """Share of non-whitespace characters that are letters, digits or common punctuation."""
+    visible = [c for c in text if not c.isspace()]
+    if not visible:
+        return 0.0
+    readable = sum(1 for c in visible if c.isalnum() or c in _PUNCTUATION)
+    return readable / len(visible)
+
+
+def resume_score(text):
+    """
+    Count the signs that text is a resume.
+
+    One point each for an email address, a phone number, a profile link and a
+    date range ("2019 - Present"), plus one per kind of resume section heading
+    (see sections.RESUME_SECTIONS).
+    """
+    score = sum(1 for pattern in (_EMAIL_RE, _PHONE_RE, _PROFILE_RE, _DATE_RANGE_RE) if pattern.search(text))
+    return score + len(sections.resume_sections(text))
+
+
+def check_pdf(stream):
+    """
+    Check an uploaded PDF before text extraction.
+
+    Args:
+        stream: Binary file object (rewound before reading)
+
+    Returns:
+        Tuple of (the opened PdfReader, {page index: text} of the sampled
+        pages), or (None, {}) when TRIAGE is off
+
+    Raises:
+        Rejected: If the upload is not a readable, unlocked PDF with selectable text
+    """
+    if not TRIAGE:
+        return None, {}
+
+    stream.seek(0)
+    if b"%PDF-" not in stream.read(HEADER_WINDOW):
+        _reject("not_pdf", "This file is not a PDF. Please upload your resume as a PDF.")
+
+    from pypdf import PdfReader
+
+    stream.seek(0)
+    try:
+        reader = PdfReader(stream)
+        if reader.is_encrypted and not _unlocked(reader):
+            _reject("encrypted", "This PDF is password-protected. Please upload an unlocked copy.")
+        page_count = len(reader.pages)
+    except Rejected:
+        raise
+    except Exception as e:
+        print(f"Warning: Could not open uploaded PDF: {str(e)}")
+        _reject("unreadable", "This PDF could not be read. It may be damaged; please export it again.")
+
+    if page_count == 0:
+        _reject("unreadable", "This PDF has no pages.")
+    if page_count > TRIAGE_MAX_PAGES:
+        _reject("too_many_pages", f"This PDF has {page_count} pages. Please upload a resume of at most "
+                                  f"{TRIAGE_MAX_PAGES} pages.")
+
+    page_texts = {}
+    for page_no in _sample_pages(page_count):
+        try:
+            page_texts[page_no] = reader.pages[page_no].extract_text() or ""
+        except Exception as e:
+            print(f"Warning: Could not extract page {page_no + 1} during triage: {str(e)}")
+            page_texts[page_no] = ""
+
+    sample = "".join(page_texts.values())
+    visible = sum(1 for c in sample if not c.isspace())
+    if visible < TRIAGE_MIN_CHARS_PER_PAGE * len(page_texts):
+        _reject("no_text", "This PDF has little or no selectable text (it may be a scan or an image). "
+                           "Please upload a PDF exported from a word processor.")
+    if readable_ratio(sample) < MIN_READABLE_RATIO:
+        _reject("garbled", "The text in this PDF could not be decoded (it may use an unusual font "
+                           "encoding). Please export it again or use a standard font.")
+    return reader, page_texts
+
+
+def check_text(text):
+    """
+    Check that extracted text looks like a resume.
+
+    Raises:
+        Rejected: If the text has too few resume signs (see resume_score)
+    """
+    if not TRIAGE:
+        return
+    if resume_score(text) < TRIAGE_MIN_RESUME_SCORE:
+        _reject("not_resume", "This document does not look like a resume. Please upload your resume.")
+    metrics.UPLOAD_TRIAGE.labels(outcome="accepted").inc()